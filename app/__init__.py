@@ -5,22 +5,51 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_wtf.csrf import CSRFProtect
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from config import Config
+from werkzeug.middleware.proxy_fix import ProxyFix
+from app.throttle import LoginThrottle
+from app.cache import TTLCache
+from app.startup import StartupTimer, configure_bytecode_cache, warm_up
+from app.compression import CompressionMiddleware
+from app.slow_queries import SlowQueryLog
+from app.profiling import ProfilerMiddleware, tag_profiled_request
 
 db = SQLAlchemy()
 login_manager = LoginManager()
 login_manager.login_view = 'auth.login'
 login_manager.login_message = 'გთხოვთ, შეხვიდეთ სისტემაში ამ გვერდის სანახავად.'
 csrf = CSRFProtect()
+login_throttle = LoginThrottle()
+
+
+@event.listens_for(Engine, 'connect')
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite ignores ON DELETE CASCADE unless foreign keys are switched on per connection
+    if type(dbapi_connection).__module__ == 'sqlite3':
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
 
 
 def create_app(config_class=Config):
+    timer = StartupTimer()
     app = Flask(__name__)
     app.config.from_object(config_class)
+    configure_bytecode_cache(app)
+    timer.mark('config')
 
     db.init_app(app)
     login_manager.init_app(app)
     csrf.init_app(app)
+    login_throttle.init_app(app)
+    app.extensions['user_cache'] = TTLCache(maxsize=app.config['USER_CACHE_SIZE'],
+                                            ttl=app.config['USER_CACHE_TTL'])
+    if app.config.get('SLOW_QUERY_LOG_ENABLED', True):
+        with app.app_context():
+            app.extensions['slow_queries'] = SlowQueryLog(app, db.engine)
+    timer.mark('extensions')
 
     # Register blueprints
     from app.auth import bp as auth_bp
@@ -29,12 +58,50 @@ def create_app(config_class=Config):
     from app.routes import bp as main_bp
     app.register_blueprint(main_bp)
 
+    from app.feeds import bp as feeds_bp
+    app.register_blueprint(feeds_bp)
+
+    from app.changes import bp as changes_bp, seed_changes_command
+    app.register_blueprint(changes_bp)
+    app.cli.add_command(seed_changes_command)
+
+    from app.passwords import password_benchmark_command
+    app.cli.add_command(password_benchmark_command)
+    from app.schema import upgrade_db_command
+    app.cli.add_command(upgrade_db_command)
+    from app.purge import purge_accounts_command
+    app.cli.add_command(purge_accounts_command)
+    from app.matching import deliver_matches_command
+    app.cli.add_command(deliver_matches_command)
+    from app.dedupe import dedupe_jobs_command
+    app.cli.add_command(dedupe_jobs_command)
+    from app.salary import backfill_salaries_command
+    app.cli.add_command(backfill_salaries_command)
+    from app.geo import geocode_jobs_command
+    app.cli.add_command(geocode_jobs_command)
+    from app.lookups import normalize_lookups_command
+    app.cli.add_command(normalize_lookups_command)
+    from app.quota import adzuna_quota_command
+    app.cli.add_command(adzuna_quota_command)
+    from app.similar import similar_jobs_command
+    app.cli.add_command(similar_jobs_command)
+    from app.archive import archive_jobs_command, start_sweeper
+    app.cli.add_command(archive_jobs_command)
+    app.before_request(start_sweeper)
+    from app.tasks import start_embedded_worker, worker_command
+    app.cli.add_command(worker_command)
+    from app.sharding import shards_cli
+    app.cli.add_command(shards_cli)
+    app.before_request(start_embedded_worker)
+    timer.mark('blueprints')
+
     # Create upload folder if it doesn't exist
     if not os.path.exists(app.config['UPLOAD_FOLDER']):
         os.makedirs(app.config['UPLOAD_FOLDER'])
 
-    # Set up logging (avoid duplicate handlers)
-    if not app.logger.handlers:
+    # Set up logging (avoid duplicate handlers); tests keep the log out of the working tree
+    app.logger.setLevel(logging.INFO)
+    if not app.logger.handlers and not app.testing:
         if not os.path.exists('logs'):
             os.mkdir('logs')
         
@@ -50,12 +117,36 @@ def create_app(config_class=Config):
         ))
         file_handler.setLevel(logging.INFO)
         app.logger.addHandler(file_handler)
-        app.logger.setLevel(logging.INFO)
         app.logger.info('JobBoard startup')
 
+    from app.streaming import stream_flush
+    app.add_template_global(stream_flush)
+
     # Error handlers
     from app.errors import bp as errors_bp
     app.register_blueprint(errors_bp)
+    timer.mark('logging')
+
+    # Behind a reverse proxy every request comes from the proxy's address; take the
+    # client address (used by the login throttle) from X-Forwarded-For instead
+    if app.config.get('TRUST_PROXY'):
+        proxies = app.config['TRUST_PROXY']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies, x_host=proxies)
+
+    if app.config.get('COMPRESS_ENABLED', True):
+        app.wsgi_app = CompressionMiddleware(app.wsgi_app, app.config)
+
+    # Outermost, so a profile covers compression as well
+    if app.config.get('PROFILE_ENABLED'):
+        app.wsgi_app = ProfilerMiddleware(app.wsgi_app, app.config)
+        app.before_request(tag_profiled_request)
+
+    if app.config.get('STARTUP_WARMUP'):
+        warm_up(app)
+        timer.mark('warmup')
+
+    app.extensions['startup_timings'] = timer.phases
+    app.logger.info(timer.report())
 
     return app
 
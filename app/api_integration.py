@@ -1,11 +1,16 @@
-import requests
 from flask import current_app
+from app.salary import ADZUNA_CURRENCIES
+from app.external_jobs import ExternalJob
+from app.quota import QuotaUnavailable, get_quota
 
 
-def search_adzuna_jobs(query='', location='', results_per_page=20, page=1, country='gb'):
+def search_adzuna_jobs(query='', location='', results_per_page=20, page=1, country='gb',
+                       priority='interactive'):
     """
     Search for jobs using Adzuna API.
-    Returns a list of job postings from Adzuna.
+    Returns a list of job postings from Adzuna as ExternalJob records.
+    Each call is charged to the quota shared by all workers; priority='background'
+    calls are refused once the quota is down to its reserve.
     
     Supported countries: gb, us, de, au, ca, fr, it, nl, pl, ru, etc.
     """
@@ -16,6 +21,20 @@ def search_adzuna_jobs(query='', location='', results_per_page=20, page=1, count
         current_app.logger.error('Adzuna API credentials not configured')
         return None
     
+    try:
+        allowed = get_quota().acquire(priority)
+    except QuotaUnavailable as e:
+        # Quota unknown: let users' searches through (Adzuna still enforces its own
+        # limit) but do not spend it on prefetching
+        current_app.logger.warning(f'Adzuna quota store unavailable: {e}')
+        allowed = priority == 'interactive'
+    if not allowed:
+        current_app.logger.warning(f'Adzuna quota exhausted, {priority} call skipped')
+        return None
+    
+    # Imported on first use to keep requests out of worker startup
+    import requests
+    
     try:
         # Adzuna API endpoint for specified country
         url = f'https://api.adzuna.com/v1/api/jobs/{country}/search/{page}'
@@ -34,35 +53,8 @@ def search_adzuna_jobs(query='', location='', results_per_page=20, page=1, count
         
         data = response.json()
         
-        jobs = []
-        for result in data.get('results', []):
-            job_info = {
-                'id': result.get('id'),
-                'title': result.get('title', 'N/A'),
-                'company': result.get('company', {}).get('display_name', 'N/A'),
-                'location': result.get('location', {}).get('display_name', 'Georgia'),
-                'description': result.get('description', 'No description available'),
-                'salary_min': result.get('salary_min'),
-                'salary_max': result.get('salary_max'),
-                'category': result.get('category', {}).get('label', 'Other'),
-                'contract_type': result.get('contract_type'),
-                'created': result.get('created'),
-                'redirect_url': result.get('redirect_url'),
-                'latitude': result.get('latitude', 41.7151),
-                'longitude': result.get('longitude', 44.8271)
-            }
-            
-            # Format salary
-            if job_info['salary_min'] and job_info['salary_max']:
-                job_info['salary'] = f"${job_info['salary_min']:,.0f} - ${job_info['salary_max']:,.0f}"
-            elif job_info['salary_min']:
-                job_info['salary'] = f"${job_info['salary_min']:,.0f}+"
-            elif job_info['salary_max']:
-                job_info['salary'] = f"Up to ${job_info['salary_max']:,.0f}"
-            else:
-                job_info['salary'] = 'არ არის მითითებული'
-            
-            jobs.append(job_info)
+        currency = ADZUNA_CURRENCIES.get(country)
+        jobs = [ExternalJob.from_adzuna(result, currency) for result in data.get('results', [])]
         
         current_app.logger.info(f'Adzuna API: Found {len(jobs)} jobs for query: {query}')
         
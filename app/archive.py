@@ -0,0 +1,117 @@
+import threading
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import Job, ArchivedJob
+from app.changes import record_deletes
+
+
+def job_expiry(posted=None):
+    """Expiry date for a job posted now (or at `posted`)"""
+    days = current_app.config.get('JOB_LIFETIME_DAYS', 60)
+    return (posted or datetime.utcnow()) + timedelta(days=days)
+
+
+def assign_missing_expiry(batch_size=1000):
+    """Give jobs created before expiry existed a date based on when they were posted"""
+    days = current_app.config.get('JOB_LIFETIME_DAYS', 60)
+    assigned = 0
+    while True:
+        rows = db.session.execute(
+            db.select(Job.id, Job.date_posted).where(Job.expires_at.is_(None)).limit(batch_size)
+        ).all()
+        if not rows:
+            return assigned
+        db.session.execute(db.update(Job), [
+            {'id': job_id, 'expires_at': (posted or datetime.utcnow()) + timedelta(days=days)}
+            for job_id, posted in rows
+        ])
+        db.session.commit()
+        assigned += len(rows)
+
+
+def archive_expired_jobs(batch_size=None, now=None):
+    """
+    Move expired jobs into ArchivedJob in short batched transactions. Fingerprints,
+    similar-job links and undelivered matches of a moved job go with it (ON DELETE CASCADE).
+    """
+    batch_size = batch_size or current_app.config.get('JOB_ARCHIVE_BATCH_SIZE', 500)
+    now = now or datetime.utcnow()
+    columns = ArchivedJob.COPIED_COLUMNS
+    archived = 0
+    while True:
+        # Ids already in the archive are skipped: on a table created before ids stopped
+        # being reused, a new job may share the id of an archived one and must not be lost
+        ids = db.session.scalars(
+            db.select(Job.id).where(Job.expires_at <= now, Job.id.notin_(db.select(ArchivedJob.id)))
+            .order_by(Job.expires_at).limit(batch_size)
+        ).all()
+        if not ids:
+            break
+        # The same ids are copied and deleted, so nothing is deleted without being archived
+        try:
+            db.session.execute(db.insert(ArchivedJob).from_select(
+                columns, db.select(*(getattr(Job, c) for c in columns)).where(Job.id.in_(ids))))
+        except IntegrityError:
+            # Another sweeper archived some of these rows first; pick up what is left
+            db.session.rollback()
+            continue
+        db.session.execute(db.delete(Job).where(Job.id.in_(ids)))
+        record_deletes(ids, 'expired')
+        # Commit per batch so the write lock is released between chunks
+        db.session.commit()
+        archived += len(ids)
+    if archived:
+        current_app.logger.info(f'Archived {archived} expired jobs')
+    return archived
+
+
+def sweep_jobs():
+    """Date jobs that have no expiry yet (e.g. rows from before upgrade-db) and archive expired ones"""
+    return assign_missing_expiry(), archive_expired_jobs()
+
+
+class JobSweeper:
+    """Daemon thread archiving expired jobs every JOB_SWEEP_INTERVAL seconds"""
+
+    def __init__(self, app):
+        self.app = app
+        self.interval = app.config['JOB_SWEEP_INTERVAL']
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='job-sweeper', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self.app.app_context():
+                try:
+                    sweep_jobs()
+                except Exception:
+                    self.app.logger.exception('Job sweep failed')
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+
+
+def start_sweeper():
+    """before_request hook: start this process's sweeper on its first request"""
+    app = current_app._get_current_object()
+    if app.config.get('JOB_SWEEP_INTERVAL') and 'job_sweeper' not in app.extensions:
+        sweeper = app.extensions['job_sweeper'] = JobSweeper(app)
+        sweeper.start()
+
+
+@click.command('archive-jobs')
+@click.option('--batch-size', default=500)
+def archive_jobs_command(batch_size):
+    """Give legacy jobs an expiry date and archive every expired job."""
+    assigned = assign_missing_expiry()
+    archived = archive_expired_jobs(batch_size)
+    click.echo(f'{assigned} jobs given an expiry date, {archived} expired jobs archived.')
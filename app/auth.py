@@ -1,9 +1,10 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
 from flask_login import login_user, logout_user, current_user
 from urllib.parse import urlparse
-from app import db
+from app import db, login_throttle
 from app.models import User
 from app.forms import LoginForm, RegistrationForm
+from app.passwords import PasswordCheckTimeout
 
 bp = Blueprint('auth', __name__)
 
@@ -34,13 +35,30 @@ def login():
     
     form = LoginForm()
     if form.validate_on_submit():
-        user = User.query.filter_by(email=form.email.data).first()
+        # Reject over-budget attempts before touching the database or hashing
+        if not login_throttle.allow(request.remote_addr, form.email.data):
+            current_app.logger.warning(f'Login throttled for email: {form.email.data} from {request.remote_addr}')
+            flash('ძალიან ბევრი მცდელობა. გთხოვთ სცადოთ მოგვიანებით.', 'danger')
+            return render_template('login.html', title='შესვლა', form=form), 429
         
-        if user is None or not user.check_password(form.password.data):
+        user = User.query.filter_by(email=form.email.data, deleted_at=None).first()
+        
+        try:
+            valid = user is not None and user.check_password(form.password.data)
+        except PasswordCheckTimeout:
+            current_app.logger.warning(f'Password check timed out for email: {form.email.data}')
+            flash('სერვერი ამჟამად გადატვირთულია. გთხოვთ სცადოთ მოგვიანებით.', 'danger')
+            return render_template('login.html', title='შესვლა', form=form), 503
+        
+        if not valid:
             current_app.logger.warning(f'Failed login attempt for email: {form.email.data}')
             flash('არასწორი ელფოსტა ან პაროლი.', 'danger')
             return redirect(url_for('auth.login'))
         
+        # check_password may have upgraded an outdated hash
+        if db.session.is_modified(user):
+            db.session.commit()
+        
         login_user(user, remember=form.remember_me.data)
         current_app.logger.info(f'User logged in: {user.username} ({user.email})')
         
@@ -0,0 +1,149 @@
+import heapq
+import threading
+import time
+from bisect import bisect_left, insort
+from flask import current_app
+from app import db
+from app.lookups import LOOKUP_FIELDS
+from app.models import Job
+
+FIELDS = ('title', 'company', 'location')
+# Suggestions also match from the start of later words ("dev" -> "Python Developer")
+MAX_WORD_OFFSETS = 4
+
+
+def normalize(value):
+    return ' '.join(value.lower().split()) if value else ''
+
+
+def _suffixes(key):
+    words = key.split(' ')
+    return {' '.join(words[i:]) for i in range(min(len(words), MAX_WORD_OFFSETS))}
+
+
+class PrefixIndex:
+    """
+    Sorted array of (prefix key, value) pairs answered with bisect. Each distinct value
+    carries a weight (the number of listed jobs using it); lookups return the top-k
+    values under a prefix. At most max_values distinct values are kept.
+    """
+
+    def __init__(self, max_values=5000):
+        self.max_values = max_values
+        self._keys = []
+        self._values = {}
+
+    def __len__(self):
+        return len(self._values)
+
+    def add(self, value, weight=1):
+        key = normalize(value)
+        if not key:
+            return
+        entry = self._values.get(key)
+        if entry is not None:
+            entry[1] += weight
+            return
+        if len(self._values) >= self.max_values:
+            return
+        self._values[key] = [value.strip(), weight]
+        for suffix in _suffixes(key):
+            insort(self._keys, (suffix, key))
+
+    def remove(self, value):
+        key = normalize(value)
+        entry = self._values.get(key)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] > 0:
+            return
+        del self._values[key]
+        for suffix in _suffixes(key):
+            position = bisect_left(self._keys, (suffix, key))
+            if position < len(self._keys) and self._keys[position] == (suffix, key):
+                del self._keys[position]
+
+    def suggest(self, prefix, limit=8):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        matched = set()
+        position = bisect_left(self._keys, (prefix,))
+        while position < len(self._keys) and self._keys[position][0].startswith(prefix):
+            matched.add(self._keys[position][1])
+            position += 1
+        best = heapq.nlargest(limit, matched,
+                              key=lambda key: (self._values[key][1], -len(key)))
+        return [self._values[key][0] for key in best]
+
+
+class Autocomplete:
+    """
+    Prefix indexes over the title, company and location of listed jobs. Built from
+    the database, kept current by add_job/edit_job/delete_job in this worker and
+    rebuilt every AUTOCOMPLETE_INDEX_TTL seconds to pick up other workers' writes.
+    """
+
+    def __init__(self, max_values=5000, ttl=300):
+        self.max_values = max_values
+        self.ttl = ttl
+        self._indexes = {}
+        self._built_at = None
+        self._lock = threading.Lock()
+
+    def _build(self):
+        indexes = {}
+        for field in FIELDS:
+            index = indexes[field] = PrefixIndex(self.max_values)
+            query = Job.listed()
+            if field in LOOKUP_FIELDS:
+                # Group on the interned id and read each distinct name once
+                model = LOOKUP_FIELDS[field]
+                query = query.join(model, getattr(Job, f'{field}_id') == model.id)
+                column, group = model.name, model.id
+            else:
+                column = group = getattr(Job, field)
+            # Most frequent values first, so the cap drops the rare ones
+            rows = (query.with_entities(column, db.func.count())
+                    .group_by(group).order_by(db.func.count().desc())
+                    .limit(self.max_values * 2).all())
+            for value, count in rows:
+                index.add(value, count)
+        self._indexes = indexes
+        self._built_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        if self._built_at is None or time.monotonic() - self._built_at > self.ttl:
+            self._build()
+
+    def suggest(self, field, prefix, limit=8):
+        with self._lock:
+            self._ensure_fresh()
+            return self._indexes[field].suggest(prefix, limit)
+
+    def add(self, values):
+        """Count a job's (title, company, location) once the job is committed"""
+        with self._lock:
+            if self._built_at is not None:
+                for field, value in zip(FIELDS, values):
+                    self._indexes[field].add(value)
+
+    def remove(self, values):
+        with self._lock:
+            if self._built_at is not None:
+                for field, value in zip(FIELDS, values):
+                    self._indexes[field].remove(value)
+
+
+def job_values(job):
+    return tuple(getattr(job, field) for field in FIELDS)
+
+
+def get_autocomplete():
+    autocomplete = current_app.extensions.get('autocomplete')
+    if autocomplete is None:
+        autocomplete = current_app.extensions['autocomplete'] = Autocomplete(
+            max_values=current_app.config.get('AUTOCOMPLETE_MAX_VALUES', 5000),
+            ttl=current_app.config.get('AUTOCOMPLETE_INDEX_TTL', 300))
+    return autocomplete
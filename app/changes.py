@@ -0,0 +1,153 @@
+import json
+import threading
+import time
+from datetime import datetime
+import click
+from flask import Blueprint, abort, current_app, jsonify, request
+from sqlalchemy import event, inspect
+from app import db
+from app.models import Job, JobChange
+
+bp = Blueprint('changes', __name__)
+
+# Fields mirrored to consumers; edits touching only other columns are not logged
+PUBLIC_FIELDS = ('id', 'title', 'short_description', 'full_description', 'company', 'salary',
+                 'location', 'category', 'date_posted', 'expires_at', 'author_id')
+
+
+def snapshot(job):
+    data = {}
+    for field in PUBLIC_FIELDS:
+        value = getattr(job, field)
+        data[field] = value.isoformat() if isinstance(value, datetime) else value
+    return data
+
+
+def _append(connection, rows):
+    connection.execute(db.insert(JobChange), [
+        {'job_id': job_id, 'op': op, 'data': json.dumps(data) if data is not None else None,
+         'created_at': datetime.utcnow()}
+        for job_id, op, data in rows
+    ])
+
+
+def record_deletes(job_ids, reason):
+    """Log deletes done with bulk SQL (purges, archiving); call in the deleting transaction"""
+    if job_ids:
+        _append(db.session.connection(), [(job_id, 'delete', {'reason': reason}) for job_id in job_ids])
+        db.session.info['job_changes'] = True
+
+
+# Mapper events run inside the flush, so each change row commits or rolls back with its job
+@event.listens_for(Job, 'after_insert')
+def _job_inserted(mapper, connection, job):
+    _append(connection, [(job.id, 'insert', snapshot(job))])
+    inspect(job).session.info['job_changes'] = True
+
+
+@event.listens_for(Job, 'after_update')
+def _job_updated(mapper, connection, job):
+    state = inspect(job)
+    if any(state.attrs[field].history.has_changes() for field in PUBLIC_FIELDS):
+        _append(connection, [(job.id, 'update', snapshot(job))])
+        state.session.info['job_changes'] = True
+
+
+@event.listens_for(Job, 'after_delete')
+def _job_deleted(mapper, connection, job):
+    _append(connection, [(job.id, 'delete', {'reason': 'deleted'})])
+    inspect(job).session.info['job_changes'] = True
+
+
+class ChangeNotifier:
+    """Wakes long-polling /changes requests in this process when changes commit"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._version = 0
+
+    def notify(self):
+        with self._condition:
+            self._version += 1
+            self._condition.notify_all()
+
+    def wait(self, timeout):
+        with self._condition:
+            version = self._version
+            self._condition.wait_for(lambda: self._version != version, timeout)
+
+
+notifier = ChangeNotifier()
+
+
+@event.listens_for(db.session, 'after_commit')
+def _notify_changes(session):
+    if session.info.pop('job_changes', False):
+        notifier.notify()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_changes_flag(session):
+    session.info.pop('job_changes', None)
+
+
+def changes_since(since, limit):
+    rows = db.session.scalars(
+        db.select(JobChange).where(JobChange.seq > since).order_by(JobChange.seq).limit(limit)
+    ).all()
+    return [{'seq': row.seq, 'job_id': row.job_id, 'op': row.op,
+             'data': json.loads(row.data) if row.data else None,
+             'at': row.created_at.isoformat()} for row in rows]
+
+
+@bp.route('/changes')
+def changes():
+    """
+    Job changes after the `since` cursor, oldest first. With `wait`, an empty
+    answer is held back for up to that many seconds (at most CHANGES_MAX_WAIT)
+    until something changes. Pass the returned `next` as `since` on the following call.
+
+    Each waiting request occupies a worker thread, so CHANGES_MAX_WAIT stays 0 unless
+    the server runs async workers (e.g. gunicorn -k gevent) or has threads to spare.
+    The cursor relies on seq values committing in order, which holds on SQLite where
+    writers are serialised. On other databases a lower seq can commit after a higher
+    one and be skipped, so the feed is refused there.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        abort(501)
+    since = max(request.args.get('since', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', 100, type=int), 1), current_app.config.get('CHANGES_PAGE_SIZE', 500))
+    wait = min(max(request.args.get('wait', 0, type=float), 0), current_app.config.get('CHANGES_MAX_WAIT', 0))
+    deadline = time.monotonic() + wait
+
+    items = changes_since(since, limit)
+    while not items and time.monotonic() < deadline:
+        # Commits in this process wake us at once; other processes are seen by the re-poll
+        notifier.wait(min(1.0, deadline - time.monotonic()))
+        db.session.rollback()  # end the read transaction so new commits are visible
+        items = changes_since(since, limit)
+
+    response = jsonify(changes=items, next=items[-1]['seq'] if items else since)
+    response.cache_control.no_store = True
+    return response
+
+
+@click.command('seed-changes')
+@click.option('--batch-size', default=1000)
+def seed_changes_command(batch_size):
+    """Log an insert for every job that has no change record yet (run once when adopting the feed)."""
+    last_id = seeded = 0
+    while True:
+        jobs = Job.query.filter(Job.id > last_id).order_by(Job.id).limit(batch_size).all()
+        if not jobs:
+            break
+        logged = set(db.session.scalars(
+            db.select(JobChange.job_id).where(JobChange.job_id.in_([job.id for job in jobs]))))
+        rows = [(job.id, 'insert', snapshot(job)) for job in jobs if job.id not in logged]
+        if rows:
+            _append(db.session.connection(), rows)
+        db.session.commit()
+        seeded += len(rows)
+        last_id = jobs[-1].id
+        db.session.expunge_all()
+    click.echo(f'{seeded} jobs added to the change log.')
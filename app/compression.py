@@ -0,0 +1,190 @@
+import hashlib
+import itertools
+import zlib
+from werkzeug.datastructures import Headers
+from app.cache import TTLCache
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/javascript', 'application/xml',
+    'application/rss+xml', 'application/atom+xml', 'image/svg+xml'
+)
+
+
+class GzipEncoder:
+    name = 'gzip'
+
+    def __init__(self, level):
+        # wbits=31 writes a gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, chunk):
+        return self._compressor.compress(chunk)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder:
+    name = 'br'
+
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, chunk):
+        return self._compressor.process(chunk)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def negotiate(accept_encoding, brotli_available=brotli is not None):
+    """Pick 'br' or 'gzip' from an Accept-Encoding header, honouring q=0"""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    wildcard = accepted.get('*', 0.0)
+    candidates = (['br'] if brotli_available else []) + ['gzip']
+    best = max(candidates, key=lambda name: accepted.get(name, wildcard))
+    return best if accepted.get(best, wildcard) > 0 else None
+
+
+class CompressionMiddleware:
+    """
+    WSGI middleware compressing text responses with brotli (when installed) or gzip.
+    Buffered responses below COMPRESS_MIN_SIZE are left alone; streamed responses
+    are compressed chunk by chunk and flushed so the client still sees each chunk.
+    Compressed bodies of cacheable responses are kept in an LRU keyed by content hash.
+    """
+
+    def __init__(self, wsgi_app, config):
+        self.wsgi_app = wsgi_app
+        self.level = config.get('COMPRESS_LEVEL', 6)
+        self.br_level = config.get('COMPRESS_BR_LEVEL', 5)
+        self.min_size = config.get('COMPRESS_MIN_SIZE', 500)
+        self.cache = TTLCache(maxsize=config.get('COMPRESS_CACHE_SIZE', 128),
+                              ttl=config.get('COMPRESS_CACHE_TTL', 300))
+
+    def _encoder(self, name):
+        if name == 'br':
+            return BrotliEncoder(self.br_level)
+        return GzipEncoder(self.level)
+
+    @staticmethod
+    def _compressible(status, headers):
+        code = int(status.split(' ', 1)[0])
+        if code < 200 or code in (204, 206, 304):
+            return False
+        if 'Content-Encoding' in headers:
+            return False
+        if 'no-transform' in headers.get('Cache-Control', ''):
+            return False
+        content_type = headers.get('Content-Type', '')
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    @staticmethod
+    def _cacheable(headers):
+        cache_control = headers.get('Cache-Control', '')
+        return ('Set-Cookie' not in headers and 'private' not in cache_control
+                and 'no-store' not in cache_control)
+
+    def __call__(self, environ, start_response):
+        encoding = negotiate(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None or environ.get('REQUEST_METHOD') == 'HEAD':
+            return self.wsgi_app(environ, start_response)
+
+        captured = {}
+
+        def capture(status, headers, exc_info=None):
+            captured['status'] = status
+            captured['headers'] = Headers(headers)
+            captured['exc_info'] = exc_info
+            return captured.setdefault('written', []).append
+
+        app_iter = self.wsgi_app(environ, capture)
+        status, headers = captured['status'], captured['headers']
+
+        if not self._compressible(status, headers):
+            start_response(status, list(headers), captured['exc_info'])
+            return self._replay(captured.get('written'), app_iter)
+
+        vary = headers.get('Vary')
+        headers['Vary'] = f'{vary}, Accept-Encoding' if vary else 'Accept-Encoding'
+        if 'Content-Length' in headers:
+            return self._compress_buffered(encoding, status, headers, app_iter, captured,
+                                           start_response)
+        return self._compress_stream(encoding, status, headers, app_iter, captured,
+                                     start_response)
+
+    @staticmethod
+    def _replay(written, app_iter):
+        if not written:
+            return app_iter
+
+        def chained():
+            yield from written
+            try:
+                yield from app_iter
+            finally:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+        return chained()
+
+    def _compress_buffered(self, encoding, status, headers, app_iter, captured, start_response):
+        try:
+            body = b''.join(captured.get('written', [])) + b''.join(app_iter)
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+
+        if len(body) < self.min_size:
+            start_response(status, list(headers), captured['exc_info'])
+            return [body]
+
+        cacheable = self._cacheable(headers)
+        key = (encoding, hashlib.blake2b(body, digest_size=16).digest()) if cacheable else None
+        compressed = self.cache.get(key) if cacheable else None
+        if compressed is None:
+            encoder = self._encoder(encoding)
+            compressed = encoder.compress(body) + encoder.finish()
+            if cacheable:
+                self.cache.set(key, compressed)
+
+        headers['Content-Encoding'] = encoding
+        headers['Content-Length'] = str(len(compressed))
+        start_response(status, list(headers), captured['exc_info'])
+        return [compressed]
+
+    def _compress_stream(self, encoding, status, headers, app_iter, captured, start_response):
+        headers['Content-Encoding'] = encoding
+        start_response(status, list(headers), captured['exc_info'])
+        encoder = self._encoder(encoding)
+
+        def generate():
+            try:
+                for chunk in itertools.chain(captured.get('written', []), app_iter):
+                    if chunk:
+                        yield encoder.compress(chunk) + encoder.flush()
+                yield encoder.finish()
+            finally:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+        return generate()
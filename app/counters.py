@@ -0,0 +1,109 @@
+import atexit
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from app import db
+from app.models import Job
+
+# Popularity uses forward decay: a view at time t adds 2 ** ((t - epoch) / half_life),
+# so ordering by the stored sum equals ordering by the decayed score and a flush never
+# has to touch rows that were not viewed. At a 72 h half-life the float range lasts
+# about eight years from the epoch; moving the epoch means rescaling stored scores.
+POPULARITY_EPOCH = datetime(2024, 1, 1)
+
+
+def view_weight(when, half_life_hours):
+    hours = (when - POPULARITY_EPOCH).total_seconds() / 3600.0
+    return 2.0 ** (hours / half_life_hours)
+
+
+class ViewCounter:
+    """
+    Aggregates job views in memory and writes them in one batched transaction once
+    COUNTER_FLUSH_THRESHOLD views are pending or COUNTER_FLUSH_INTERVAL seconds have
+    passed, so job_detail does not take SQLite's write lock on every hit. A crash
+    loses at most one threshold's worth of views.
+    """
+
+    def __init__(self, app):
+        config = app.config
+        self.app = app
+        self.threshold = config.get('COUNTER_FLUSH_THRESHOLD', 100)
+        self.interval = config.get('COUNTER_FLUSH_INTERVAL', 10)
+        self.half_life = config.get('POPULARITY_HALF_LIFE_HOURS', 72)
+        self._pending = {}
+        self._pending_views = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        atexit.register(self._flush_at_exit)
+
+    def record(self, job_id):
+        with self._lock:
+            self._pending[job_id] = self._pending.get(job_id, 0) + 1
+            self._pending_views += 1
+            due = (self._pending_views >= self.threshold
+                   or time.monotonic() - self._last_flush >= self.interval)
+        if due:
+            self.flush()
+
+    def pending(self, job_id):
+        with self._lock:
+            return self._pending.get(job_id, 0)
+
+    def flush(self):
+        """Write pending views; returns the number of jobs updated"""
+        # Another thread is already writing; its batch will be followed by ours
+        if not self._flush_lock.acquire(blocking=False):
+            return 0
+        try:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._pending_views = 0
+                self._last_flush = time.monotonic()
+            if not batch:
+                return 0
+            weight = view_weight(datetime.utcnow(), self.half_life)
+            table = Job.__table__
+            statement = (db.update(table).where(table.c.id == db.bindparam('job_id'))
+                         .values(views=table.c.views + db.bindparam('count'),
+                                 popularity=table.c.popularity + db.bindparam('score')))
+            rows = [{'job_id': job_id, 'count': count, 'score': count * weight}
+                    for job_id, count in batch.items()]
+            try:
+                with db.engine.begin() as connection:
+                    connection.execute(statement, rows)
+            except Exception:
+                # Keep the views for the next attempt rather than dropping them
+                with self._lock:
+                    for job_id, count in batch.items():
+                        self._pending[job_id] = self._pending.get(job_id, 0) + count
+                        self._pending_views += count
+                raise
+            return len(rows)
+        finally:
+            self._flush_lock.release()
+
+    def _flush_at_exit(self):
+        try:
+            with self.app.app_context():
+                self.flush()
+        except Exception:
+            pass
+
+
+def get_view_counter():
+    counter = current_app.extensions.get('view_counter')
+    if counter is None:
+        counter = current_app.extensions['view_counter'] = \
+            ViewCounter(current_app._get_current_object())
+    return counter
+
+
+def record_view(job_id):
+    """Count a job_detail hit; a failed flush is logged and never breaks the page"""
+    try:
+        get_view_counter().record(job_id)
+    except Exception:
+        current_app.logger.exception('Could not flush view counters')
@@ -0,0 +1,130 @@
+import hashlib
+import random
+from array import array
+import click
+from flask import current_app
+from app import db
+from app.models import Job, JobFingerprint, JobFingerprintBand
+from app.text import tokenize
+
+NUM_HASHES = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_HASHES // BANDS
+SHINGLE_SIZE = 3
+_PRIME = (1 << 61) - 1
+
+# Fixed seed: signatures are stored, so the permutations must never change
+_rng = random.Random(20240531)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_HASHES)]
+
+
+def _hash64(data):
+    return int.from_bytes(hashlib.blake2b(data.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def shingles(text):
+    words = tokenize(text)
+    if len(words) < SHINGLE_SIZE:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash(text):
+    """MinHash signature of the word shingles of a text, or None for empty text"""
+    hashes = [_hash64(s) % _PRIME for s in shingles(text)]
+    if not hashes:
+        return None
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def band_buckets(signature):
+    """One bucket key per LSH band; near-duplicates share at least one band with high probability"""
+    buckets = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(array('Q', rows).tobytes(), digest_size=8).digest()
+        # Signed so that it fits SQLite's INTEGER
+        buckets.append((band, int.from_bytes(digest, 'big', signed=True)))
+    return buckets
+
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(1 for x, y in zip(first, second) if x == y) / NUM_HASHES
+
+
+def job_text(job):
+    return f'{job.title}\n{job.full_description}'
+
+
+def _store(job_id, signature, buckets):
+    JobFingerprint.query.filter_by(job_id=job_id).delete()
+    JobFingerprintBand.query.filter_by(job_id=job_id).delete()
+    db.session.add(JobFingerprint(job_id=job_id, signature=array('Q', signature).tobytes()))
+    db.session.add_all(JobFingerprintBand(job_id=job_id, band=band, bucket=bucket)
+                       for band, bucket in buckets)
+
+
+def fingerprint_job(job):
+    """
+    Fingerprint a flushed job, index it, and return the id of an earlier job by the
+    same author that it nearly duplicates (or None). Used by add_job, edit_job and bulk imports.
+    """
+    signature = minhash(job_text(job))
+    if signature is None:
+        return None
+    buckets = band_buckets(signature)
+    threshold = current_app.config.get('DUPLICATE_THRESHOLD', 0.8)
+
+    band_match = db.or_(*(db.and_(JobFingerprintBand.band == band, JobFingerprintBand.bucket == bucket)
+                          for band, bucket in buckets))
+    # Only the same author's older postings can be originals: other companies may share
+    # boilerplate, and an edited original must not match its own duplicates
+    candidates = db.session.execute(
+        db.select(JobFingerprint.job_id, JobFingerprint.signature)
+        .join(Job, Job.id == JobFingerprint.job_id)
+        .where(JobFingerprint.job_id.in_(
+            db.select(JobFingerprintBand.job_id).where(band_match)
+            .where(JobFingerprintBand.job_id < job.id)))
+        .where(Job.author_id == job.author_id)
+        .where(db.or_(Job.duplicate_of_id.is_(None), Job.duplicate_of_id != job.id))
+    ).all()
+
+    # Highest similarity wins; ties go to the oldest posting
+    best = max(((similarity(signature, array('Q', stored)), -candidate_id)
+                for candidate_id, stored in candidates), default=None)
+
+    _store(job.id, signature, buckets)
+    if best is None or best[0] < threshold:
+        return None
+    # Point at the canonical posting rather than at another duplicate
+    original = db.session.get(Job, -best[1])
+    canonical = original.duplicate_of_id or original.id
+    return canonical if canonical != job.id else None
+
+
+@click.command('dedupe-jobs')
+@click.option('--batch-size', default=500)
+def dedupe_jobs_command(batch_size):
+    """Rebuild fingerprints and flag near-duplicates in one streaming pass over all jobs."""
+    JobFingerprintBand.query.delete()
+    JobFingerprint.query.delete()
+    db.session.commit()
+
+    # Jobs are visited oldest first, each compared only with the ones already indexed,
+    # so the earliest posting of a vacancy stays canonical
+    last_id = 0
+    processed = flagged = 0
+    while True:
+        jobs = Job.query.filter(Job.id > last_id).order_by(Job.id).limit(batch_size).all()
+        if not jobs:
+            break
+        for job in jobs:
+            job.duplicate_of_id = fingerprint_job(job)
+            flagged += job.duplicate_of_id is not None
+        processed += len(jobs)
+        last_id = jobs[-1].id
+        db.session.commit()
+        db.session.expunge_all()
+
+    click.echo(f'{processed} jobs fingerprinted, {flagged} flagged as near-duplicates.')
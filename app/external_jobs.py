@@ -0,0 +1,95 @@
+import json
+from dataclasses import dataclass, field, fields
+from markupsafe import Markup
+from app.salary import format_salary
+
+PREVIEW_LENGTH = 180
+
+
+@dataclass(slots=True)
+class ExternalJob:
+    """
+    One Adzuna search result. Slots keep a page of results small in memory and in
+    caches; the salary string and description preview are only built when rendered.
+    """
+    id: str
+    title: str
+    company: str
+    location: str
+    description: str
+    salary_min: float = None
+    salary_max: float = None
+    salary_currency: str = None
+    category: str = 'Other'
+    contract_type: str = None
+    created: str = None
+    redirect_url: str = None
+    latitude: float = None
+    longitude: float = None
+    _salary: str = field(default=None, init=False, repr=False, compare=False)
+    _preview: str = field(default=None, init=False, repr=False, compare=False)
+
+    @classmethod
+    def from_adzuna(cls, result, currency=None):
+        return cls(
+            id=result.get('id'),
+            title=result.get('title', 'N/A'),
+            company=result.get('company', {}).get('display_name', 'N/A'),
+            location=result.get('location', {}).get('display_name', 'Georgia'),
+            description=result.get('description', 'No description available'),
+            salary_min=result.get('salary_min'),
+            salary_max=result.get('salary_max'),
+            salary_currency=currency,
+            category=result.get('category', {}).get('label', 'Other'),
+            contract_type=result.get('contract_type'),
+            created=result.get('created'),
+            redirect_url=result.get('redirect_url'),
+            latitude=result.get('latitude', 41.7151),
+            longitude=result.get('longitude', 44.8271)
+        )
+
+    @property
+    def salary(self):
+        if self._salary is None:
+            self._salary = format_salary(self.salary_min, self.salary_max, self.salary_currency)
+        return self._salary
+
+    @property
+    def preview(self):
+        """Description cut to PREVIEW_LENGTH characters with HTML tags removed"""
+        if self._preview is None:
+            text = Markup(self.description[:PREVIEW_LENGTH]).striptags()
+            self._preview = text + '...' if len(self.description) > PREVIEW_LENGTH else text
+        return self._preview
+
+    def to_tuple(self):
+        return tuple(getattr(self, name) for name in RECORD_FIELDS)
+
+    @classmethod
+    def from_tuple(cls, values):
+        return cls(*values)
+
+
+RECORD_FIELDS = tuple(f.name for f in fields(ExternalJob) if f.init)
+
+
+def pack_results(data):
+    """
+    Serialize a search_adzuna_jobs result for caches: positional JSON arrays,
+    so field names are not repeated for every job.
+    """
+    return json.dumps(
+        [data['total'], data['page'], data['results_per_page'],
+         [job.to_tuple() for job in data['jobs']]],
+        ensure_ascii=False, separators=(',', ':')
+    ).encode('utf-8')
+
+
+def unpack_results(payload):
+    total, page, results_per_page, rows = json.loads(payload)
+    return {
+        'jobs': [ExternalJob.from_tuple(row) for row in rows],
+        'total': total,
+        'page': page,
+        'results_per_page': results_per_page
+    }
@@ -0,0 +1,376 @@
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from xml.sax.saxutils import escape
+from flask import (Blueprint, Response, abort, current_app, has_app_context, has_request_context, request,
+                   stream_with_context, url_for)
+from sqlalchemy import event, inspect
+from app import db
+from app.cache import TTLCache
+from app.forms import CATEGORY_CHOICES
+from app.lookups import lookup_id
+from app.models import Job
+
+bp = Blueprint('feeds', __name__)
+
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+CATEGORIES = {value for value, _ in CATEGORY_CHOICES}
+
+
+# The fields a feed entry shows; cached feeds keep these rather than rendered XML
+FeedJob = namedtuple('FeedJob', 'id title category short_description company date_posted')
+
+
+class FeedCache:
+    """
+    Generated sitemaps and feeds by key, each kept as parts (one per job, or per
+    sitemap chunk) that job writes patch in place from the write events collected by
+    the Job mapper listeners below, so a new job does not regenerate a 50k-URL sitemap chunk.
+    A write that cannot be patched (a feed dropping below FEED_SIZE entries, a
+    document still being generated, a write outside a request) invalidates the key
+    instead. Writes in other workers and bulk changes that bypass the ORM are picked
+    up when entries expire after FEED_CACHE_TTL; at most FEED_CACHE_SIZE are kept.
+    Each version gets a new ETag, known before the body is built so the first
+    request can be streamed.
+    """
+
+    def __init__(self, ttl=300, maxsize=256):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _etag(self, key):
+        self._generation += 1
+        return f'{key}-{int(time.time())}-{self._generation}'
+
+    def invalidate(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key)
+
+    def lookup(self, key):
+        """(etag, parts) of a fresh entry, or (new etag, None) when it must be generated"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry['etag'], entry['parts']
+            etag = self._etag(key)
+            self._entries.set(key, {'etag': etag, 'parts': None})
+            return etag, None
+
+    def fill(self, key, etag, parts):
+        with self._lock:
+            entry = self._entries.get(key)
+            # Dropped if a write touched the key while it was being generated
+            if entry is not None and entry['etag'] == etag:
+                entry['parts'] = parts
+
+    def patch(self, key, update):
+        """
+        Apply update(parts) to a cached document. update returns True when it changed
+        the parts, None when it did not, and False when the document must be regenerated.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            # Copy on write: responses may still be iterating over the old parts
+            parts = dict(entry['parts']) if entry['parts'] is not None else None
+            changed = update(parts) if parts is not None else False
+            if changed is False:
+                self._entries.pop(key)
+            elif changed:
+                entry['parts'], entry['etag'] = parts, self._etag(key)
+
+
+def get_feed_cache():
+    cache = current_app.extensions.get('feed_cache')
+    if cache is None:
+        cache = current_app.extensions['feed_cache'] = FeedCache(
+            ttl=current_app.config.get('FEED_CACHE_TTL', 300),
+            maxsize=current_app.config.get('FEED_CACHE_SIZE', 256))
+    return cache
+
+
+def _feed_keys(job, category=None):
+    chunk = current_app.config.get('SITEMAP_CHUNK_SIZE', 50000)
+    category = category or job.category
+    return {'sitemap-index', f'sitemap:{job.id // chunk}', 'latest:rss', 'latest:atom',
+            f'category:{category}:rss', f'category:{category}:atom'}
+
+
+def _is_listed(job):
+    # Job.listed() without the account purge check; purged jobs are deleted anyway
+    return job.duplicate_of_id is None and (job.expires_at is None or job.expires_at > datetime.utcnow())
+
+
+def _record(job, listed, updated=False):
+    state = inspect(job)
+    events = state.session.info.setdefault('feed_events', {})
+    old_categories = events.get(job.id, (None, None, set()))[2]
+    history = state.attrs.category.history
+    old_categories |= set(history.deleted)
+    if updated and history.added and not history.deleted:
+        # The category was set on an expired job, so its old value is unknown
+        old_categories |= CATEGORIES
+    snapshot = FeedJob(job.id, job.title, job.category, job.short_description, job.company, job.date_posted)
+    events[job.id] = (snapshot, listed, old_categories)
+
+
+@event.listens_for(Job, 'after_insert')
+def _collect_feed_insert(mapper, connection, job):
+    if has_app_context():
+        _record(job, _is_listed(job))
+
+
+@event.listens_for(Job, 'after_update')
+def _collect_feed_update(mapper, connection, job):
+    if has_app_context():
+        _record(job, _is_listed(job), updated=True)
+
+
+@event.listens_for(Job, 'after_delete')
+def _collect_feed_delete(mapper, connection, job):
+    if has_app_context():
+        _record(job, False)
+
+
+def _patch_feed(parts, job, include):
+    """Put a job into a latest-jobs feed or take it out (see FeedCache.patch for the result)"""
+    size = current_app.config.get('FEED_SIZE', 50)
+    removed = parts.pop(job.id, None) is not None
+    if include:
+        parts[job.id] = job
+        if len(parts) > size:
+            del parts[min(parts, key=lambda job_id: (parts[job_id].date_posted or datetime.min, job_id))]
+        return True
+    if removed and len(parts) < size - 1:
+        return True
+    # The next job in line is unknown here; a removal from a full feed needs a query
+    return False if removed else None
+
+
+def _patch_sitemap(parts, job_id, line):
+    if line is not None:
+        parts[job_id] = line
+        return True
+    return True if parts.pop(job_id, None) is not None else None
+
+
+def _patch_sitemap_index(parts, number, posted):
+    lastmod = max(filter(None, (parts.get(number), posted)), default=None)
+    if number in parts and parts[number] == lastmod:
+        return None
+    parts[number] = lastmod
+    return True
+
+
+def _apply_feed_events(events):
+    cache = get_feed_cache()
+    chunk = current_app.config.get('SITEMAP_CHUNK_SIZE', 50000)
+    for job, listed, old_categories in events.values():
+        number = job.id // chunk
+        line = _sitemap_url(job.id, job.date_posted) if listed else None
+        # An emptied chunk stays in the index; its sitemap is then an empty urlset
+        cache.patch(f'sitemap:{number}', lambda parts: _patch_sitemap(parts, job.id, line))
+        if listed:
+            cache.patch('sitemap-index', lambda parts: _patch_sitemap_index(parts, number, job.date_posted))
+        for kind in ('rss', 'atom'):
+            cache.patch(f'latest:{kind}', lambda parts: _patch_feed(parts, job, listed))
+            for category in old_categories | {job.category}:
+                cache.patch(f'category:{category}:{kind}', lambda parts: _patch_feed(
+                    parts, job, listed and category == job.category))
+
+
+@event.listens_for(db.session, 'after_commit')
+def _update_feeds(session):
+    events = session.info.pop('feed_events', None)
+    if not events or not has_app_context():
+        return
+    if has_request_context():
+        _apply_feed_events(events)
+        return
+    # Sitemap URLs need a request to be built; commands and tasks invalidate instead
+    keys = set()
+    for job, _, old_categories in events.values():
+        keys |= _feed_keys(job)
+        for category in old_categories:
+            keys |= _feed_keys(job, category)
+    get_feed_cache().invalidate(keys)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_feed_events(session):
+    session.info.pop('feed_events', None)
+
+
+def cached_xml(key, mimetype, generate, render, order=dict.items):
+    """
+    Serve a cached document with its ETag, or stream and cache a fresh one.
+    generate() yields (part id, value) pairs from the database, order(parts) gives
+    the cached pairs in document order and render(pairs) yields the XML text.
+    """
+    cache = get_feed_cache()
+    etag, parts = cache.lookup(key)
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    elif parts is not None:
+        response = Response(''.join(render(order(parts))), mimetype=mimetype)
+    else:
+        def stream():
+            produced = {}
+
+            def record():
+                for part_id, value in generate():
+                    produced[part_id] = value
+                    yield part_id, value
+            yield from render(record())
+            cache.fill(key, etag, produced)
+        response = Response(stream_with_context(stream()), mimetype=mimetype)
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = 300
+    return response
+
+
+def _iso(value):
+    return (value or datetime.utcnow()).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _sitemap_url(job_id, posted):
+    return (f'<url><loc>{url_for("main.job_detail", id=job_id, _external=True)}</loc>'
+            f'<lastmod>{_iso(posted)}</lastmod></url>\n')
+
+
+@bp.route('/sitemap.xml')
+def sitemap_index():
+    chunk = current_app.config.get('SITEMAP_CHUNK_SIZE', 50000)
+
+    def generate():
+        yield from (Job.listed().with_entities(Job.id // chunk, db.func.max(Job.date_posted))
+                    .group_by(Job.id // chunk).order_by(Job.id // chunk))
+
+    def render(chunks):
+        yield f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{SITEMAP_NS}">\n'
+        yield f'<sitemap><loc>{url_for("feeds.sitemap_pages", _external=True)}</loc></sitemap>\n'
+        for number, lastmod in chunks:
+            yield (f'<sitemap><loc>{url_for("feeds.sitemap_chunk", number=number, _external=True)}</loc>'
+                   f'<lastmod>{_iso(lastmod)}</lastmod></sitemap>\n')
+        yield '</sitemapindex>\n'
+
+    return cached_xml('sitemap-index', 'application/xml', generate, render,
+                      order=lambda parts: sorted(parts.items()))
+
+
+@bp.route('/sitemap-pages.xml')
+def sitemap_pages():
+    def generate():
+        for endpoint in ('main.index', 'main.about', 'main.explore_jobs'):
+            yield endpoint, f'<url><loc>{url_for(endpoint, _external=True)}</loc></url>\n'
+
+    return cached_xml('sitemap-pages', 'application/xml', generate, _urlset)
+
+
+def _urlset(urls):
+    yield f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NS}">\n'
+    for _, line in urls:
+        yield line
+    yield '</urlset>\n'
+
+
+@bp.route('/sitemap-<int:number>.xml')
+def sitemap_chunk(number):
+    """Jobs with ids in [number * SITEMAP_CHUNK_SIZE, (number + 1) * SITEMAP_CHUNK_SIZE)"""
+    chunk = current_app.config.get('SITEMAP_CHUNK_SIZE', 50000)
+    last_id = db.session.scalar(db.select(db.func.max(Job.id)))
+    if last_id is None or number > last_id // chunk:
+        abort(404)
+
+    def generate():
+        rows = (Job.listed().with_entities(Job.id, Job.date_posted)
+                .filter(Job.id >= number * chunk, Job.id < (number + 1) * chunk)
+                .order_by(Job.id).execution_options(yield_per=1000))
+        for job_id, posted in rows:
+            yield job_id, _sitemap_url(job_id, posted)
+
+    return cached_xml(f'sitemap:{number}', 'application/xml', generate, _urlset)
+
+
+def _latest(category=None):
+    query = Job.listed()
+    if category:
+        # Filter on the small integer index rather than the category string
+        category_id = lookup_id('category', category)
+        if category_id is None:
+            return
+        query = query.filter(Job.category_id == category_id)
+    rows = (query.with_entities(*(getattr(Job, field) for field in FeedJob._fields))
+            .order_by(Job.date_posted.desc()).limit(current_app.config.get('FEED_SIZE', 50)))
+    for row in rows:
+        yield row.id, FeedJob(*row)
+
+
+def _newest_first(parts):
+    return sorted(parts.items(), key=lambda item: (item[1].date_posted or datetime.min, item[0]), reverse=True)
+
+
+def _rss(title, link, entries):
+    yield ('<?xml version="1.0" encoding="UTF-8"?>\n<rss version="2.0"><channel>'
+           f'<title>{escape(title)}</title><link>{escape(link)}</link>'
+           f'<description>{escape(title)}</description>\n')
+    for _, job in entries:
+        url = url_for('main.job_detail', id=job.id, _external=True)
+        posted = (job.date_posted or datetime.utcnow()).strftime('%a, %d %b %Y %H:%M:%S +0000')
+        yield (f'<item><title>{escape(job.title)}</title><link>{url}</link><guid>{url}</guid>'
+               f'<pubDate>{posted}</pubDate><category>{escape(job.category)}</category>'
+               f'<description>{escape(job.short_description)}</description></item>\n')
+    yield '</channel></rss>\n'
+
+
+def _atom(title, link, feed_url, entries):
+    jobs = [job for _, job in entries]
+    updated = _iso(jobs[0].date_posted if jobs else None)
+    yield ('<?xml version="1.0" encoding="UTF-8"?>\n<feed xmlns="http://www.w3.org/2005/Atom">'
+           f'<title>{escape(title)}</title><id>{escape(feed_url)}</id><updated>{updated}</updated>'
+           f'<link href="{escape(link)}"/><link rel="self" href="{escape(feed_url)}"/>\n')
+    for job in jobs:
+        url = url_for('main.job_detail', id=job.id, _external=True)
+        yield (f'<entry><title>{escape(job.title)}</title><id>{url}</id><link href="{url}"/>'
+               f'<updated>{_iso(job.date_posted)}</updated><author><name>{escape(job.company)}</name></author>'
+               f'<category term="{escape(job.category)}"/><summary>{escape(job.short_description)}</summary></entry>\n')
+    yield '</feed>\n'
+
+
+@bp.route('/feeds/jobs.<any(rss, atom):kind>')
+def latest_feed(kind):
+    title = 'JobBoard - ახალი ვაკანსიები'
+    link = url_for('main.index', _external=True)
+    if kind == 'rss':
+        return cached_xml('latest:rss', 'application/rss+xml', _latest,
+                          lambda entries: _rss(title, link, entries), order=_newest_first)
+    feed_url = url_for('feeds.latest_feed', kind='atom', _external=True)
+    return cached_xml('latest:atom', 'application/atom+xml', _latest,
+                      lambda entries: _atom(title, link, feed_url, entries), order=_newest_first)
+
+
+@bp.route('/feeds/category/<category>.<any(rss, atom):kind>')
+def category_feed(category, kind):
+    # Only the form's categories have feeds, so arbitrary names never reach the cache
+    if category not in CATEGORIES:
+        abort(404)
+    title = f'JobBoard - {category}'
+    link = url_for('main.index', _external=True)
+    key = f'category:{category}'
+    if kind == 'rss':
+        return cached_xml(f'{key}:rss', 'application/rss+xml', lambda: _latest(category),
+                          lambda entries: _rss(title, link, entries), order=_newest_first)
+    feed_url = url_for('feeds.category_feed', category=category, kind='atom', _external=True)
+    return cached_xml(f'{key}:atom', 'application/atom+xml', lambda: _latest(category),
+                      lambda entries: _atom(title, link, feed_url, entries), order=_newest_first)
+
+
+@bp.route('/robots.txt')
+def robots():
+    return Response(f'User-agent: *\nAllow: /\nSitemap: {url_for("feeds.sitemap_index", _external=True)}\n',
+                    mimetype='text/plain')
@@ -5,6 +5,17 @@ from wtforms.validators import DataRequired, Email, EqualTo, ValidationError, Le
 from app.models import User
 
 
+CATEGORY_CHOICES = [
+    ('IT', 'IT'),
+    ('Design', 'დიზაინი'),
+    ('Marketing', 'მარკეტინგი'),
+    ('Sales', 'გაყიდვები'),
+    ('Management', 'მენეჯმენტი'),
+    ('Finance', 'ფინანსები'),
+    ('Other', 'სხვა')
+]
+
+
 class RegistrationForm(FlaskForm):
     username = StringField('სახელი', validators=[
         DataRequired(message='სახელი აუცილებელია'),
@@ -70,18 +81,22 @@ class JobForm(FlaskForm):
         DataRequired(message='ლოკაცია აუცილებელია'),
         Length(max=100, message='ლოკაცია არ უნდა აღემატებოდეს 100 სიმბოლოს')
     ])
-    category = SelectField('კატეგორია', choices=[
-        ('IT', 'IT'),
-        ('Design', 'დიზაინი'),
-        ('Marketing', 'მარკეტინგი'),
-        ('Sales', 'გაყიდვები'),
-        ('Management', 'მენეჯმენტი'),
-        ('Finance', 'ფინანსები'),
-        ('Other', 'სხვა')
-    ], validators=[DataRequired(message='კატეგორია აუცილებელია')])
+    category = SelectField('კატეგორია', choices=CATEGORY_CHOICES,
+                           validators=[DataRequired(message='კატეგორია აუცილებელია')])
     submit = SubmitField('დამატება')
 
 
+class SavedSearchForm(FlaskForm):
+    keywords = StringField('საკვანძო სიტყვები', validators=[
+        Length(max=200, message='საკვანძო სიტყვები არ უნდა აღემატებოდეს 200 სიმბოლოს')
+    ])
+    category = SelectField('კატეგორია', choices=[('', 'ყველა')] + CATEGORY_CHOICES)
+    location = StringField('ლოკაცია', validators=[
+        Length(max=100, message='ლოკაცია არ უნდა აღემატებოდეს 100 სიმბოლოს')
+    ])
+    submit = SubmitField('ძიების შენახვა')
+
+
 class ProfileUpdateForm(FlaskForm):
     username = StringField('სახელი', validators=[
         DataRequired(message='სახელი აუცილებელია'),
@@ -0,0 +1,208 @@
+import csv
+import math
+import os
+import sqlite3
+from functools import lru_cache
+import click
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app import db
+from app.models import Job
+from app.text import tokenize
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(__file__), 'data', 'gazetteer.csv')
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+GEOHASH_PRECISION = 9
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+# Sorts after every geohash character, so [prefix, prefix + _AFTER) is a prefix range
+_AFTER = '{'
+
+
+@lru_cache(maxsize=1)
+def gazetteer():
+    """Lowercase place name (and aliases) -> (latitude, longitude)"""
+    places = {}
+    with open(GAZETTEER_PATH, encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            point = (float(row['latitude']), float(row['longitude']))
+            for name in [row['name']] + [a for a in row['aliases'].split('|') if a]:
+                places[' '.join(tokenize(name))] = point
+    return places
+
+
+def geocode(location):
+    """
+    Coordinates for a free-text location using the bundled gazetteer, or None.
+    Tries the whole string, then each comma-separated part, then single words.
+    """
+    if not location:
+        return None
+    places = gazetteer()
+    candidates = [location] + location.split(',') + tokenize(location)
+    for candidate in candidates:
+        point = places.get(' '.join(tokenize(candidate)))
+        if point:
+            return point
+    return None
+
+
+def geohash_encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, coord = (lon_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def _cell_size(precision):
+    """(height, width) of a geohash cell in degrees"""
+    lon_bits = math.ceil(5 * precision / 2)
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def geohash_neighbors(latitude, longitude, precision):
+    """Geohash of the cell containing the point and of its eight neighbours"""
+    height, width = _cell_size(precision)
+    cells = set()
+    for dlat in (-height, 0, height):
+        for dlon in (-width, 0, width):
+            lat = max(-90.0, min(90.0, latitude + dlat))
+            lon = (longitude + dlon + 180.0) % 360.0 - 180.0
+            cells.add(geohash_encode(lat, lon, precision))
+    return cells
+
+
+def search_precision(latitude, radius_km):
+    """Longest geohash prefix whose cells are at least radius_km on each side (0 = no prefilter)"""
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = _cell_size(precision)
+        height_km = height * KM_PER_DEGREE
+        width_km = width * KM_PER_DEGREE * math.cos(math.radians(latitude))
+        if min(height_km, width_km) >= radius_km:
+            return precision
+    return 0
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def geocode_job(job):
+    """Fill the coordinate and geohash columns of a job from its location"""
+    point = geocode(job.location)
+    if point is None:
+        job.latitude = job.longitude = job.geohash = None
+    else:
+        job.latitude, job.longitude = point
+        job.geohash = geohash_encode(*point)
+
+
+def distance_km(latitude, longitude):
+    """SQL expression for the haversine distance in km from a point to a job"""
+    phi1 = math.radians(latitude)
+    phi2 = db.func.radians(Job.latitude)
+    half_dphi = db.func.sin((phi2 - phi1) / 2)
+    half_dlambda = db.func.sin(db.func.radians(Job.longitude - longitude) / 2)
+    a = half_dphi * half_dphi + math.cos(phi1) * db.func.cos(phi2) * half_dlambda * half_dlambda
+    return 2 * EARTH_RADIUS_KM * db.func.asin(db.func.sqrt(a))
+
+
+def jobs_within(query, latitude, longitude, radius_km):
+    """
+    Restrict a Job query to jobs within radius_km of a point. Everything runs in SQL:
+    geohash prefix ranges narrow the candidates on the indexed column, a bounding box
+    covers radii too large for a useful prefix, and the haversine distance is exact.
+    """
+    conditions = [Job.geohash.isnot(None)]
+    precision = search_precision(latitude, radius_km)
+    if precision:
+        prefixes = geohash_neighbors(latitude, longitude, precision)
+        conditions.append(db.or_(*(
+            db.and_(Job.geohash >= prefix, Job.geohash < prefix + _AFTER) for prefix in prefixes
+        )))
+    height = radius_km / KM_PER_DEGREE
+    conditions.append(Job.latitude.between(latitude - height, latitude + height))
+    cos_lat = math.cos(math.radians(latitude))
+    if cos_lat > 0 and abs(latitude) + height < 90:
+        width = radius_km / (KM_PER_DEGREE * cos_lat)
+        if width < 180:
+            west, east = longitude - width, longitude + width
+            if west < -180:
+                conditions.append(db.or_(Job.longitude >= west + 360, Job.longitude <= east))
+            elif east > 180:
+                conditions.append(db.or_(Job.longitude >= west, Job.longitude <= east - 360))
+            else:
+                conditions.append(Job.longitude.between(west, east))
+    conditions.append(distance_km(latitude, longitude) <= radius_km)
+    return query.filter(*conditions)
+
+
+def _null_safe(func):
+    def call(value):
+        try:
+            return None if value is None else func(value)
+        except ValueError:
+            return None
+    return call
+
+
+_SQLITE_MATH = {'radians': (1, math.radians), 'sin': (1, math.sin), 'cos': (1, math.cos),
+                'asin': (1, math.asin), 'sqrt': (1, math.sqrt)}
+
+
+@event.listens_for(Engine, 'connect')
+def _register_sqlite_math(dbapi_connection, connection_record):
+    # SQLite builds without SQLITE_ENABLE_MATH_FUNCTIONS lack the functions distance_km uses
+    if type(dbapi_connection).__module__ != 'sqlite3':
+        return
+    try:
+        dbapi_connection.execute('SELECT radians(0), sin(0), cos(0), asin(0), sqrt(0)')
+    except sqlite3.OperationalError:
+        for name, (arity, func) in _SQLITE_MATH.items():
+            dbapi_connection.create_function(name, arity, _null_safe(func), deterministic=True)
+
+
+@click.command('geocode-jobs')
+@click.option('--batch-size', default=1000)
+def geocode_jobs_command(batch_size):
+    """Geocode the location of existing jobs with the bundled gazetteer."""
+    last_id = 0
+    located = processed = 0
+    while True:
+        rows = db.session.execute(
+            db.select(Job.id, Job.location).where(Job.id > last_id).order_by(Job.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        updates = []
+        for job_id, location in rows:
+            point = geocode(location)
+            if point:
+                located += 1
+                updates.append({'id': job_id, 'latitude': point[0], 'longitude': point[1],
+                                'geohash': geohash_encode(*point)})
+            else:
+                updates.append({'id': job_id, 'latitude': None, 'longitude': None, 'geohash': None})
+        db.session.execute(db.update(Job), updates)
+        db.session.commit()
+        processed += len(rows)
+        last_id = rows[-1][0]
+    click.echo(f'{processed} jobs processed, {located} located.')
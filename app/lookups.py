@@ -0,0 +1,137 @@
+import click
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from app.cache import TTLCache
+from app.models import Category, Company, Job, Location
+
+# Job string column -> lookup table holding its distinct values
+LOOKUP_FIELDS = {'company': Company, 'location': Location, 'category': Category}
+
+
+def get_intern_cache():
+    cache = current_app.extensions.get('lookup_cache')
+    if cache is None:
+        cache = current_app.extensions['lookup_cache'] = TTLCache(
+            maxsize=current_app.config.get('LOOKUP_CACHE_SIZE', 10000),
+            ttl=current_app.config.get('LOOKUP_CACHE_TTL', 3600))
+    return cache
+
+
+def _insert_missing(connection, table, names):
+    """Insert names not yet in a lookup table; rows added concurrently by another worker are skipped"""
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        statement = sqlite.insert(table).on_conflict_do_nothing(index_elements=['name'])
+    elif dialect == 'postgresql':
+        statement = postgresql.insert(table).on_conflict_do_nothing(index_elements=['name'])
+    else:
+        statement = db.insert(table)
+    connection.execute(statement, [{'name': name} for name in names])
+
+
+def intern_many(connection, field, names, info):
+    """
+    Ids of the given values of a lookup field, inserting new ones. Ids of committed
+    rows come from the per-process cache; ids created in this transaction are kept in
+    the session info and only cached once it commits, so a rollback cannot leave
+    the cache pointing at rows that do not exist.
+    """
+    table = LOOKUP_FIELDS[field].__table__
+    cache = get_intern_cache() if has_app_context() else None
+    pending = info.setdefault('pending_lookups', {})
+    ids = {}
+    for name in set(names):
+        key = (field, name)
+        found = pending.get(key) or (cache.get(key) if cache is not None else None)
+        if found:
+            ids[name] = found
+    missing = [name for name in set(names) if name not in ids]
+    if not missing:
+        return ids
+
+    def select_ids():
+        return dict(connection.execute(
+            db.select(table.c.name, table.c.id).where(table.c.name.in_(missing))).all())
+
+    existing = select_ids()
+    if cache is not None:
+        for name, found in existing.items():
+            cache.set((field, name), found)
+    new = [name for name in missing if name not in existing]
+    if new:
+        _insert_missing(connection, table, new)
+        created = select_ids()
+        for name in new:
+            pending[(field, name)] = created[name]
+        existing = created
+    ids.update(existing)
+    return ids
+
+
+def lookup_id(field, name):
+    """Id of an existing lookup value for filtering, or None if no job ever used it"""
+    cache = get_intern_cache()
+    found = cache.get((field, name))
+    if found is None:
+        model = LOOKUP_FIELDS[field]
+        found = db.session.execute(db.select(model.id).where(model.name == name)).scalar()
+        if found is not None:
+            cache.set((field, name), found)
+    return found
+
+
+@event.listens_for(Job, 'before_insert')
+@event.listens_for(Job, 'before_update')
+def _assign_lookup_ids(mapper, connection, job):
+    state = inspect(job)
+    info = state.session.info if state.session is not None else {}
+    for field in LOOKUP_FIELDS:
+        name = getattr(job, field)
+        if name is not None and (getattr(job, f'{field}_id') is None
+                                 or state.attrs[field].history.has_changes()):
+            setattr(job, f'{field}_id', intern_many(connection, field, [name], info)[name])
+
+
+@event.listens_for(db.session, 'after_commit')
+def _cache_new_lookups(session):
+    pending = session.info.pop('pending_lookups', None)
+    if pending and has_app_context():
+        cache = get_intern_cache()
+        for key, found in pending.items():
+            cache.set(key, found)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_new_lookups(session):
+    session.info.pop('pending_lookups', None)
+
+
+@click.command('normalize-lookups')
+@click.option('--batch-size', default=1000)
+def normalize_lookups_command(batch_size):
+    """Fill the lookup tables and ids of jobs that have none yet (run by build.sh after upgrade-db)."""
+    missing = db.or_(*(getattr(Job, f'{field}_id').is_(None) for field in LOOKUP_FIELDS))
+    last_id = 0
+    processed = 0
+    while True:
+        rows = db.session.execute(
+            db.select(Job.id, Job.company, Job.location, Job.category)
+            .where(Job.id > last_id, missing).order_by(Job.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        connection = db.session.connection()
+        ids = {field: intern_many(connection, field, [row[i + 1] for row in rows], db.session.info)
+               for i, field in enumerate(LOOKUP_FIELDS)}
+        db.session.execute(db.update(Job), [
+            {'id': row[0], **{f'{field}_id': ids[field][row[i + 1]] for i, field in enumerate(LOOKUP_FIELDS)}}
+            for row in rows
+        ])
+        db.session.commit()
+        processed += len(rows)
+        last_id = rows[-1][0]
+    counts = ', '.join(f'{db.session.query(model).count()} {field} values'
+                       for field, model in LOOKUP_FIELDS.items())
+    click.echo(f'{processed} jobs processed; {counts}.')
@@ -0,0 +1,172 @@
+import threading
+import time
+from datetime import datetime
+import click
+from flask import current_app
+from app import db
+from app.models import SavedSearch, SearchMatch
+from app.text import tokenize
+
+# Index key for saved searches with no criteria at all (they match every job)
+MATCH_ALL = '*'
+
+
+class SavedSearchIndex:
+    """
+    Inverted index of saved searches. Each search is filed under a single anchor
+    term that any matching job must contain, so matching a job only looks at the
+    searches filed under the job's own terms instead of every saved search.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._postings = {}
+        self._searches = {}
+        self._last_id = 0
+        self._built_at = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _criteria(search):
+        return (frozenset(tokenize(search.keywords)),
+                search.category or None,
+                frozenset(tokenize(search.location)),
+                search.user_id)
+
+    @staticmethod
+    def _anchor(keywords, category, location):
+        # Prefer the longest keyword: long words are rarer, so postings stay short
+        if keywords:
+            return max(keywords, key=len)
+        if location:
+            return 'loc:' + max(location, key=len)
+        if category:
+            return 'cat:' + category
+        return MATCH_ALL
+
+    def _build(self):
+        self._postings = {}
+        self._searches = {}
+        self._last_id = 0
+        self._load_new()
+
+    def _load_new(self):
+        # Saved searches are never edited, so rows past the newest id seen are all
+        # that other workers can have added; the cost is the number of new searches
+        for search in SavedSearch.query.filter(SavedSearch.id > self._last_id).order_by(SavedSearch.id):
+            self._add(search.id, self._criteria(search))
+            self._last_id = search.id
+        self._built_at = time.monotonic()
+
+    def _add(self, search_id, criteria):
+        self._searches[search_id] = criteria
+        anchor = self._anchor(*criteria[:3])
+        self._postings.setdefault(anchor, set()).add(search_id)
+
+    def _ensure_fresh(self):
+        # Built once per process, then periodically picks up searches saved by other workers
+        if self._built_at is None:
+            self._build()
+        elif time.monotonic() - self._built_at > self.ttl:
+            self._load_new()
+
+    def add(self, search):
+        with self._lock:
+            if self._built_at is not None:
+                self.discard(search.id)
+                self._add(search.id, self._criteria(search))
+
+    def discard(self, search_id):
+        criteria = self._searches.pop(search_id, None)
+        if criteria is not None:
+            self._postings.get(self._anchor(*criteria[:3]), set()).discard(search_id)
+
+    def remove(self, search_id):
+        with self._lock:
+            self.discard(search_id)
+
+    def match(self, job):
+        """Ids of saved searches (of other users) that the job satisfies"""
+        words = set(tokenize(job.title)) | set(tokenize(job.short_description)) | \
+            set(tokenize(job.full_description))
+        location = set(tokenize(job.location))
+        terms = words | {'loc:' + t for t in location} | {'cat:' + job.category, MATCH_ALL}
+
+        matched = []
+        with self._lock:
+            self._ensure_fresh()
+            for term in terms:
+                for search_id in self._postings.get(term, ()):
+                    keywords, category, search_location, user_id = self._searches[search_id]
+                    if user_id == job.author_id:
+                        continue
+                    if category and category != job.category:
+                        continue
+                    if keywords <= words and search_location <= location:
+                        matched.append(search_id)
+        if not matched:
+            return matched
+        # Searches deleted by other workers are only noticed here, among the matches
+        existing = set(db.session.scalars(db.select(SavedSearch.id).where(SavedSearch.id.in_(matched))))
+        for search_id in set(matched) - existing:
+            self.remove(search_id)
+        return [search_id for search_id in matched if search_id in existing]
+
+
+def get_index():
+    index = current_app.extensions.get('saved_search_index')
+    if index is None:
+        index = current_app.extensions['saved_search_index'] = SavedSearchIndex(
+            ttl=current_app.config.get('SAVED_SEARCH_INDEX_TTL', 60))
+    return index
+
+
+def match_job(job):
+    """
+    Queue outbox rows for every saved search the job matches. Call after the job is
+    flushed and before commit so the matches are written in the same transaction.
+    """
+    search_ids = get_index().match(job)
+    if not search_ids:
+        return 0
+    already = set(db.session.scalars(
+        db.select(SearchMatch.saved_search_id).where(SearchMatch.job_id == job.id)
+    ))
+    new_ids = [search_id for search_id in search_ids if search_id not in already]
+    for search_id in new_ids:
+        db.session.add(SearchMatch(saved_search_id=search_id, job_id=job.id))
+    return len(new_ids)
+
+
+def log_delivery(match):
+    current_app.logger.info(
+        f'Saved search match: job {match.job_id} for user {match.saved_search.user_id} '
+        f'(search {match.saved_search_id})'
+    )
+
+
+def deliver_matches(deliver=log_delivery, batch_size=100):
+    """Drain one batch of undelivered matches. Returns the number delivered."""
+    matches = SearchMatch.query.filter(SearchMatch.delivered_at.is_(None)) \
+        .order_by(SearchMatch.id).limit(batch_size).all()
+    for match in matches:
+        deliver(match)
+        match.delivered_at = datetime.utcnow()
+    db.session.commit()
+    return len(matches)
+
+
+@click.command('deliver-matches')
+@click.option('--loop', is_flag=True, help='Keep polling the outbox instead of exiting.')
+@click.option('--interval', default=30, help='Seconds to sleep when the outbox is empty.')
+@click.option('--batch-size', default=100)
+def deliver_matches_command(loop, interval, batch_size):
+    """Deliver saved-search matches from the outbox."""
+    while True:
+        delivered = deliver_matches(batch_size=batch_size)
+        if delivered:
+            click.echo(f'Delivered {delivered} matches.')
+            continue
+        if not loop:
+            break
+        time.sleep(interval)
@@ -1,12 +1,52 @@
 from datetime import datetime
+from flask import current_app
 from app import db, login_manager
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.passwords import hash_password, verify_password, needs_rehash, note_rehash
 
 
 @login_manager.user_loader
 def load_user(id):
-    return User.query.get(int(id))
+    cache = current_app.extensions['user_cache']
+    fields = cache.get(int(id))
+    if fields is None:
+        user = db.session.get(User, int(id))
+        if user is None or user.deleted_at is not None:
+            return None
+        fields = {name: getattr(user, name) for name in CachedUser.FIELDS}
+        cache.set(user.id, fields)
+    return CachedUser(fields)
+
+
+def invalidate_user(user_id):
+    """Drop a user from the session identity cache after profile changes or deletion"""
+    current_app.extensions['user_cache'].pop(int(user_id))
+
+
+class CachedUser(UserMixin):
+    """
+    Identity fields of a User kept in the per-process cache and used as current_user.
+    Anything else (jobs, check_password) is read from the real User, loaded on first use.
+    To change the user, load it with get_user() and call invalidate_user() after commit.
+    """
+    FIELDS = ('id', 'username', 'email', 'profile_image', 'date_created')
+
+    def __init__(self, fields):
+        self.__dict__.update(fields)
+        self._user = None
+
+    def get_user(self):
+        if self._user is None:
+            self._user = db.session.get(User, self.id)
+        return self._user
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.get_user(), name)
+
+    def __repr__(self):
+        return f'<CachedUser {self.username}>'
 
 
 class User(UserMixin, db.Model):
@@ -16,30 +56,244 @@ class User(UserMixin, db.Model):
     password_hash = db.Column(db.String(256), nullable=False)
     profile_image = db.Column(db.String(200), nullable=True, default='default.jpg')
     date_created = db.Column(db.DateTime, default=datetime.utcnow)
-    jobs = db.relationship('Job', backref='author', lazy='dynamic', cascade='all, delete-orphan')
+    # Set when the account is deleted; the user stays hidden until the purge removes the row
+    deleted_at = db.Column(db.DateTime, nullable=True)
+    # passive_deletes: never load a prolific author's jobs just to delete them
+    jobs = db.relationship('Job', backref='author', lazy='dynamic',
+                           cascade='all, delete-orphan', passive_deletes=True)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        if not verify_password(self.password_hash, password):
+            return False
+        # Upgrade hashes made with an outdated algorithm or cost; the caller commits
+        if needs_rehash(self.password_hash):
+            self.set_password(password)
+            note_rehash()
+        return True
+
+    @property
+    def is_active(self):
+        return self.deleted_at is None
+
+    def get_user(self):
+        return self
 
     def __repr__(self):
         return f'<User {self.username}>'
 
 
 class Job(db.Model):
+    # AUTOINCREMENT: ids of archived (deleted) jobs must never be handed out again
+    __table_args__ = (db.Index('ix_job_salary_currency_min', 'salary_currency', 'salary_min'),
+                      {'sqlite_autoincrement': True})
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     short_description = db.Column(db.String(300), nullable=False)
     full_description = db.Column(db.Text, nullable=False)
     company = db.Column(db.String(100), nullable=False)
     salary = db.Column(db.String(100), nullable=True)
+    # Parsed from salary by app.salary.normalize_job_salary
+    salary_min = db.Column(db.Integer, nullable=True, index=True)
+    salary_max = db.Column(db.Integer, nullable=True)
+    salary_currency = db.Column(db.String(3), nullable=True)
     location = db.Column(db.String(100), nullable=False)
+    # Geocoded from location by app.geo.geocode_job
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    geohash = db.Column(db.String(12), nullable=True, index=True)
     category = db.Column(db.String(50), nullable=False)
+    # Interned from company, location and category by app.lookups on every flush
+    company_id = db.Column(db.Integer, db.ForeignKey('company.id'), nullable=True, index=True)
+    location_id = db.Column(db.Integer, db.ForeignKey('location.id'), nullable=True, index=True)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=True, index=True)
     date_posted = db.Column(db.DateTime, default=datetime.utcnow, index=True)
-    author_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # Past this point the job leaves listings and is moved to ArchivedJob by app.archive
+    expires_at = db.Column(db.DateTime, nullable=True, index=True)
+    # Written in batches by app.counters.ViewCounter
+    views = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    popularity = db.Column(db.Float, nullable=False, default=0.0, server_default='0', index=True)
+    author_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'),
+                          nullable=False, index=True)
+    # Earlier posting this one nearly duplicates (see app.dedupe)
+    duplicate_of_id = db.Column(db.Integer, db.ForeignKey('job.id', ondelete='SET NULL'),
+                                nullable=True, index=True)
+
+    @classmethod
+    def visible(cls):
+        """Jobs that can be viewed: excludes authors whose account is being purged"""
+        return cls.query.filter(cls.author_id.notin_(AccountPurge.pending_user_ids()))
+
+    @classmethod
+    def listed(cls):
+        """Jobs shown in listings: visible, unexpired jobs that are not near-duplicates of another"""
+        return cls.visible().filter(cls.duplicate_of_id.is_(None),
+                                    db.or_(cls.expires_at.is_(None), cls.expires_at > datetime.utcnow()))
 
     def __repr__(self):
         return f'<Job {self.title}>'
 
+
+class Company(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False, unique=True)
+
+
+class Location(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False, unique=True)
+
+
+class Category(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False, unique=True)
+
+
+class ArchivedJob(db.Model):
+    """Expired job moved out of the job table; still resolvable by its original id"""
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    title = db.Column(db.String(200), nullable=False)
+    short_description = db.Column(db.String(300), nullable=False)
+    full_description = db.Column(db.Text, nullable=False)
+    company = db.Column(db.String(100), nullable=False)
+    salary = db.Column(db.String(100), nullable=True)
+    salary_min = db.Column(db.Integer, nullable=True)
+    salary_max = db.Column(db.Integer, nullable=True)
+    salary_currency = db.Column(db.String(3), nullable=True)
+    location = db.Column(db.String(100), nullable=False)
+    category = db.Column(db.String(50), nullable=False)
+    date_posted = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime)
+    views = db.Column(db.Integer, nullable=False, default=0)
+    author_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'),
+                          nullable=False, index=True)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    author = db.relationship('User')
+
+    # Columns copied from Job when archiving
+    COPIED_COLUMNS = ('id', 'title', 'short_description', 'full_description', 'company', 'salary',
+                      'salary_min', 'salary_max', 'salary_currency', 'location', 'category',
+                      'date_posted', 'expires_at', 'views', 'author_id')
+
+    @classmethod
+    def visible(cls):
+        return cls.query.filter(cls.author_id.notin_(AccountPurge.pending_user_ids()))
+
+    def __repr__(self):
+        return f'<ArchivedJob {self.title}>'
+
+
+class AccountPurge(db.Model):
+    """Progress of a background account deletion, one row per deleted account"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    username = db.Column(db.String(64), nullable=False)
+    total_jobs = db.Column(db.Integer, nullable=False, default=0)
+    deleted_jobs = db.Column(db.Integer, nullable=False, default=0)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    @classmethod
+    def pending_user_ids(cls):
+        """Subquery of users whose account is being purged"""
+        return db.select(cls.user_id).where(cls.finished_at.is_(None))
+
+    @property
+    def progress(self):
+        if self.finished_at is not None or not self.total_jobs:
+            return 1.0 if self.finished_at is not None else 0.0
+        return min(1.0, self.deleted_jobs / self.total_jobs)
+
+    def __repr__(self):
+        return f'<AccountPurge {self.username} {self.deleted_jobs}/{self.total_jobs}>'
+
+
+class SavedSearch(db.Model):
+    """Search a job seeker wants to be notified about when a matching job is posted"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'),
+                        nullable=False, index=True)
+    keywords = db.Column(db.String(200), nullable=False, default='')
+    category = db.Column(db.String(50), nullable=True)
+    location = db.Column(db.String(100), nullable=True)
+    date_created = db.Column(db.DateTime, default=datetime.utcnow)
+    user = db.relationship('User', backref=db.backref('saved_searches', lazy='dynamic',
+                                                      passive_deletes=True))
+
+    def __repr__(self):
+        return f'<SavedSearch {self.keywords!r} {self.category} {self.location}>'
+
+
+class SearchMatch(db.Model):
+    """Outbox of saved-search matches, drained by the delivery loop"""
+    __table_args__ = (db.UniqueConstraint('saved_search_id', 'job_id'),)
+    id = db.Column(db.Integer, primary_key=True)
+    saved_search_id = db.Column(db.Integer, db.ForeignKey('saved_search.id', ondelete='CASCADE'),
+                                nullable=False)
+    job_id = db.Column(db.Integer, db.ForeignKey('job.id', ondelete='CASCADE'),
+                       nullable=False, index=True)
+    date_created = db.Column(db.DateTime, default=datetime.utcnow)
+    delivered_at = db.Column(db.DateTime, nullable=True, index=True)
+    saved_search = db.relationship('SavedSearch')
+    job = db.relationship('Job')
+
+    def __repr__(self):
+        return f'<SearchMatch search={self.saved_search_id} job={self.job_id}>'
+
+
+class JobFingerprint(db.Model):
+    """MinHash signature of a job's title and description"""
+    job_id = db.Column(db.Integer, db.ForeignKey('job.id', ondelete='CASCADE'), primary_key=True)
+    signature = db.Column(db.LargeBinary, nullable=False)
+
+
+class JobFingerprintBand(db.Model):
+    """LSH band buckets of job signatures; jobs sharing a bucket are duplicate candidates"""
+    __table_args__ = (db.Index('ix_job_fingerprint_band_bucket', 'band', 'bucket'),)
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('job.id', ondelete='CASCADE'),
+                       nullable=False, index=True)
+    band = db.Column(db.SmallInteger, nullable=False)
+    bucket = db.Column(db.BigInteger, nullable=False)
+
+
+class SimilarJob(db.Model):
+    """Precomputed nearest neighbours of a job by TF-IDF cosine similarity"""
+    job_id = db.Column(db.Integer, db.ForeignKey('job.id', ondelete='CASCADE'), primary_key=True)
+    similar_id = db.Column(db.Integer, db.ForeignKey('job.id', ondelete='CASCADE'),
+                           primary_key=True, index=True)
+    score = db.Column(db.Float, nullable=False)
+
+
+class Task(db.Model):
+    """Durable background task; claimed by app.tasks workers (at-least-once delivery)"""
+    __table_args__ = (db.Index('ix_task_status_run_at', 'status', 'run_at'),)
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(64), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    # Enqueueing twice with the same key yields the existing task
+    idempotency_key = db.Column(db.String(128), nullable=True, unique=True)
+    status = db.Column(db.String(10), nullable=False, default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<Task {self.name} {self.status}>'
+
+
+class JobChange(db.Model):
+    """Append-only log of job inserts, updates and deletes for downstream mirrors"""
+    # AUTOINCREMENT: SQLite must never reuse a sequence number
+    __table_args__ = {'sqlite_autoincrement': True}
+    seq = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, nullable=False, index=True)
+    op = db.Column(db.String(6), nullable=False)
+    data = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
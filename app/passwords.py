@@ -0,0 +1,123 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from functools import lru_cache
+import click
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+_executor = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {
+    'hashes': 0,
+    'hash_seconds': 0.0,
+    'verifications': 0,
+    'verify_seconds': 0.0,
+    'timeouts': 0,
+    'rehashes': 0
+}
+
+
+class PasswordCheckTimeout(Exception):
+    """The verification pool did not check the password within PASSWORD_VERIFY_TIMEOUT"""
+
+
+def _policy():
+    """Return (method, salt_length) from the current app config"""
+    config = current_app.config
+    return (config.get('PASSWORD_HASH_METHOD', 'scrypt'),
+            config.get('PASSWORD_HASH_SALT_LENGTH', 16))
+
+
+@lru_cache(maxsize=8)
+def _method_prefix(method):
+    """Full parameter string Werkzeug writes for a method, e.g. 'scrypt:32768:8:1'"""
+    return generate_password_hash('', method=method, salt_length=1).split('$', 1)[0]
+
+
+def _record(counter, timer, started):
+    with _stats_lock:
+        _stats[counter] += 1
+        _stats[timer] += time.perf_counter() - started
+
+
+def _get_executor(workers):
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ThreadPoolExecutor(max_workers=workers,
+                                           thread_name_prefix='password-verify')
+            _executor_workers = workers
+        return _executor
+
+
+def hash_password(password):
+    """Hash a password with the configured algorithm and cost"""
+    method, salt_length = _policy()
+    started = time.perf_counter()
+    pwhash = generate_password_hash(password, method=method, salt_length=salt_length)
+    _record('hashes', 'hash_seconds', started)
+    return pwhash
+
+
+def verify_password(pwhash, password):
+    """
+    Check a password against a stored hash.
+    When PASSWORD_VERIFY_WORKERS is set, the check runs on a bounded thread pool
+    so that concurrent logins cannot use more than that many cores for hashing;
+    PasswordCheckTimeout is raised if the pool is too busy to answer in time.
+    """
+    started = time.perf_counter()
+    workers = current_app.config.get('PASSWORD_VERIFY_WORKERS', 0)
+    if workers:
+        timeout = current_app.config.get('PASSWORD_VERIFY_TIMEOUT', 10)
+        future = _get_executor(workers).submit(check_password_hash, pwhash, password)
+        try:
+            result = future.result(timeout=timeout)
+        except FutureTimeout:
+            future.cancel()  # drop it if it is still queued
+            with _stats_lock:
+                _stats['timeouts'] += 1
+            raise PasswordCheckTimeout() from None
+    else:
+        result = check_password_hash(pwhash, password)
+    _record('verifications', 'verify_seconds', started)
+    return result
+
+
+def needs_rehash(pwhash):
+    """True if the stored hash was made with a different algorithm or cost than configured"""
+    method, _ = _policy()
+    return pwhash.split('$', 1)[0] != _method_prefix(method)
+
+
+def note_rehash():
+    with _stats_lock:
+        _stats['rehashes'] += 1
+
+
+def hashing_stats():
+    """Snapshot of hashing counters and average cost in milliseconds"""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['avg_hash_ms'] = (stats['hash_seconds'] / stats['hashes'] * 1000
+                            if stats['hashes'] else 0.0)
+    stats['avg_verify_ms'] = (stats['verify_seconds'] / stats['verifications'] * 1000
+                              if stats['verifications'] else 0.0)
+    return stats
+
+
+@click.command('password-benchmark')
+@click.option('--rounds', default=5)
+def password_benchmark_command(rounds):
+    """Time hashing and verification with the configured policy, to tune PASSWORD_HASH_METHOD."""
+    for _ in range(rounds):
+        verify_password(hash_password('benchmark-password'), 'benchmark-password')
+    stats = hashing_stats()
+    click.echo(f"{_policy()[0]}: hash {stats['avg_hash_ms']:.1f} ms, "
+               f"verify {stats['avg_verify_ms']:.1f} ms (avg of {rounds})")
@@ -0,0 +1,132 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from app import api_integration
+from app.cache import TTLCache
+from app.external_jobs import pack_results, unpack_results
+from app.quota import QuotaUnavailable, get_quota
+from app.throttle import TokenBucket
+
+
+class AdzunaPrefetcher:
+    """
+    Fetches the next Adzuna results page in the background after a page is served,
+    so that clicking "next" on /explore-jobs is answered from memory.
+    """
+
+    def __init__(self, app):
+        config = app.config
+        self.app = app
+        self.results = TTLCache(maxsize=config['ADZUNA_PREFETCH_CACHE_SIZE'],
+                                ttl=config['ADZUNA_PREFETCH_TTL'])
+        self.max_workers = config['ADZUNA_PREFETCH_WORKERS']
+        self.max_pending = self.max_workers * 2
+        budget = config['ADZUNA_PREFETCH_PER_MINUTE']
+        self.budget = TokenBucket(budget, budget / 60.0, max_keys=1)
+        self._executor = None
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'scheduled': 0, 'cancelled': 0,
+                      'skipped_budget': 0, 'skipped_quota': 0, 'failed': 0, 'waited': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix='adzuna-prefetch')
+        return self._executor
+
+    def search(self, query, location, page, country):
+        """search_adzuna_jobs, answered from the prefetch store when possible"""
+        key = (country, query, location, page)
+        packed = self.results.pop(key)
+        if packed is None:
+            with self._lock:
+                future = self._pending.get(key)
+            if future is not None:
+                # The page is being prefetched right now: wait for it rather than ask twice
+                self._count('waited')
+                try:
+                    future.result()
+                except Exception:
+                    pass
+                packed = self.results.pop(key)
+        if packed is not None:
+            self._count('hits')
+            data = unpack_results(packed)
+        else:
+            self._count('misses')
+            data = api_integration.search_adzuna_jobs(query=query, location=location,
+                                                      page=page, country=country)
+        if data and page * data['results_per_page'] < data['total']:
+            self.schedule(query, location, page + 1, country)
+        return data
+
+    def schedule(self, query, location, page, country):
+        family = (country, query, location)
+        key = family + (page,)
+        with self._lock:
+            # Prefetches for other pages of this search will not be used any more
+            for pending_key, future in list(self._pending.items()):
+                if pending_key[:3] == family and pending_key != key and future.cancel():
+                    del self._pending[pending_key]
+                    self.stats['cancelled'] += 1
+            if key in self._pending or len(self._pending) >= self.max_pending:
+                return False
+            if not self.budget.consume('adzuna'):
+                self.stats['skipped_budget'] += 1
+                return False
+            # Leave the shared Adzuna quota's reserve to interactive searches
+            try:
+                available = get_quota().available('background')
+            except QuotaUnavailable:
+                available = False
+            if not available:
+                self.stats['skipped_quota'] += 1
+                return False
+            self._pending[key] = self._get_executor().submit(self._fetch, key)
+            self.stats['scheduled'] += 1
+        return True
+
+    def _fetch(self, key):
+        country, query, location, page = key
+        try:
+            with self.app.app_context():
+                data = api_integration.search_adzuna_jobs(query=query, location=location, page=page,
+                                                          country=country, priority='background')
+            if data:
+                self.results.set(key, pack_results(data))
+            else:
+                self._count('failed')
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def wait(self):
+        """Block until in-flight prefetches finish (used by tests and shutdown)"""
+        with self._lock:
+            futures = list(self._pending.values())
+        for future in futures:
+            try:
+                future.result()
+            except Exception:
+                pass
+
+
+def get_prefetcher():
+    prefetcher = current_app.extensions.get('adzuna_prefetcher')
+    if prefetcher is None:
+        prefetcher = current_app.extensions['adzuna_prefetcher'] = \
+            AdzunaPrefetcher(current_app._get_current_object())
+    return prefetcher
+
+
+def search_jobs(query='', location='', page=1, country='gb'):
+    """Entry point for routes: uses the prefetcher when enabled"""
+    if current_app.config.get('ADZUNA_PREFETCH_ENABLED', True):
+        return get_prefetcher().search(query, location, page, country)
+    return api_integration.search_adzuna_jobs(query=query, location=location,
+                                              page=page, country=country)
@@ -0,0 +1,178 @@
+import cProfile
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Set while a profiled request runs on this thread; SQL statements are counted into it
+_active = threading.local()
+_listener_installed = False
+_SAFE_NAME_RE = re.compile(r'[^A-Za-z0-9_.-]+')
+ENDPOINT_KEY = 'jobboard.profile.endpoint'
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = getattr(_active, 'queries', None)
+    if counter is not None:
+        counter[0] += 1
+
+
+def _install_query_counter():
+    global _listener_installed
+    if not _listener_installed:
+        event.listen(Engine, 'before_cursor_execute', _count_query)
+        _listener_installed = True
+
+
+def tag_profiled_request():
+    """before_request hook: hand the matched endpoint to the middleware"""
+    if getattr(_active, 'queries', None) is not None:
+        request.environ[ENDPOINT_KEY] = request.endpoint
+
+
+class StackSampler:
+    """Samples one thread's call stack on an interval into collapsed-stack counts"""
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        """Brendan Gregg's collapsed format, ready for flamegraph.pl or speedscope"""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class ProfilerMiddleware:
+    """
+    WSGI middleware profiling selected requests: those sending the PROFILE_TOKEN in
+    the X-Profile header, plus a PROFILE_SAMPLE_RATE fraction of all requests.
+    Dumps go to PROFILE_DIR (newest PROFILE_MAX_DUMPS kept) as a cProfile .prof file
+    or, with PROFILE_MODE = 'sampling', as collapsed stacks, each with a .json tag
+    file holding endpoint, SQL count and duration. Unselected requests cost one
+    header lookup and a random() call.
+    """
+
+    def __init__(self, wsgi_app, config):
+        self.wsgi_app = wsgi_app
+        self.token = config.get('PROFILE_TOKEN')
+        self.sample_rate = config.get('PROFILE_SAMPLE_RATE', 0.0)
+        self.mode = config.get('PROFILE_MODE', 'cprofile')
+        self.interval = config.get('PROFILE_SAMPLE_INTERVAL', 0.005)
+        self.directory = config['PROFILE_DIR']
+        self.max_dumps = config.get('PROFILE_MAX_DUMPS', 200)
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        _install_query_counter()
+
+    def _selected(self, environ):
+        header = environ.get('HTTP_X_PROFILE')
+        if header and self.token and hmac.compare_digest(header, self.token):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, environ, start_response):
+        if not self._selected(environ):
+            return self.wsgi_app(environ, start_response)
+
+        captured = {}
+
+        def capture(status, headers, exc_info=None):
+            captured['status'] = status
+            captured['headers'] = headers
+            captured['exc_info'] = exc_info
+            return captured.setdefault('written', []).append
+
+        _active.queries = queries = [0]
+        if self.mode == 'sampling':
+            profiler = StackSampler(threading.get_ident(), self.interval)
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        started = time.perf_counter()
+        try:
+            # The body is consumed here so streamed responses are profiled too
+            app_iter = self.wsgi_app(environ, capture)
+            try:
+                body = captured.get('written', []) + list(app_iter)
+            finally:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+        finally:
+            duration = time.perf_counter() - started
+            if self.mode == 'sampling':
+                profiler.stop()
+            else:
+                profiler.disable()
+            _active.queries = None
+
+        endpoint = environ.get(ENDPOINT_KEY) or 'unmatched'
+        tags = {
+            'endpoint': endpoint,
+            'method': environ.get('REQUEST_METHOD'),
+            'path': environ.get('PATH_INFO'),
+            'status': int(captured['status'].split(' ', 1)[0]),
+            'sql_queries': queries[0],
+            'duration_ms': round(duration * 1000, 2),
+            'mode': self.mode
+        }
+        name = self._dump(profiler, tags)
+        start_response(captured['status'], captured['headers'] + [('X-Profile-Id', name)],
+                       captured['exc_info'])
+        return body
+
+    def _dump(self, profiler, tags):
+        stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+        name = (f"{stamp}-{_SAFE_NAME_RE.sub('_', tags['endpoint'])}"
+                f"-{tags['duration_ms']:.0f}ms-{tags['sql_queries']}q")
+        path = os.path.join(self.directory, name)
+        if isinstance(profiler, StackSampler):
+            with open(path + '.collapsed', 'w', encoding='utf-8') as f:
+                f.write(profiler.collapsed())
+        else:
+            profiler.dump_stats(path + '.prof')
+        with open(path + '.json', 'w', encoding='utf-8') as f:
+            json.dump(tags, f)
+        self._rotate()
+        return name
+
+    def _rotate(self):
+        with self._lock:
+            # File names start with a timestamp, so sorting them orders dumps by age
+            dumps = sorted({os.path.splitext(f)[0] for f in os.listdir(self.directory)})
+            for old in dumps[:-self.max_dumps] if len(dumps) > self.max_dumps else []:
+                for extension in ('.prof', '.collapsed', '.json'):
+                    try:
+                        os.remove(os.path.join(self.directory, old + extension))
+                    except FileNotFoundError:
+                        pass
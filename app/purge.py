@@ -0,0 +1,73 @@
+from datetime import datetime
+import click
+from flask import current_app
+from app import db
+from app.models import User, Job, AccountPurge
+from app.tasks import enqueue, task
+from app.changes import record_deletes
+
+
+def start_account_purge(user):
+    """
+    Hide the user immediately and schedule deletion of their jobs and account.
+    The caller is responsible for logging the user out.
+    """
+    user.deleted_at = datetime.utcnow()
+    purge = AccountPurge(user_id=user.id, username=user.username,
+                         total_jobs=Job.query.filter_by(author_id=user.id).count())
+    db.session.add(purge)
+    db.session.flush()
+
+    if current_app.config.get('ACCOUNT_PURGE_ASYNC', True):
+        # Committed together with the purge row, so a restart cannot lose the purge
+        enqueue('purge_account', {'purge_id': purge.id}, key=f'purge-account-{purge.id}')
+        db.session.commit()
+    else:
+        db.session.commit()
+        run_account_purge(purge.id)
+    return purge
+
+
+@task('purge_account')
+def purge_account_task(purge_id):
+    run_account_purge(purge_id)
+
+
+def run_account_purge(purge_id):
+    """Delete the account's jobs in short batched transactions, then the user row"""
+    batch_size = current_app.config.get('ACCOUNT_PURGE_BATCH_SIZE', 500)
+    purge = db.session.get(AccountPurge, purge_id)
+    if purge is None or purge.finished_at is not None:
+        return purge
+
+    while True:
+        ids = db.session.scalars(
+            db.select(Job.id).where(Job.author_id == purge.user_id).limit(batch_size)
+        ).all()
+        if not ids:
+            break
+        db.session.execute(db.delete(Job).where(Job.id.in_(ids)))
+        record_deletes(ids, 'account_deleted')
+        purge.deleted_jobs += len(ids)
+        # Commit per batch so the write lock is released between chunks
+        db.session.commit()
+
+    db.session.execute(db.delete(User).where(User.id == purge.user_id))
+    purge.finished_at = datetime.utcnow()
+    db.session.commit()
+
+    current_app.logger.info(
+        f'Account purge finished: User {purge.username} (ID: {purge.user_id}), '
+        f'{purge.deleted_jobs} jobs'
+    )
+    return purge
+
+
+@click.command('purge-accounts')
+def purge_accounts_command():
+    """Resume account purges that did not finish (e.g. after a restart)."""
+    pending = AccountPurge.query.filter(AccountPurge.finished_at.is_(None)).all()
+    for purge in pending:
+        run_account_purge(purge.id)
+        click.echo(f'Purged {purge.username}: {purge.deleted_jobs} jobs')
+    click.echo(f'{len(pending)} pending purges processed.')
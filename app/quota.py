@@ -0,0 +1,147 @@
+import os
+import sqlite3
+import threading
+import time
+import click
+from flask import current_app
+
+
+class MemoryQuotaStore:
+    """Budget levels for a single process"""
+
+    def __init__(self):
+        self._rows = {}
+        self._lock = threading.Lock()
+
+    def transact(self, update):
+        with self._lock:
+            result, rows = update(dict(self._rows))
+            self._rows.update(rows)
+            return result
+
+
+class SQLiteQuotaStore:
+    """Budget levels in a SQLite file, updated under BEGIN IMMEDIATE so all workers share them"""
+
+    def __init__(self, path, table='adzuna_quota'):
+        self.path = path
+        self.table = table
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(f'CREATE TABLE IF NOT EXISTS {self.table} '
+                         '(name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+            self._local.conn = conn
+        return conn
+
+    def transact(self, update):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = {name: (tokens, updated) for name, tokens, updated in
+                    conn.execute(f'SELECT name, tokens, updated FROM {self.table}')}
+            result, changed = update(rows)
+            conn.executemany(f'INSERT OR REPLACE INTO {self.table} (name, tokens, updated) '
+                             'VALUES (?, ?, ?)', [(name, t, u) for name, (t, u) in changed.items()])
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return result
+
+
+class QuotaUnavailable(Exception):
+    """The quota store could not be read or written; callers treat the quota as unknown"""
+
+
+class QuotaGovernor:
+    """
+    Per-minute token bucket plus a per-day call counter for an external API quota,
+    both charged together for each call. The daily count resets at UTC midnight,
+    matching how Adzuna enforces it. Interactive calls may use the whole budget;
+    background calls only run while both budgets are above `reserve` of their
+    capacity, so prefetching cannot starve users later in the day.
+    """
+
+    def __init__(self, store, per_minute, per_day, reserve=0.25):
+        self.store = store
+        self.per_minute = float(per_minute)
+        self.per_day = per_day
+        self.reserve = reserve
+        self.stats = {'interactive': 0, 'background': 0, 'denied_interactive': 0, 'denied_background': 0}
+        self._lock = threading.Lock()
+
+    def _levels(self, rows, now):
+        tokens, updated = rows.get('minute', (self.per_minute, now))
+        minute = min(self.per_minute, tokens + max(0.0, now - updated) * self.per_minute / 60.0)
+        # The day row stores (calls made, UTC day number)
+        used, day = rows.get('day', (0, None))
+        today = int(now // 86400)
+        return {'minute': minute, 'day': self.per_day - (used if day == today else 0)}, today
+
+    def _allowed(self, levels, priority):
+        floor = self.reserve if priority == 'background' else 0.0
+        return (levels['minute'] >= 1 + self.per_minute * floor
+                and levels['day'] >= 1 + self.per_day * floor)
+
+    def _transact(self, update):
+        try:
+            return self.store.transact(update)
+        except (sqlite3.Error, OSError) as exc:
+            raise QuotaUnavailable(str(exc)) from exc
+
+    def acquire(self, priority='interactive', now=None):
+        """Charge one call to both budgets; False (nothing charged) if either is too low"""
+        now = time.time() if now is None else now
+
+        def take(rows):
+            levels, today = self._levels(rows, now)
+            if not self._allowed(levels, priority):
+                return False, {}
+            return True, {'minute': (levels['minute'] - 1, now),
+                          'day': (self.per_day - levels['day'] + 1, today)}
+
+        allowed = self._transact(take)
+        with self._lock:
+            self.stats[priority if allowed else f'denied_{priority}'] += 1
+        return allowed
+
+    def available(self, priority='interactive', now=None):
+        now = time.time() if now is None else now
+        return self._transact(lambda rows: (self._allowed(self._levels(rows, now)[0], priority), {}))
+
+    def remaining(self, now=None):
+        """Whole calls left in each budget right now"""
+        now = time.time() if now is None else now
+        levels = self._transact(lambda rows: (self._levels(rows, now)[0], {}))
+        return {name: int(left) for name, left in levels.items()}
+
+
+def get_quota():
+    quota = current_app.extensions.get('adzuna_quota')
+    if quota is None:
+        config = current_app.config
+        path = config.get('ADZUNA_QUOTA_DB')
+        store = SQLiteQuotaStore(path) if path else MemoryQuotaStore()
+        quota = current_app.extensions['adzuna_quota'] = QuotaGovernor(
+            store, config['ADZUNA_QUOTA_PER_MINUTE'], config['ADZUNA_QUOTA_PER_DAY'],
+            reserve=config.get('ADZUNA_QUOTA_BACKGROUND_RESERVE', 0.25))
+    return quota
+
+
+@click.command('adzuna-quota')
+def adzuna_quota_command():
+    """Show the Adzuna calls left in each budget, shared by all workers."""
+    try:
+        remaining = get_quota().remaining()
+    except QuotaUnavailable as e:
+        raise click.ClickException(f'Quota store unavailable: {e}')
+    for name, left in remaining.items():
+        click.echo(f'{name}: {left} calls left')
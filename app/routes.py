@@ -1,10 +1,24 @@
 import os
-from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
+from flask import Blueprint, abort, jsonify, render_template, redirect, url_for, flash, request, current_app
 from flask_login import login_required, current_user, logout_user
 from app import db
-from app.models import User, Job
-from app.forms import JobForm, ProfileUpdateForm, DeleteAccountForm
-from app.api_integration import search_adzuna_jobs
+from app.models import User, Job, AccountPurge, ArchivedJob, SavedSearch, SearchMatch, invalidate_user
+from app.forms import JobForm, ProfileUpdateForm, DeleteAccountForm, SavedSearchForm
+from app.prefetch import search_jobs
+from app.counters import record_view
+from app.similar import forget_similar_job, get_similarity_index, index_similar_job, similar_jobs
+from app.archive import job_expiry
+from app.tasks import enqueue
+from app.uploads import DEFAULT_PROFILE_IMAGE
+from app.autocomplete import FIELDS as AUTOCOMPLETE_FIELDS, get_autocomplete, job_values
+from app.streaming import Lazy, render_page, streaming_enabled
+from app.purge import start_account_purge
+from app.matching import match_job, get_index
+from app.dedupe import fingerprint_job
+from app.salary import normalize_job_salary, CURRENCY_SYMBOLS
+from app.geo import geocode, geocode_job, jobs_within
+from app.passwords import PasswordCheckTimeout
+from app.sharding import get_shards, job_table, listed_criteria, load_jobs, shard_values
 
 bp = Blueprint('main', __name__)
 
@@ -15,7 +29,7 @@ def allowed_file(filename):
 
 
 def save_picture(form_picture):
-    """Save uploaded profile picture and return filename"""
+    """Save uploaded profile picture and return filename; resizing is left to a task"""
     random_hex = os.urandom(8).hex()
     _, f_ext = os.path.splitext(form_picture.filename)
     picture_fn = random_hex + f_ext
@@ -27,21 +41,80 @@ def save_picture(form_picture):
     return picture_fn
 
 
+def get_shard_job(id):
+    """A visible job from the shards as a transient Job, or 404"""
+    row = get_shards().get(id)
+    if row is None or db.session.scalar(
+            AccountPurge.pending_user_ids().where(AccountPurge.user_id == row.author_id)) is not None:
+        abort(404)
+    return load_jobs([row])[0]
+
+
+def flash_duplicate(job):
+    """Tell the author their posting was flagged as a near-duplicate and hidden from listings"""
+    current_app.logger.info(f'Job {job.id} flagged as near-duplicate of job {job.duplicate_of_id}')
+    flash('ეს ვაკანსია თითქმის იდენტურია უკვე არსებული ვაკანსიის და სიაში არ გამოჩნდება.', 'warning')
+
+
 @bp.route('/')
 @bp.route('/index')
 def index():
     page = request.args.get('page', 1, type=int)
-    jobs_pagination = Job.query.order_by(Job.date_posted.desc()).paginate(
-        page=page, per_page=9, error_out=False)
-    return render_template('index.html', title='ვაკანსიები', jobs=jobs_pagination)
+    min_salary = request.args.get('min_salary', type=int)
+    currency = request.args.get('currency', '')
+    sort = request.args.get('sort', 'date')
+    near = request.args.get('near', '').strip()
+    radius = request.args.get('radius', 25, type=int)
+    
+    shards = get_shards()
+    if shards is not None:
+        # Sharded listings are merged on date_posted; geo search and other sorts need the primary
+        criteria = listed_criteria()
+        if currency:
+            criteria.append(job_table.c.salary_currency == currency)
+        if min_salary:
+            criteria.append(job_table.c.salary_min >= min_salary)
+        jobs_pagination = Lazy(lambda: shards.paginate(page, 9, criteria))
+        filters = {key: value for key, value in (('min_salary', min_salary), ('currency', currency))
+                   if value}
+        return render_page('index.html', title='ვაკანსიები', jobs=jobs_pagination,
+                           filters=filters, currencies=CURRENCY_SYMBOLS)
+    
+    query = Job.listed()
+    if near:
+        point = geocode(near)
+        if point:
+            query = jobs_within(query, point[0], point[1], radius)
+        else:
+            flash(f'ლოკაცია "{near}" ვერ მოიძებნა.', 'warning')
+    # Both filters use the (salary_currency, salary_min) index
+    if currency:
+        query = query.filter(Job.salary_currency == currency)
+    if min_salary:
+        query = query.filter(Job.salary_min >= min_salary)
+    if sort == 'salary':
+        query = query.order_by(Job.salary_min.desc().nulls_last(), Job.date_posted.desc())
+    elif sort == 'popular':
+        query = query.order_by(Job.popularity.desc(), Job.date_posted.desc())
+    else:
+        query = query.order_by(Job.date_posted.desc())
+    # Count and page queries run while the head of the page is already on its way
+    jobs_pagination = Lazy(lambda: query.paginate(page=page, per_page=9, error_out=False))
+    
+    filters = {key: value for key, value in
+               (('min_salary', min_salary), ('currency', currency), ('sort', sort if sort != 'date' else None),
+                ('near', near), ('radius', radius if near else None))
+               if value}
+    return render_page('index.html', title='ვაკანსიები', jobs=jobs_pagination,
+                       filters=filters, currencies=CURRENCY_SYMBOLS)
 
 
 @bp.route('/about')
 def about():
     """About page with real statistics from database"""
     # რეალური სტატისტიკა ბაზიდან
-    total_jobs = Job.query.count()
-    total_users = User.query.count()
+    total_jobs = Job.listed().count()
+    total_users = User.query.filter(User.deleted_at.is_(None)).count()
     
     stats = {
         'total_jobs': total_jobs,
@@ -59,29 +132,52 @@ def explore_jobs():
     country = request.args.get('country', 'gb')
     page = request.args.get('page', 1, type=int)
     
-    adzuna_data = search_adzuna_jobs(query=query, location=location, page=page, country=country)
-    
-    if adzuna_data:
-        return render_template('explore_jobs.html', 
-                             title='რეალური ვაკანსიები', 
-                             data=adzuna_data,
-                             query=query,
-                             location=location,
-                             country=country)
+    if streaming_enabled():
+        # The Adzuna round-trip happens after the page head has been flushed
+        adzuna_data = Lazy(lambda: search_jobs(query=query, location=location, page=page, country=country))
     else:
-        flash('ვაკანსიების ძიებისას მოხდა შეცდომა. გთხოვთ სცადოთ მოგვიანებით.', 'warning')
-        return render_template('explore_jobs.html', 
-                             title='რეალური ვაკანსიები', 
-                             data=None,
-                             query=query,
-                             location=location,
-                             country=country)
+        adzuna_data = search_jobs(query=query, location=location, page=page, country=country)
+        if not adzuna_data:
+            flash('ვაკანსიების ძიებისას მოხდა შეცდომა. გთხოვთ სცადოთ მოგვიანებით.', 'warning')
+    
+    return render_page('explore_jobs.html',
+                       title='რეალური ვაკანსიები',
+                       data=adzuna_data,
+                       query=query,
+                       location=location,
+                       country=country)
+
+
+@bp.route('/autocomplete')
+def autocomplete():
+    """Typeahead suggestions for the title, company or location of listed jobs"""
+    field = request.args.get('field', 'title')
+    prefix = request.args.get('q', '').strip()
+    limit = min(request.args.get('limit', 8, type=int), 20)
+    if field not in AUTOCOMPLETE_FIELDS:
+        return jsonify(error='unknown field'), 400
+    suggestions = get_autocomplete().suggest(field, prefix, limit) if prefix else []
+    response = jsonify(suggestions=suggestions)
+    # One request per keystroke: let the browser reuse answers for repeated prefixes
+    response.cache_control.public = True
+    response.cache_control.max_age = 60
+    return response
 
 
 @bp.route('/job/<int:id>')
 def job_detail(id):
-    job = Job.query.get_or_404(id)
-    return render_template('job_detail.html', title=job.title, job=job)
+    if get_shards() is not None:
+        job = get_shard_job(id)
+        return render_template('job_detail.html', title=job.title, job=job, similar=[])
+    job = Job.visible().filter(Job.id == id).first()
+    if job is None:
+        # Expired postings stay reachable from old links and search engines
+        job = ArchivedJob.visible().filter(ArchivedJob.id == id).first_or_404()
+        return render_template('job_detail.html', title=job.title, job=job, similar=[],
+                               archived=True)
+    record_view(job.id)
+    return render_template('job_detail.html', title=job.title, job=job,
+                           similar=similar_jobs(job.id))
 
 
 @bp.route('/add-job', methods=['GET', 'POST'])
@@ -97,13 +193,31 @@ def add_job():
             salary=form.salary.data,
             location=form.location.data,
             category=form.category.data,
-            author=current_user
+            author_id=current_user.id,
+            expires_at=job_expiry()
         )
+        normalize_job_salary(job)
+        geocode_job(job)
+        shards = get_shards()
+        if shards is not None:
+            job.id = shards.insert(shard_values(job))
+            current_app.logger.info(f'Job created: "{job.title}" by user {current_user.username}')
+            flash('ვაკანსია წარმატებით დაემატა!', 'success')
+            return redirect(url_for('main.job_detail', id=job.id))
         db.session.add(job)
+        db.session.flush()
+        job.duplicate_of_id = fingerprint_job(job)
+        if not job.duplicate_of_id:
+            match_job(job)
+            index_similar_job(job)
         db.session.commit()
+        if not job.duplicate_of_id:
+            get_autocomplete().add(job_values(job))
         
         current_app.logger.info(f'Job created: "{job.title}" by user {current_user.username}')
         flash('ვაკანსია წარმატებით დაემატა!', 'success')
+        if job.duplicate_of_id:
+            flash_duplicate(job)
         return redirect(url_for('main.job_detail', id=job.id))
     
     return render_template('add_job.html', title='ვაკანსიის დამატება', form=form)
@@ -112,7 +226,8 @@ def add_job():
 @bp.route('/job/<int:id>/edit', methods=['GET', 'POST'])
 @login_required
 def edit_job(id):
-    job = Job.query.get_or_404(id)
+    shards = get_shards()
+    job = get_shard_job(id) if shards is not None else Job.query.get_or_404(id)
     
     # Check if current user is the author
     if job.author != current_user:
@@ -124,6 +239,7 @@ def edit_job(id):
     
     form = JobForm()
     if form.validate_on_submit():
+        old_values = None if job.duplicate_of_id else job_values(job)
         job.title = form.title.data
         job.short_description = form.short_description.data
         job.full_description = form.full_description.data
@@ -131,10 +247,29 @@ def edit_job(id):
         job.salary = form.salary.data
         job.location = form.location.data
         job.category = form.category.data
+        normalize_job_salary(job)
+        geocode_job(job)
+        if shards is not None:
+            shards.update(job.id, job.author_id, shard_values(job))
+            current_app.logger.info(f'Job edited: ID {job.id} by user {current_user.username}')
+            flash('ვაკანსია წარმატებით განახლდა!', 'success')
+            return redirect(url_for('main.job_detail', id=job.id))
+        job.duplicate_of_id = fingerprint_job(job)
+        if not job.duplicate_of_id:
+            match_job(job)
+            index_similar_job(job)
+        else:
+            forget_similar_job(job)
         db.session.commit()
+        if old_values:
+            get_autocomplete().remove(old_values)
+        if not job.duplicate_of_id:
+            get_autocomplete().add(job_values(job))
         
         current_app.logger.info(f'Job edited: ID {job.id} by user {current_user.username}')
         flash('ვაკანსია წარმატებით განახლდა!', 'success')
+        if job.duplicate_of_id:
+            flash_duplicate(job)
         return redirect(url_for('main.job_detail', id=job.id))
     
     elif request.method == 'GET':
@@ -152,7 +287,8 @@ def edit_job(id):
 @bp.route('/job/<int:id>/delete', methods=['POST'])
 @login_required
 def delete_job(id):
-    job = Job.query.get_or_404(id)
+    shards = get_shards()
+    job = get_shard_job(id) if shards is not None else Job.query.get_or_404(id)
     
     # Check if current user is the author
     if job.author != current_user:
@@ -162,8 +298,18 @@ def delete_job(id):
         )
         return redirect(url_for('main.job_detail', id=job.id))
     
+    if shards is not None:
+        shards.delete(id, job.author_id)
+        current_app.logger.info(f'Job deleted: ID {id} by user {current_user.username}')
+        flash('ვაკანსია წარმატებით წაიშალა.', 'success')
+        return redirect(url_for('main.index'))
+    
+    values = None if job.duplicate_of_id else job_values(job)
     db.session.delete(job)
     db.session.commit()
+    if values:
+        get_autocomplete().remove(values)
+    get_similarity_index().remove(id)
     
     current_app.logger.info(f'Job deleted: ID {id} by user {current_user.username}')
     flash('ვაკანსია წარმატებით წაიშალა.', 'success')
@@ -173,11 +319,60 @@ def delete_job(id):
 @bp.route('/user/<username>')
 def user_jobs(username):
     page = request.args.get('page', 1, type=int)
-    user = User.query.filter_by(username=username).first_or_404()
-    jobs = Job.query.filter_by(author=user).order_by(Job.date_posted.desc()).paginate(
-        page=page, per_page=9, error_out=False)
-    return render_template('user_jobs.html', title=f'{user.username}-ის ვაკანსიები', 
-                          user=user, jobs=jobs)
+    user = User.query.filter_by(username=username, deleted_at=None).first_or_404()
+    shards = get_shards()
+    if shards is not None:
+        criteria = [job_table.c.author_id == user.id]
+        jobs = Lazy(lambda: shards.paginate(page, 9, listed_criteria() + criteria))
+        return render_page('user_jobs.html', title=f'{user.username}-ის ვაკანსიები',
+                           user=user, jobs=jobs)
+    jobs = Lazy(lambda: Job.listed().filter(Job.author_id == user.id).order_by(Job.date_posted.desc())
+                .paginate(page=page, per_page=9, error_out=False))
+    return render_page('user_jobs.html', title=f'{user.username}-ის ვაკანსიები',
+                       user=user, jobs=jobs)
+
+
+@bp.route('/saved-searches', methods=['GET', 'POST'])
+@login_required
+def saved_searches():
+    form = SavedSearchForm()
+    if form.validate_on_submit():
+        search = SavedSearch(
+            user_id=current_user.id,
+            keywords=form.keywords.data.strip(),
+            category=form.category.data or None,
+            location=form.location.data.strip() or None
+        )
+        db.session.add(search)
+        db.session.commit()
+        get_index().add(search)
+        
+        current_app.logger.info(f'Saved search created: ID {search.id} by user {current_user.username}')
+        flash('ძიება შენახულია. შეგატყობინებთ ახალი შესაბამისი ვაკანსიების შესახებ.', 'success')
+        return redirect(url_for('main.saved_searches'))
+    
+    searches = SavedSearch.query.filter_by(user_id=current_user.id) \
+        .order_by(SavedSearch.date_created.desc()).all()
+    matches = SearchMatch.query.join(SavedSearch) \
+        .filter(SavedSearch.user_id == current_user.id) \
+        .order_by(SearchMatch.date_created.desc()).limit(20).all()
+    return render_template('saved_searches.html', title='შენახული ძიებები', form=form,
+                          searches=searches, matches=matches)
+
+
+@bp.route('/saved-searches/<int:id>/delete', methods=['POST'])
+@login_required
+def delete_saved_search(id):
+    search = SavedSearch.query.get_or_404(id)
+    if search.user_id != current_user.id:
+        flash('თქვენ არ გაქვთ ამ ძიების წაშლის უფლება.', 'danger')
+        return redirect(url_for('main.saved_searches'))
+    
+    db.session.delete(search)
+    db.session.commit()
+    get_index().remove(id)
+    flash('ძიება წაიშალა.', 'success')
+    return redirect(url_for('main.saved_searches'))
 
 
 @bp.route('/profile', methods=['GET', 'POST'])
@@ -187,15 +382,20 @@ def profile():
     delete_form = DeleteAccountForm()
     
     if form.validate_on_submit():
+        user = current_user.get_user()
         if form.profile_picture.data:
             picture_file = save_picture(form.profile_picture.data)
-            current_user.profile_image = picture_file
+            if user.profile_image != DEFAULT_PROFILE_IMAGE:
+                enqueue('delete_upload', {'filename': user.profile_image})
+            user.profile_image = picture_file
+            enqueue('process_profile_image', {'filename': picture_file})
         
-        current_user.username = form.username.data
-        current_user.email = form.email.data
+        user.username = form.username.data
+        user.email = form.email.data
         db.session.commit()
+        invalidate_user(user.id)
         
-        current_app.logger.info(f'Profile updated: {current_user.username}')
+        current_app.logger.info(f'Profile updated: {user.username}')
         flash('თქვენი პროფილი წარმატებით განახლდა!', 'success')
         return redirect(url_for('main.profile'))
     
@@ -217,7 +417,12 @@ def delete_account():
     
     if form.validate_on_submit():
         # Verify password
-        if not current_user.check_password(form.password.data):
+        try:
+            valid = current_user.check_password(form.password.data)
+        except PasswordCheckTimeout:
+            flash('სერვერი ამჟამად გადატვირთულია. გთხოვთ სცადოთ მოგვიანებით.', 'danger')
+            return redirect(url_for('main.profile'))
+        if not valid:
             flash('არასწორი პაროლი. გთხოვთ სცადოთ თავიდან.', 'danger')
             return redirect(url_for('main.profile'))
         
@@ -227,27 +432,21 @@ def delete_account():
             return redirect(url_for('main.profile'))
         
         # Store username for logging before deletion
-        username = current_user.username
-        user_id = current_user.id
-        jobs_count = current_user.jobs.count()
+        user = current_user.get_user()
+        username = user.username
+        user_id = user.id
         
-        # Delete user profile image if not default
-        if current_user.profile_image != 'default.jpg':
-            try:
-                profile_pic_path = os.path.join(current_app.config['UPLOAD_FOLDER'], current_user.profile_image)
-                if os.path.exists(profile_pic_path):
-                    os.remove(profile_pic_path)
-            except Exception as e:
-                current_app.logger.error(f'Error deleting profile image: {str(e)}')
+        # The image is removed by a worker once the purge row and task are committed
+        if user.profile_image != DEFAULT_PROFILE_IMAGE:
+            enqueue('delete_upload', {'filename': user.profile_image},
+                    key=f'delete-profile-image-{user_id}')
         
-        # Logout user
+        # Hide the account now; jobs and the user row are purged in batches
+        purge = start_account_purge(user)
+        jobs_count = purge.total_jobs
+        invalidate_user(user_id)
         logout_user()
         
-        # Delete user (cascade will delete all jobs automatically)
-        user = User.query.get(user_id)
-        db.session.delete(user)
-        db.session.commit()
-        
         current_app.logger.info(
             f'Account deleted: User {username} (ID: {user_id}) and {jobs_count} jobs'
         )
@@ -0,0 +1,122 @@
+import re
+import click
+from flask import current_app
+from app import db
+from app.models import Job
+
+CURRENCY_SYMBOLS = {
+    'GEL': '₾',
+    'USD': '$',
+    'EUR': '€',
+    'GBP': '£'
+}
+
+# Currency markers as they appear in free-text salaries, checked in order
+_CURRENCY_PATTERNS = [
+    ('GEL', re.compile(r'₾|\bgel\b|ლარ|\bლ\b', re.IGNORECASE)),
+    ('USD', re.compile(r'\$|\busd\b|დოლარ', re.IGNORECASE)),
+    ('EUR', re.compile(r'€|\beur\b|ევრო', re.IGNORECASE)),
+    ('GBP', re.compile(r'£|\bgbp\b', re.IGNORECASE))
+]
+
+# Adzuna reports salaries in the currency of the searched country
+ADZUNA_CURRENCIES = {
+    'gb': 'GBP', 'us': 'USD', 'de': 'EUR', 'fr': 'EUR', 'it': 'EUR', 'nl': 'EUR',
+    'at': 'EUR', 'be': 'EUR', 'es': 'EUR', 'au': 'AUD', 'ca': 'CAD', 'pl': 'PLN',
+    'ru': 'RUB', 'in': 'INR', 'br': 'BRL', 'mx': 'MXN', 'nz': 'NZD', 'sg': 'SGD',
+    'za': 'ZAR', 'ch': 'CHF'
+}
+
+# A number with optional thousands groups ("1 500", "1,500") and "k"/"ათ" shorthand
+_NUMBER = r'(\d{1,3}(?:[\s,.\']\d{3})+(?!\d)|\d+(?:\.\d+)?)\s*(k(?![a-z])|ათ)?'
+_NUMBER_RE = re.compile(_NUMBER, re.IGNORECASE)
+# Only two numbers joined by a range separator are a range, not "2000 GEL, 5 days"
+_RANGE_RE = re.compile(_NUMBER + r'\s*(?:[-–—]\s*(?:დან)?|\bto\b|დან)\s*[$€£₾]?\s*' + _NUMBER,
+                       re.IGNORECASE)
+_UP_TO_RE = re.compile(r'\bup\s*to\b|\bmax\b|\buntil\b|მდე|მაქს', re.IGNORECASE)
+_FROM_RE = re.compile(r'\+|\bfrom\b|\bmin\b|დან|მინ', re.IGNORECASE)
+
+
+def _to_number(digits, thousands):
+    digits = re.sub(r'[\s,\']', '', digits).rstrip('.')
+    # "1.500" is a thousands separator, "1.5k" is a decimal
+    if '.' in digits and not thousands and re.fullmatch(r'\d{1,3}(\.\d{3})+', digits):
+        digits = digits.replace('.', '')
+    try:
+        value = float(digits)
+    except ValueError:
+        return None
+    return int(round(value * 1000 if thousands else value))
+
+
+def parse_salary(text, default_currency=None):
+    """
+    Parse a free-text salary into (min, max, currency).
+    Handles ranges ("1000-2000 ₾", "1000-დან 2000-მდე"), open ranges ("1500+", "from 1500", "up to 3000",
+    "3000 ლარამდე") and "k" shorthand. Unparseable text gives (None, None, None).
+    """
+    if not text:
+        return None, None, None
+    numbers = [n for n in (_to_number(d, bool(k)) for d, k in _NUMBER_RE.findall(text))
+               if n is not None]
+    if not numbers:
+        return None, None, None
+
+    currency = next((code for code, pattern in _CURRENCY_PATTERNS if pattern.search(text)),
+                    default_currency)
+    match = _RANGE_RE.search(text)
+    bounds = match and [_to_number(match.group(1), bool(match.group(2))),
+                        _to_number(match.group(3), bool(match.group(4)))]
+    if bounds and None not in bounds:
+        low, high = sorted(bounds)
+    elif _UP_TO_RE.search(text):
+        low, high = None, numbers[0]
+    elif _FROM_RE.search(text):
+        low, high = numbers[0], None
+    else:
+        low = high = numbers[0]
+    return low, high, currency
+
+
+def format_salary(salary_min, salary_max, currency):
+    """Display string for a numeric salary range"""
+    symbol = CURRENCY_SYMBOLS.get(currency, f'{currency} ' if currency else '')
+    if salary_min and salary_max:
+        return f'{symbol}{salary_min:,.0f} - {symbol}{salary_max:,.0f}'
+    elif salary_min:
+        return f'{symbol}{salary_min:,.0f}+'
+    elif salary_max:
+        return f'Up to {symbol}{salary_max:,.0f}'
+    return 'არ არის მითითებული'
+
+
+def normalize_job_salary(job):
+    """Fill the numeric salary columns of a job from its free-text salary"""
+    default_currency = current_app.config.get('SALARY_DEFAULT_CURRENCY', 'GEL')
+    job.salary_min, job.salary_max, job.salary_currency = parse_salary(job.salary, default_currency)
+
+
+@click.command('backfill-salaries')
+@click.option('--batch-size', default=1000)
+def backfill_salaries_command(batch_size):
+    """Parse the free-text salary of existing jobs into the numeric columns."""
+    default_currency = current_app.config.get('SALARY_DEFAULT_CURRENCY', 'GEL')
+    last_id = 0
+    parsed = processed = 0
+    while True:
+        rows = db.session.execute(
+            db.select(Job.id, Job.salary).where(Job.id > last_id).order_by(Job.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        updates = []
+        for job_id, salary in rows:
+            low, high, currency = parse_salary(salary, default_currency)
+            updates.append({'id': job_id, 'salary_min': low, 'salary_max': high,
+                            'salary_currency': currency})
+            parsed += currency is not None
+        db.session.execute(db.update(Job), updates)
+        db.session.commit()
+        processed += len(rows)
+        last_id = rows[-1][0]
+    click.echo(f'{processed} jobs processed, {parsed} salaries parsed.')
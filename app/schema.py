@@ -0,0 +1,65 @@
+import click
+from app import db
+
+# Columns added to tables that already existed in deployed databases, per feature.
+# db.create_all() creates new tables but never alters existing ones, so each step
+# adds whatever its columns are missing; running the upgrade again changes nothing.
+UPGRADES = [
+    ('account purge', 'user', ('deleted_at',)),
+    ('near-duplicate detection', 'job', ('duplicate_of_id',)),
+    ('salary filters', 'job', ('salary_min', 'salary_max', 'salary_currency')),
+    ('radius search', 'job', ('latitude', 'longitude', 'geohash')),
+    ('view counters', 'job', ('views', 'popularity')),
+    ('job expiry', 'job', ('expires_at',)),
+    ('lookup tables', 'job', ('company_id', 'location_id', 'category_id')),
+]
+
+
+def _column_ddl(column, dialect):
+    preparer = dialect.identifier_preparer
+    ddl = f'{preparer.quote(column.name)} {column.type.compile(dialect=dialect)}'
+    if column.server_default is not None:
+        ddl += f' DEFAULT {column.server_default.arg}'
+    if not column.nullable:
+        ddl += ' NOT NULL'
+    for foreign_key in column.foreign_keys:
+        target = foreign_key.column
+        ddl += f' REFERENCES {preparer.quote(target.table.name)} ({preparer.quote(target.name)})'
+        if foreign_key.ondelete:
+            ddl += f' ON DELETE {foreign_key.ondelete}'
+    return ddl
+
+
+def upgrade_schema():
+    """Create missing tables, then add missing columns and indexes to existing ones"""
+    db.create_all()
+    added = []
+    with db.engine.begin() as connection:
+        inspector = db.inspect(connection)
+        preparer = connection.dialect.identifier_preparer
+        existing = {}
+        for feature, table_name, columns in UPGRADES:
+            if table_name not in existing:
+                existing[table_name] = {c['name'] for c in inspector.get_columns(table_name)}
+            table = db.metadata.tables[table_name]
+            for name in columns:
+                if name in existing[table_name]:
+                    continue
+                connection.execute(db.text(f'ALTER TABLE {preparer.quote(table_name)} '
+                                           f'ADD COLUMN {_column_ddl(table.c[name], connection.dialect)}'))
+                existing[table_name].add(name)
+                added.append(f'{table_name}.{name} ({feature})')
+        for table_name in existing:
+            for index in db.metadata.tables[table_name].indexes:
+                if all(column.name in existing[table_name] for column in index.columns):
+                    index.create(connection, checkfirst=True)
+    return added
+
+
+@click.command('upgrade-db')
+def upgrade_db_command():
+    """Create new tables and add columns introduced since the database was created."""
+    added = upgrade_schema()
+    for column in added:
+        click.echo(f'Added {column}')
+    click.echo(f'Schema up to date, {len(added)} columns added.')
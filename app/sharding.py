@@ -0,0 +1,289 @@
+import hashlib
+import heapq
+import threading
+from datetime import datetime
+from itertools import islice
+import click
+import sqlalchemy as sa
+from flask import current_app
+from flask.cli import AppGroup
+from flask_sqlalchemy.pagination import Pagination
+from sqlalchemy.orm.attributes import set_committed_value
+from app import db
+from app.models import AccountPurge, Job, User
+
+shard_metadata = sa.MetaData()
+# Job's columns without the foreign keys: users, purges and fingerprints stay on the primary
+job_table = sa.Table('job', shard_metadata, *(
+    sa.Column(column.name, column.type, primary_key=column.primary_key,
+              autoincrement=False, nullable=column.nullable, index=column.index,
+              default=column.default.arg if column.default is not None else None)
+    for column in Job.__table__.columns
+))
+sa.Index('ix_job_date_posted_id', job_table.c.date_posted, job_table.c.id)
+
+# Lives on the primary database and hands out blocks of global job ids
+sequence_table = sa.Table(
+    'job_id_sequence', sa.MetaData(),
+    sa.Column('name', sa.String(32), primary_key=True),
+    sa.Column('next_value', sa.Integer, nullable=False)
+)
+
+
+def _weight(author_id, shard):
+    digest = hashlib.blake2b(f'{shard}:{author_id}'.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def shard_for(author_id, shard_count):
+    """
+    Rendezvous hashing: each author goes to the shard with the highest weight, so
+    adding a shard only moves the authors that now prefer the new one (about 1/N).
+    """
+    return max(range(shard_count), key=lambda shard: _weight(author_id, shard))
+
+
+class IdAllocator:
+    """Global job ids, reserved from the primary database in blocks per process"""
+
+    def __init__(self, engine, block_size=100):
+        self.engine = engine
+        self.block_size = block_size
+        self._next = self._end = 0
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        with self.engine.begin() as connection:
+            current = connection.execute(
+                sa.select(sequence_table.c.next_value).where(sequence_table.c.name == 'job')
+            ).scalar()
+            if current is None:
+                # Continue after the ids used before sharding was switched on
+                current = (connection.execute(sa.select(sa.func.max(Job.id))).scalar() or 0) + 1
+                connection.execute(sa.insert(sequence_table).values(
+                    name='job', next_value=current + self.block_size))
+            else:
+                connection.execute(sa.update(sequence_table).where(sequence_table.c.name == 'job')
+                                   .values(next_value=sequence_table.c.next_value + self.block_size))
+        self._next, self._end = current, current + self.block_size
+
+    def next_id(self):
+        with self._lock:
+            if self._next >= self._end:
+                self._reserve()
+            value = self._next
+            self._next += 1
+            return value
+
+
+class JobShards:
+    """
+    Jobs partitioned by author_id over the databases in JOB_SHARDS. Writes go to the
+    author's shard; listings query every shard and k-way merge on date_posted.
+    """
+
+    def __init__(self, urls, primary_engine, block_size=100):
+        self.engines = [sa.create_engine(url) for url in urls]
+        self.ids = IdAllocator(primary_engine, block_size)
+        sequence_table.create(primary_engine, checkfirst=True)
+        for engine in self.engines:
+            shard_metadata.create_all(engine)
+
+    def __len__(self):
+        return len(self.engines)
+
+    def engine_for(self, author_id):
+        return self.engines[shard_for(author_id, len(self.engines))]
+
+    def insert(self, values):
+        """Store a job on its author's shard; returns its global id"""
+        values = dict(values)
+        values.setdefault('id', self.ids.next_id())
+        with self.engine_for(values['author_id']).begin() as connection:
+            connection.execute(sa.insert(job_table).values(**values))
+        return values['id']
+
+    def update(self, job_id, author_id, values):
+        with self.engine_for(author_id).begin() as connection:
+            return connection.execute(
+                sa.update(job_table).where(job_table.c.id == job_id).values(**values)).rowcount
+
+    def delete(self, job_id, author_id):
+        with self.engine_for(author_id).begin() as connection:
+            return connection.execute(sa.delete(job_table).where(job_table.c.id == job_id)).rowcount
+
+    def get(self, job_id):
+        """A job by id; ids are global, so at most one shard has it"""
+        for engine in self.engines:
+            with engine.connect() as connection:
+                row = connection.execute(sa.select(job_table).where(job_table.c.id == job_id)).first()
+            if row is not None:
+                return row
+        return None
+
+    def count(self, *criteria):
+        total = 0
+        for engine in self.engines:
+            with engine.connect() as connection:
+                total += connection.execute(
+                    sa.select(sa.func.count()).select_from(job_table).where(*criteria)).scalar()
+        return total
+
+    def paginate(self, page=1, per_page=9, criteria=()):
+        """recent() as a Pagination, so templates can page through shards like a query"""
+        return ShardPagination(page=page, per_page=per_page, error_out=False,
+                               shards=self, criteria=tuple(criteria))
+
+    def recent(self, page=1, per_page=9, criteria=()):
+        """
+        One page of jobs, newest first, across all shards. Each shard returns at most
+        page * per_page rows already in order; heapq.merge interleaves them lazily.
+        """
+        limit = page * per_page
+        streams = []
+        for engine in self.engines:
+            with engine.connect() as connection:
+                streams.append(connection.execute(
+                    sa.select(job_table).where(*criteria)
+                    .order_by(job_table.c.date_posted.desc(), job_table.c.id.desc()).limit(limit)
+                ).all())
+        merged = heapq.merge(*streams, key=lambda row: (row.date_posted, row.id), reverse=True)
+        return list(islice(merged, limit - per_page, limit))
+
+    def rebalance(self, batch_size=500):
+        """Move every row that is not on its author's shard; returns the number moved"""
+        moved = 0
+        for source_index, source in enumerate(self.engines):
+            last_id = 0
+            while True:
+                with source.connect() as connection:
+                    rows = connection.execute(
+                        sa.select(job_table).where(job_table.c.id > last_id)
+                        .order_by(job_table.c.id).limit(batch_size)).all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+                targets = {}
+                for row in rows:
+                    target = shard_for(row.author_id, len(self.engines))
+                    if target != source_index:
+                        targets.setdefault(target, []).append(row._asdict())
+                for target, batch in targets.items():
+                    ids = [values['id'] for values in batch]
+                    # Copy first, then delete: an interrupted run leaves duplicates, never losses
+                    with self.engines[target].begin() as connection:
+                        present = set(connection.execute(
+                            sa.select(job_table.c.id).where(job_table.c.id.in_(ids))).scalars())
+                        fresh = [values for values in batch if values['id'] not in present]
+                        if fresh:
+                            connection.execute(sa.insert(job_table), fresh)
+                    with source.begin() as connection:
+                        connection.execute(sa.delete(job_table).where(job_table.c.id.in_(ids)))
+                    moved += len(batch)
+        return moved
+
+
+class ShardPagination(Pagination):
+    """One page of JobShards.recent(), loaded as Job objects"""
+
+    def _query_items(self):
+        args = self._query_args
+        return load_jobs(args['shards'].recent(self.page, self.per_page, args['criteria']))
+
+    def _query_count(self):
+        return self._query_args['shards'].count(*self._query_args['criteria'])
+
+
+def listed_criteria():
+    """Job.listed() as conditions on job_table; purges are read from the primary first"""
+    pending = db.session.scalars(AccountPurge.pending_user_ids()).all()
+    return [job_table.c.author_id.notin_(pending), job_table.c.duplicate_of_id.is_(None),
+            sa.or_(job_table.c.expires_at.is_(None), job_table.c.expires_at > datetime.utcnow())]
+
+
+def shard_values(job):
+    """The columns of a Job to store on a shard; unset ones fall back to the column defaults"""
+    values = {column.name: getattr(job, column.name) for column in job_table.columns}
+    return {name: value for name, value in values.items() if value is not None}
+
+
+def load_jobs(rows):
+    """
+    Shard rows as transient Job objects with their author attached, for templates. They
+    are never added to the session: writes go back through JobShards.
+    """
+    authors = {}
+    author_ids = {row.author_id for row in rows}
+    if author_ids:
+        authors = {user.id: user for user in User.query.filter(User.id.in_(author_ids))}
+    jobs = []
+    for row in rows:
+        job = Job(**row._asdict())
+        set_committed_value(job, 'author', authors.get(row.author_id))
+        jobs.append(job)
+    return jobs
+
+
+def get_shards():
+    """The app's JobShards, or None when JOB_SHARDS is not configured"""
+    shards = current_app.extensions.get('job_shards')
+    if shards is None and current_app.config.get('JOB_SHARDS'):
+        shards = current_app.extensions['job_shards'] = JobShards(
+            current_app.config['JOB_SHARDS'], db.engine,
+            current_app.config.get('JOB_ID_BLOCK_SIZE', 100))
+    return shards
+
+
+shards_cli = AppGroup('shards', help='Manage the job shards configured in JOB_SHARDS.')
+
+
+def _require_shards():
+    shards = get_shards()
+    if shards is None:
+        raise click.ClickException('JOB_SHARDS is not configured.')
+    return shards
+
+
+@shards_cli.command('import')
+@click.option('--batch-size', default=500)
+def import_command(batch_size):
+    """Copy jobs from the primary database onto their shards."""
+    shards = _require_shards()
+    columns = [Job.__table__.c[column.name] for column in job_table.columns]
+    last_id = copied = 0
+    while True:
+        rows = db.session.execute(
+            sa.select(*columns).where(Job.id > last_id).order_by(Job.id).limit(batch_size)).all()
+        if not rows:
+            break
+        by_shard = {}
+        for row in rows:
+            by_shard.setdefault(shard_for(row.author_id, len(shards)), []).append(row._asdict())
+        for index, batch in by_shard.items():
+            with shards.engines[index].begin() as connection:
+                present = set(connection.execute(sa.select(job_table.c.id).where(
+                    job_table.c.id.in_([values['id'] for values in batch]))).scalars())
+                fresh = [values for values in batch if values['id'] not in present]
+                if fresh:
+                    connection.execute(sa.insert(job_table), fresh)
+                copied += len(fresh)
+        last_id = rows[-1].id
+    click.echo(f'{copied} jobs copied to {len(shards)} shards.')
+
+
+@shards_cli.command('rebalance')
+@click.option('--batch-size', default=500)
+def rebalance_command(batch_size):
+    """Move jobs to the shard their author maps to (after adding or removing a shard URL)."""
+    moved = _require_shards().rebalance(batch_size)
+    click.echo(f'{moved} jobs moved.')
+
+
+@shards_cli.command('stats')
+def stats_command():
+    """Show how many jobs each shard holds."""
+    shards = _require_shards()
+    for index, engine in enumerate(shards.engines):
+        with engine.connect() as connection:
+            count = connection.execute(sa.select(sa.func.count()).select_from(job_table)).scalar()
+        click.echo(f'shard {index} ({engine.url.render_as_string(hide_password=True)}): {count} jobs')
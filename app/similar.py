@@ -0,0 +1,229 @@
+import heapq
+import math
+import threading
+import time
+from collections import Counter
+import click
+from flask import current_app
+from app import db
+from app.models import Job, SimilarJob
+from app.tasks import enqueue, task
+from app.text import tokenize
+
+# Terms kept per job vector; the low-weight tail barely moves cosine scores
+MAX_TERMS = 64
+TITLE_WEIGHT = 2
+
+
+def term_counts(title, short_description, full_description):
+    counts = Counter(tokenize(short_description))
+    counts.update(tokenize(full_description))
+    for term in tokenize(title):
+        counts[term] += TITLE_WEIGHT
+    return counts
+
+
+class SimilarityIndex:
+    """
+    Sparse TF-IDF vectors of listed jobs with an inverted index over their terms.
+    Scoring a vector against every job is a sparse matrix-vector product: only the
+    postings of the vector's own terms are visited.
+    """
+
+    def __init__(self, k=5, ttl=3600):
+        self.k = k
+        self.ttl = ttl
+        self._df = Counter()
+        self._docs = 0
+        self._vectors = {}
+        self._terms = {}
+        self._postings = {}
+        self._built_at = None
+        self._lock = threading.RLock()
+
+    def _rows(self, batch_size=1000):
+        last_id = 0
+        while True:
+            rows = (Job.listed().order_by(Job.id).filter(Job.id > last_id).limit(batch_size)
+                    .with_entities(Job.id, Job.title, Job.short_description, Job.full_description)
+                    .all())
+            if not rows:
+                return
+            yield from rows
+            last_id = rows[-1][0]
+
+    def build(self):
+        counts = {job_id: term_counts(title, short, full) for job_id, title, short, full in self._rows()}
+        self._df = Counter()
+        for terms in counts.values():
+            self._df.update(terms.keys())
+        self._docs = len(counts)
+        self._terms = {job_id: frozenset(terms) for job_id, terms in counts.items()}
+        self._vectors = {}
+        self._postings = {}
+        for job_id, terms in counts.items():
+            self._insert(job_id, self.vectorize(terms))
+        self._built_at = time.monotonic()
+
+    def ensure_fresh(self):
+        # Rebuild periodically to pick up other workers' jobs and current idf values
+        with self._lock:
+            if self._built_at is None or time.monotonic() - self._built_at > self.ttl:
+                self.build()
+
+    def vectorize(self, counts):
+        """L2-normalised TF-IDF vector (sublinear tf, smoothed idf) as a dict"""
+        weights = {term: (1 + math.log(tf)) * (math.log((self._docs + 1) / (self._df[term] + 1)) + 1)
+                   for term, tf in counts.items()}
+        if len(weights) > MAX_TERMS:
+            weights = dict(heapq.nlargest(MAX_TERMS, weights.items(), key=lambda item: item[1]))
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        return {term: w / norm for term, w in weights.items()} if norm else {}
+
+    def _insert(self, job_id, vector):
+        self._vectors[job_id] = vector
+        for term, weight in vector.items():
+            self._postings.setdefault(term, {})[job_id] = weight
+
+    def _discard(self, job_id):
+        for term in self._vectors.pop(job_id, {}):
+            self._postings[term].pop(job_id, None)
+
+    def _count_terms(self, job_id, terms):
+        """Replace a job's contribution to the document frequencies (terms=None removes it)"""
+        old = self._terms.pop(job_id, None)
+        if old is not None:
+            self._docs -= 1
+            for term in old:
+                self._df[term] -= 1
+                if self._df[term] <= 0:
+                    del self._df[term]
+        if terms is not None:
+            self._terms[job_id] = frozenset(terms)
+            self._df.update(self._terms[job_id])
+            self._docs += 1
+
+    def scores(self, vector, exclude=None):
+        scores = Counter()
+        for term, weight in vector.items():
+            for other_id, other_weight in self._postings.get(term, {}).items():
+                scores[other_id] += weight * other_weight
+        scores.pop(exclude, None)
+        return scores
+
+    def neighbors(self, job_id, vector=None):
+        vector = self._vectors.get(job_id, {}) if vector is None else vector
+        return heapq.nlargest(self.k, self.scores(vector, exclude=job_id).items(),
+                              key=lambda item: item[1])
+
+    def update(self, job):
+        """Re-vectorise one job and return (its neighbours, scores of the others against it)"""
+        with self._lock:
+            self._discard(job.id)
+            counts = term_counts(job.title, job.short_description, job.full_description)
+            self._count_terms(job.id, counts)
+            vector = self.vectorize(counts)
+            scores = self.scores(vector, exclude=job.id)
+            self._insert(job.id, vector)
+        return heapq.nlargest(self.k, scores.items(), key=lambda item: item[1]), scores
+
+    def remove(self, job_id):
+        with self._lock:
+            self._discard(job_id)
+            self._count_terms(job_id, None)
+
+
+def get_similarity_index():
+    index = current_app.extensions.get('similarity_index')
+    if index is None:
+        index = current_app.extensions['similarity_index'] = SimilarityIndex(
+            k=current_app.config.get('SIMILAR_JOBS_COUNT', 5),
+            ttl=current_app.config.get('SIMILAR_JOBS_INDEX_TTL', 3600))
+    return index
+
+
+def _store_neighbors(job_id, neighbors):
+    SimilarJob.query.filter_by(job_id=job_id).delete()
+    db.session.add_all(SimilarJob(job_id=job_id, similar_id=other_id, score=score)
+                       for other_id, score in neighbors if score > 0)
+
+
+def index_similar_job(job):
+    """
+    Add or re-vectorise one flushed job in this worker's index and store its own
+    neighbours; offering it to the lists of the jobs it resembles is left to the
+    task queue. Call before commit so the rows and the task go out with the job.
+    """
+    neighbors, _ = get_similarity_index().update(job)
+    _store_neighbors(job.id, neighbors)
+    enqueue('offer_similar_job', {'job_id': job.id})
+
+
+@task('offer_similar_job')
+def offer_similar_job(job_id):
+    """Put a job into the neighbour lists of the jobs it scores highest against"""
+    job = db.session.get(Job, job_id)
+    if job is None or job.duplicate_of_id:
+        return
+    index = get_similarity_index()
+    # The worker may run in another process; its index is rebuilt here, off the request path
+    index.ensure_fresh()
+    neighbors, scores = index.update(job)
+    _store_neighbors(job.id, neighbors)
+
+    # Other jobs keep their top k; the new job replaces their weakest neighbour if it
+    # scores higher. Only the best-scoring jobs are considered, which bounds the IN list.
+    fanout = current_app.config.get('SIMILAR_JOBS_FANOUT', 200)
+    candidates = heapq.nlargest(fanout, ((other_id, score) for other_id, score in scores.items()
+                                         if score > 0), key=lambda item: item[1])
+    SimilarJob.query.filter_by(similar_id=job.id).delete()
+    lists = {}
+    if candidates:
+        for row in SimilarJob.query.filter(SimilarJob.job_id.in_([c for c, _ in candidates])):
+            lists.setdefault(row.job_id, []).append(row)
+    for other_id, score in candidates:
+        rows = lists.get(other_id, [])
+        if len(rows) < index.k:
+            db.session.add(SimilarJob(job_id=other_id, similar_id=job.id, score=score))
+            continue
+        weakest = min(rows, key=lambda row: row.score)
+        if score > weakest.score:
+            db.session.delete(weakest)
+            db.session.add(SimilarJob(job_id=other_id, similar_id=job.id, score=score))
+    db.session.commit()
+
+
+def forget_similar_job(job):
+    """Drop a job that is no longer listed (e.g. now flagged as a duplicate)"""
+    get_similarity_index().remove(job.id)
+    SimilarJob.query.filter(db.or_(SimilarJob.job_id == job.id,
+                                   SimilarJob.similar_id == job.id)).delete()
+
+
+def similar_jobs(job_id):
+    """Listed jobs most similar to a job, best first"""
+    return (Job.listed().join(SimilarJob, SimilarJob.similar_id == Job.id)
+            .filter(SimilarJob.job_id == job_id)
+            .order_by(SimilarJob.score.desc()).all())
+
+
+@click.command('similar-jobs')
+@click.option('--batch-size', default=500)
+def similar_jobs_command(batch_size):
+    """Rebuild the TF-IDF index and precompute similar jobs for every listed job."""
+    index = get_similarity_index()
+    with index._lock:
+        index.build()
+        SimilarJob.query.delete()
+        db.session.commit()
+        job_ids = sorted(index._vectors)
+        stored = 0
+        for start in range(0, len(job_ids), batch_size):
+            rows = [{'job_id': job_id, 'similar_id': other_id, 'score': score}
+                    for job_id in job_ids[start:start + batch_size]
+                    for other_id, score in index.neighbors(job_id) if score > 0]
+            if rows:
+                db.session.execute(db.insert(SimilarJob), rows)
+            db.session.commit()
+            stored += len(rows)
+    click.echo(f'{len(job_ids)} jobs indexed, {stored} similar-job links stored.')
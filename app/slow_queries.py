@@ -0,0 +1,94 @@
+import hashlib
+import time
+from collections import deque
+from flask import has_request_context, request
+from sqlalchemy import event
+from app.cache import TTLCache
+
+_EXPLAIN_PREFIX = {'sqlite': 'EXPLAIN QUERY PLAN ', 'postgresql': 'EXPLAIN '}
+
+
+def is_full_scan(dialect, plan):
+    """Whether a query plan reads a whole table rather than an index range"""
+    for line in plan:
+        if dialect == 'sqlite':
+            # "SCAN job" is a table scan; "SCAN job USING INDEX ..." walks an index
+            if line.startswith('SCAN ') and ' USING ' not in line:
+                return True
+        elif 'Seq Scan on' in line:
+            return True
+    return False
+
+
+class SlowQueryLog:
+    """
+    Times every statement on an engine and logs those slower than SLOW_QUERY_THRESHOLD_MS
+    with their parameters and originating route. The query plan of each distinct slow
+    SELECT is captured once and full table scans are flagged. The most recent slow
+    statements are kept in records for inspection.
+    """
+
+    def __init__(self, app, engine):
+        self.logger = app.logger
+        self.threshold = app.config.get('SLOW_QUERY_THRESHOLD_MS', 200) / 1000.0
+        self.explain = app.config.get('SLOW_QUERY_EXPLAIN', True)
+        self.records = deque(maxlen=app.config.get('SLOW_QUERY_HISTORY', 100))
+        # Plans by statement hash; expiring lets a plan be re-checked after schema changes
+        self.plans = TTLCache(maxsize=1024, ttl=3600)
+        self.dialect = engine.dialect.name
+        event.listen(engine, 'before_cursor_execute', self._before)
+        event.listen(engine, 'after_cursor_execute', self._after)
+        event.listen(engine, 'handle_error', self._failed)
+
+    @staticmethod
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @staticmethod
+    def _failed(context):
+        started = context.connection.info.get('query_started') if context.connection else None
+        if started:
+            started.pop()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info['query_started'].pop()
+        if duration < self.threshold:
+            return
+
+        route = f'{request.endpoint} {request.method} {request.path}' if has_request_context() else '-'
+        plan, full_scan = None, False
+        if self.explain and not executemany and statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            plan = self._plan(conn, statement, parameters)
+            full_scan = plan is not None and is_full_scan(self.dialect, plan)
+
+        record = {'statement': statement, 'parameters': repr(parameters)[:500],
+                  'duration_ms': round(duration * 1000, 2), 'route': route,
+                  'plan': plan, 'full_scan': full_scan}
+        self.records.append(record)
+        self.logger.warning(
+            f"Slow query ({record['duration_ms']} ms) from {route}"
+            f"{' [FULL SCAN]' if full_scan else ''}: {statement} -- params {record['parameters']}"
+            + (f"\n  plan: {' | '.join(plan)}" if plan else '')
+        )
+
+    def _plan(self, conn, statement, parameters):
+        prefix = _EXPLAIN_PREFIX.get(self.dialect)
+        if prefix is None:
+            return None
+        key = hashlib.blake2b(statement.encode('utf-8'), digest_size=16).digest()
+        plan = self.plans.get(key)
+        if plan is not None:
+            return plan
+        # A raw DBAPI cursor, so the EXPLAIN does not pass through these listeners
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters)
+            # SQLite rows are (id, parent, notused, detail); Postgres rows are one text column
+            plan = [str(row[-1]) for row in cursor.fetchall()]
+        except Exception as exc:
+            self.logger.debug(f'EXPLAIN failed: {exc}')
+            plan = []
+        finally:
+            cursor.close()
+        self.plans.set(key, plan)
+        return plan
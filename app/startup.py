@@ -0,0 +1,54 @@
+import os
+import time
+from jinja2 import FileSystemBytecodeCache
+from sqlalchemy import text
+
+
+class StartupTimer:
+    """Records how long each create_app phase takes"""
+
+    def __init__(self):
+        self.phases = []
+        self._started = self._last = time.perf_counter()
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self._last) * 1000))
+        self._last = now
+
+    @property
+    def total_ms(self):
+        return (self._last - self._started) * 1000
+
+    def report(self):
+        parts = ', '.join(f'{phase} {ms:.1f}ms' for phase, ms in self.phases)
+        return f'Startup took {self.total_ms:.1f}ms ({parts})'
+
+
+def configure_bytecode_cache(app):
+    """Keep compiled templates on disk so new workers skip Jinja compilation"""
+    directory = app.config.get('JINJA_BYTECODE_CACHE_DIR')
+    if not directory:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    cache = FileSystemBytecodeCache(directory)
+    app.jinja_options = {**app.jinja_options, 'bytecode_cache': cache}
+    return cache
+
+
+def warm_up(app):
+    """Compile every template and open a database connection before serving traffic"""
+    from app import db
+
+    templates = app.jinja_env.list_templates(filter_func=lambda name: name.endswith('.html'))
+    for name in templates:
+        app.jinja_env.get_template(name)
+
+    with app.app_context():
+        try:
+            db.session.execute(text('SELECT 1'))
+        except Exception as e:
+            app.logger.warning(f'Warm-up could not reach the database: {str(e)}')
+        finally:
+            db.session.remove()
+    return len(templates)
@@ -0,0 +1,88 @@
+from flask import Response, current_app, g, get_flashed_messages, stream_template, stream_with_context
+from markupsafe import Markup
+from app import db
+
+FLUSH_MARKER = Markup('<!--stream-flush-->')
+ERROR_FRAGMENT = ('<div class="container my-4"><div class="alert alert-danger" role="alert">'
+                  'გვერდის ჩატვირთვისას მოხდა შეცდომა. გთხოვთ სცადოთ თავიდან.</div></div>')
+
+
+class Lazy:
+    """Proxy that calls its factory on first use, so queries run while the page streams"""
+    __slots__ = ('_factory', '_value', '_loaded')
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._loaded = False
+        self._value = None
+
+    def _get(self):
+        if not self._loaded:
+            self._value = self._factory()
+            self._loaded = True
+        return self._value
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+    def __getitem__(self, key):
+        # Jinja falls back to item access for `data.total` on dicts
+        return self._get()[key]
+
+    def __bool__(self):
+        return bool(self._get())
+
+    def __iter__(self):
+        return iter(self._get())
+
+    def __len__(self):
+        return len(self._get())
+
+
+def streaming_enabled():
+    return current_app.config.get('STREAM_TEMPLATES', True)
+
+
+def stream_flush():
+    """Template global: marks the point where buffered output is sent to the client"""
+    return FLUSH_MARKER if g.get('streaming_template') else ''
+
+
+def render_page(template_name, **context):
+    """
+    render_template, or a streamed response when STREAM_TEMPLATES is on. The head and
+    navigation are flushed at stream_flush() in base.html, before Lazy values load.
+    Streamed templates must not change the session while rendering: headers are gone.
+    """
+    if not streaming_enabled():
+        from flask import render_template
+        return render_template(template_name, **context)
+
+    # Pop flashes now so the session cookie update goes out with the headers
+    get_flashed_messages(with_categories=True)
+    g.streaming_template = True
+    buffer_size = current_app.config.get('STREAM_BUFFER_SIZE', 8192)
+
+    def generate():
+        buffered, size = [], 0
+        try:
+            for chunk in stream_template(template_name, **context):
+                if chunk is FLUSH_MARKER or chunk == FLUSH_MARKER:
+                    if buffered:
+                        yield ''.join(buffered)
+                    buffered, size = [], 0
+                    continue
+                buffered.append(chunk)
+                size += len(chunk)
+                if size >= buffer_size:
+                    yield ''.join(buffered)
+                    buffered, size = [], 0
+            if buffered:
+                yield ''.join(buffered)
+        except Exception:
+            # The 200 status is already sent; log it like a 500 and end the page visibly
+            current_app.logger.exception(f'Error while streaming {template_name}')
+            db.session.rollback()
+            yield ''.join(buffered) + ERROR_FRAGMENT
+
+    return Response(stream_with_context(generate()), mimetype='text/html')
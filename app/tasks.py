@@ -0,0 +1,184 @@
+import json
+import random
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from app.models import Task
+
+TASKS = {}
+
+
+def task(name):
+    """Register a function as a task handler; it receives the payload as keyword arguments"""
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def enqueue(name, payload=None, key=None, delay=0, max_attempts=None):
+    """
+    Add a task to the caller's transaction; it becomes visible to workers when the
+    caller commits. With a key, an existing task with that key is returned instead.
+    """
+    if name not in TASKS:
+        raise KeyError(f'Unknown task {name!r}')
+    values = dict(name=name, payload=json.dumps(payload or {}), idempotency_key=key,
+                  run_at=datetime.utcnow() + timedelta(seconds=delay),
+                  max_attempts=max_attempts or current_app.config.get('TASK_MAX_ATTEMPTS', 5))
+    dialect = db.session.get_bind().dialect.name
+    if key is not None and dialect in ('sqlite', 'postgresql'):
+        # No savepoint around a plain INSERT: pysqlite would commit the caller's
+        # transaction on RELEASE. ON CONFLICT makes a concurrent enqueue with the same
+        # key wait for the other transaction and then skip the row instead of failing.
+        insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        db.session.execute(insert(Task).values(**values)
+                           .on_conflict_do_nothing(index_elements=['idempotency_key']))
+        return Task.query.filter_by(idempotency_key=key).one()
+    if key is not None:
+        existing = Task.query.filter_by(idempotency_key=key).first()
+        if existing is not None:
+            return existing
+    new_task = Task(**values)
+    db.session.add(new_task)
+    return new_task
+
+
+def _claim(now):
+    """Lease the next due task, or a running one whose visibility timeout passed"""
+    timeout = timedelta(seconds=current_app.config.get('TASK_VISIBILITY_TIMEOUT', 300))
+    expired = db.and_(Task.status == 'running', Task.locked_until < now)
+    # A worker that died on the last attempt leaves nothing to retry
+    db.session.execute(
+        db.update(Task).where(expired, Task.attempts >= Task.max_attempts)
+        .values(status='failed', finished_at=now, locked_until=None,
+                last_error=db.func.coalesce(Task.last_error, 'Visibility timeout expired'))
+    )
+    due = db.and_(Task.attempts < Task.max_attempts,
+                  db.or_(db.and_(Task.status == 'queued', Task.run_at <= now), expired))
+    candidates = db.session.scalars(db.select(Task.id).where(due).order_by(Task.run_at).limit(5)).all()
+    for task_id in candidates:
+        # Conditional update: only one worker can move a given row out of the due state
+        claimed = db.session.execute(
+            db.update(Task).where(Task.id == task_id, due)
+            .values(status='running', locked_until=now + timeout, attempts=Task.attempts + 1)
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return db.session.get(Task, task_id)
+    db.session.commit()
+    return None
+
+
+def backoff_seconds(attempts):
+    base = current_app.config.get('TASK_RETRY_BASE', 10)
+    cap = current_app.config.get('TASK_RETRY_MAX', 3600)
+    delay = min(cap, base * 2 ** (attempts - 1))
+    return delay + random.uniform(0, delay / 10)
+
+
+def run_next():
+    """Claim and run one task; returns it, or None when nothing is due"""
+    now = datetime.utcnow()
+    claimed = _claim(now)
+    if claimed is None:
+        return None
+    task_id, name, payload = claimed.id, claimed.name, json.loads(claimed.payload)
+    try:
+        TASKS[name](**payload)
+    except Exception:
+        db.session.rollback()
+        claimed = db.session.get(Task, task_id)
+        claimed.last_error = traceback.format_exc(limit=5)
+        if claimed.attempts >= claimed.max_attempts:
+            claimed.status = 'failed'
+            claimed.finished_at = datetime.utcnow()
+            current_app.logger.error(f'Task {name} ({task_id}) failed after {claimed.attempts} attempts')
+        else:
+            claimed.status = 'queued'
+            claimed.run_at = datetime.utcnow() + timedelta(seconds=backoff_seconds(claimed.attempts))
+            current_app.logger.warning(f'Task {name} ({task_id}) failed, retry {claimed.attempts}')
+    else:
+        claimed = db.session.get(Task, task_id)
+        claimed.status = 'done'
+        claimed.finished_at = datetime.utcnow()
+    claimed.locked_until = None
+    db.session.commit()
+    return claimed
+
+
+def run_pending():
+    """Run tasks until none are due; used by `flask worker --burst` and tests"""
+    processed = 0
+    while run_next() is not None:
+        processed += 1
+    return processed
+
+
+class Worker:
+    """Pool of threads polling the task table"""
+
+    def __init__(self, app, threads=1):
+        self.app = app
+        self.threads = threads
+        self.poll_interval = app.config.get('TASK_POLL_INTERVAL', 1.0)
+        self._stop = threading.Event()
+        self._pool = []
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self.app.app_context():
+                try:
+                    ran = run_next()
+                except Exception:
+                    self.app.logger.exception('Task worker error')
+                    db.session.rollback()
+                    ran = None
+                finally:
+                    db.session.remove()
+            if ran is None:
+                self._stop.wait(self.poll_interval)
+
+    def start(self):
+        for n in range(self.threads):
+            thread = threading.Thread(target=self._run, name=f'task-worker-{n}', daemon=True)
+            thread.start()
+            self._pool.append(thread)
+
+    def stop(self, wait=True):
+        self._stop.set()
+        if wait:
+            for thread in self._pool:
+                thread.join()
+
+
+def start_embedded_worker():
+    """before_request hook: run TASK_EMBEDDED_WORKERS threads inside the web process"""
+    app = current_app._get_current_object()
+    threads = app.config.get('TASK_EMBEDDED_WORKERS', 0)
+    if threads and 'task_worker' not in app.extensions:
+        worker = app.extensions['task_worker'] = Worker(app, threads)
+        worker.start()
+
+
+@click.command('worker')
+@click.option('--threads', default=2, help='Worker threads in this process.')
+@click.option('--burst', is_flag=True, help='Exit once no task is due.')
+def worker_command(threads, burst):
+    """Run background tasks from the durable queue."""
+    if burst:
+        click.echo(f'{run_pending()} tasks processed.')
+        return
+    worker = Worker(current_app._get_current_object(), threads)
+    worker.start()
+    click.echo(f'Worker running with {threads} threads; Ctrl+C to stop.')
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        worker.stop()
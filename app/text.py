@@ -0,0 +1,10 @@
+import re
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    """Lowercase word tokens of a string (Georgian and Latin alike)"""
+    if not text:
+        return []
+    return _WORD_RE.findall(text.lower())
@@ -0,0 +1,152 @@
+import sqlite3
+import threading
+import time
+from flask import current_app
+
+
+class TokenBucket:
+    """In-memory token buckets keyed by string, safe across threads of one worker"""
+
+    def __init__(self, capacity, refill_per_second, max_keys=100000):
+        self.capacity = float(capacity)
+        self.refill = float(refill_per_second)
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.refill)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._evict(now)
+            return allowed
+
+    def _evict(self, now):
+        # Buckets that have refilled completely carry no information
+        full = [k for k, (tokens, updated) in self._buckets.items()
+                if tokens + (now - updated) * self.refill >= self.capacity]
+        for key in full:
+            del self._buckets[key]
+        # Still over the cap under a flood of distinct keys: drop the oldest half
+        if len(self._buckets) > self.max_keys:
+            oldest = sorted(self._buckets, key=lambda k: self._buckets[k][1])
+            for key in oldest[:len(oldest) // 2]:
+                del self._buckets[key]
+
+
+class SQLiteTokenBucket:
+    """Token buckets stored in a SQLite file so that all gunicorn workers share them"""
+
+    def __init__(self, path, capacity, refill_per_second, table='login_bucket'):
+        self.path = path
+        self.capacity = float(capacity)
+        self.refill = float(refill_per_second)
+        self.table = table
+        self._local = threading.local()
+        self._connection().execute(
+            f'CREATE TABLE IF NOT EXISTS {self.table} '
+            '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+        )
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def consume(self, key, now=None):
+        # Wall clock: monotonic time is not comparable between processes
+        now = time.time() if now is None else now
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(f'SELECT tokens, updated FROM {self.table} WHERE key = ?',
+                               (key,)).fetchone()
+            tokens, updated = row if row else (self.capacity, now)
+            tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.refill)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            conn.execute(f'INSERT OR REPLACE INTO {self.table} (key, tokens, updated) '
+                         'VALUES (?, ?, ?)', (key, tokens, now))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return allowed
+
+
+class LoginThrottle:
+    """
+    Per-IP and per-account login budgets, checked before the user lookup and
+    password hash so that rejected attempts cost no database or CPU work.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        path = config.get('LOGIN_THROTTLE_DB')
+        if path:
+            ip = SQLiteTokenBucket(path, config['LOGIN_RATE_IP_BURST'],
+                                   config['LOGIN_RATE_IP_PER_SECOND'], table='login_bucket_ip')
+            email = SQLiteTokenBucket(path, config['LOGIN_RATE_EMAIL_BURST'],
+                                      config['LOGIN_RATE_EMAIL_PER_SECOND'], table='login_bucket_email')
+        else:
+            ip = TokenBucket(config['LOGIN_RATE_IP_BURST'], config['LOGIN_RATE_IP_PER_SECOND'])
+            email = TokenBucket(config['LOGIN_RATE_EMAIL_BURST'], config['LOGIN_RATE_EMAIL_PER_SECOND'])
+        app.extensions['login_throttle'] = {
+            'ip': ip,
+            'email': email,
+            'stats': {'allowed': 0, 'rejected_ip': 0, 'rejected_email': 0},
+            'reported': {'allowed': 0, 'rejected_ip': 0, 'rejected_email': 0},
+            'reported_at': time.monotonic(),
+            'lock': threading.Lock()
+        }
+
+    def _state(self):
+        return current_app.extensions['login_throttle']
+
+    def allow(self, ip, email):
+        """Consume one attempt for this IP and email. Returns False if either is over budget."""
+        if not current_app.config.get('LOGIN_THROTTLE_ENABLED', True):
+            return True
+        state = self._state()
+        if not state['ip'].consume(ip or 'unknown'):
+            outcome = 'rejected_ip'
+        elif not state['email'].consume((email or '').strip().lower()):
+            outcome = 'rejected_email'
+        else:
+            outcome = 'allowed'
+        with state['lock']:
+            state['stats'][outcome] += 1
+            report = self._due_report(state)
+        if report:
+            current_app.logger.info(report)
+        return outcome == 'allowed'
+
+    def _due_report(self, state):
+        """Log line with this worker's counts since the last one, once per LOGIN_THROTTLE_LOG_INTERVAL"""
+        now = time.monotonic()
+        if now - state['reported_at'] < current_app.config.get('LOGIN_THROTTLE_LOG_INTERVAL', 300):
+            return None
+        delta = {name: count - state['reported'][name] for name, count in state['stats'].items()}
+        state['reported'], state['reported_at'] = dict(state['stats']), now
+        return (f"Login throttle: {delta['allowed']} allowed, {delta['rejected_ip']} rejected by IP, "
+                f"{delta['rejected_email']} rejected by email")
+
+    def stats(self):
+        """Totals of this worker since it started"""
+        state = self._state()
+        with state['lock']:
+            return dict(state['stats'])
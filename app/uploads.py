@@ -0,0 +1,40 @@
+import os
+from flask import current_app
+from app.tasks import task
+
+try:
+    from PIL import Image
+except ImportError:  # optional dependency
+    Image = None
+
+PROFILE_IMAGE_SIZE = (400, 400)
+DEFAULT_PROFILE_IMAGE = 'default.jpg'
+
+
+def upload_path(filename):
+    # basename: task payloads must never reach outside the upload folder
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], os.path.basename(filename))
+
+
+@task('process_profile_image')
+def process_profile_image(filename):
+    """Shrink an uploaded profile picture in place (needs Pillow; skipped without it)"""
+    path = upload_path(filename)
+    if Image is None or not os.path.exists(path):
+        return
+    with Image.open(path) as image:
+        if image.width <= PROFILE_IMAGE_SIZE[0] and image.height <= PROFILE_IMAGE_SIZE[1]:
+            return
+        image.thumbnail(PROFILE_IMAGE_SIZE)
+        image.save(path)
+
+
+@task('delete_upload')
+def delete_upload(filename):
+    """Remove an uploaded file; already-missing files count as done"""
+    if not filename or filename == DEFAULT_PROFILE_IMAGE:
+        return
+    try:
+        os.remove(upload_path(filename))
+    except FileNotFoundError:
+        pass
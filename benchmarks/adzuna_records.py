@@ -0,0 +1,100 @@
+"""
+Memory and (de)serialization cost of Adzuna results: the old 14-key dicts with an
+eagerly formatted salary versus ExternalJob records and pack_results().
+
+    python benchmarks/adzuna_records.py
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.external_jobs import ExternalJob, pack_results, unpack_results  # noqa: E402
+from app.salary import format_salary  # noqa: E402
+
+RESULTS = 50
+ROUNDS = 200
+
+
+def adzuna_result(i):
+    return {
+        'id': str(4000000000 + i),
+        'title': f'Senior Python Developer {i}',
+        'company': {'display_name': 'Acme Software Ltd'},
+        'location': {'display_name': 'London, UK'},
+        'description': 'We are looking for an experienced engineer to build and run our '
+                       'platform. ' * 4,
+        'salary_min': 50000 + i,
+        'salary_max': 70000 + i,
+        'category': {'label': 'IT Jobs'},
+        'contract_type': 'permanent',
+        'created': '2024-05-01T10:00:00Z',
+        'redirect_url': f'https://www.adzuna.co.uk/jobs/land/ad/{4000000000 + i}',
+        'latitude': 51.5074,
+        'longitude': -0.1278
+    }
+
+
+def as_dict(result):
+    job = {
+        'id': result.get('id'),
+        'title': result.get('title', 'N/A'),
+        'company': result.get('company', {}).get('display_name', 'N/A'),
+        'location': result.get('location', {}).get('display_name', 'Georgia'),
+        'description': result.get('description', 'No description available'),
+        'salary_min': result.get('salary_min'),
+        'salary_max': result.get('salary_max'),
+        'category': result.get('category', {}).get('label', 'Other'),
+        'contract_type': result.get('contract_type'),
+        'created': result.get('created'),
+        'redirect_url': result.get('redirect_url'),
+        'latitude': result.get('latitude', 41.7151),
+        'longitude': result.get('longitude', 44.8271)
+    }
+    job['salary'] = format_salary(job['salary_min'], job['salary_max'], 'GBP')
+    return job
+
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    jobs = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    return jobs, total
+
+
+def throughput(func, payload):
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        func(payload)
+    return ROUNDS * RESULTS / (time.perf_counter() - started)
+
+
+def main():
+    raw = [adzuna_result(i) for i in range(RESULTS)]
+    # Share the description strings so only per-record overhead is measured
+    dicts, dict_bytes = measure(lambda: [as_dict(r) for r in raw])
+    records, record_bytes = measure(lambda: [ExternalJob.from_adzuna(r, 'GBP') for r in raw])
+
+    dict_payload = json.dumps({'jobs': dicts, 'total': 1000, 'page': 1,
+                               'results_per_page': RESULTS}).encode('utf-8')
+    data = {'jobs': records, 'total': 1000, 'page': 1, 'results_per_page': RESULTS}
+    packed = pack_results(data)
+
+    print(f'{"":28}{"dict":>14}{"ExternalJob":>14}')
+    print(f'{"memory per result (bytes)":28}{dict_bytes / RESULTS:>14.0f}{record_bytes / RESULTS:>14.0f}')
+    print(f'{"cached size per result":28}{len(dict_payload) / RESULTS:>14.0f}{len(packed) / RESULTS:>14.0f}')
+    print(f'{"parse (results/s)":28}{throughput(json.loads, dict_payload):>14,.0f}'
+          f'{throughput(unpack_results, packed):>14,.0f}')
+    print(f'{"serialize (results/s)":28}'
+          f'{throughput(lambda d: json.dumps(d).encode("utf-8"), {"jobs": dicts}):>14,.0f}'
+          f'{throughput(pack_results, data):>14,.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,9 @@ set -o errexit
 
 pip install -r requirements.txt
 
-# Initialize database
-python -c "from app import create_app, db; app = create_app(); app.app_context().push(); db.create_all(); print('Database initialized!')"
-
+# Initialize the database, or add tables and columns introduced since it was created
+flask --app run upgrade-db
+# Intern company, location and category of jobs stored before the lookup tables
+flask --app run normalize-lookups
+# Date jobs stored before expiry existed and archive the ones already past it
+flask --app run archive-jobs
@@ -12,8 +12,141 @@ class Config:
     UPLOAD_FOLDER = os.path.join(basedir, 'app', 'static', 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+
+    # Fast startup: compiled templates persisted on disk, optional warm-up before serving
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get('JINJA_BYTECODE_CACHE_DIR',
+                                              os.path.join(basedir, 'instance', 'jinja_cache'))
+    STARTUP_WARMUP = os.environ.get('STARTUP_WARMUP', '0') == '1'
+
+    # Response compression (brotli is used when the optional package is installed)
+    COMPRESS_ENABLED = True
+    COMPRESS_LEVEL = 6
+    COMPRESS_BR_LEVEL = 5
+    COMPRESS_MIN_SIZE = 500
+    COMPRESS_CACHE_SIZE = 128
+    COMPRESS_CACHE_TTL = 300
+
+    # Job lifecycle: expired jobs leave listings and are archived by the sweeper
+    JOB_LIFETIME_DAYS = 60
+    JOB_ARCHIVE_BATCH_SIZE = 500
+    JOB_SWEEP_INTERVAL = int(os.environ.get('JOB_SWEEP_INTERVAL', '3600'))  # 0 = cron only
+
+    # Optional sharding of jobs by author_id: comma-separated database URLs
+    JOB_SHARDS = [url.strip() for url in os.environ.get('JOB_SHARD_URLS', '').split(',') if url.strip()]
+    JOB_ID_BLOCK_SIZE = 100
+
+    # Sitemaps and RSS/Atom feeds, invalidated by job writes
+    SITEMAP_CHUNK_SIZE = 50000
+    FEED_SIZE = 50
+    FEED_CACHE_TTL = 300
+    FEED_CACHE_SIZE = 256
+
+    # /changes feed (SQLite only): page size and longest long-poll, in seconds. A
+    # waiting poll holds a worker thread; with the default sync/threaded gunicorn
+    # workers keep this at 0 and only raise it with async workers (-k gevent)
+    CHANGES_PAGE_SIZE = 500
+    CHANGES_MAX_WAIT = float(os.environ.get('CHANGES_MAX_WAIT', '0'))
+
+    # Durable task queue; workers run via `flask worker` and/or inside the web process
+    TASK_EMBEDDED_WORKERS = int(os.environ.get('TASK_EMBEDDED_WORKERS', '1'))
+    TASK_POLL_INTERVAL = 1.0
+    TASK_VISIBILITY_TIMEOUT = 300
+    TASK_MAX_ATTEMPTS = 5
+    TASK_RETRY_BASE = 10
+    TASK_RETRY_MAX = 3600
+
+    # Statements slower than the threshold are logged with their query plan
+    SLOW_QUERY_LOG_ENABLED = True
+    SLOW_QUERY_THRESHOLD_MS = int(os.environ.get('SLOW_QUERY_THRESHOLD_MS', '200'))
+    SLOW_QUERY_EXPLAIN = True
+    SLOW_QUERY_HISTORY = 100
+
+    # Request profiling: requests carrying X-Profile: <PROFILE_TOKEN>, plus a sample
+    PROFILE_ENABLED = os.environ.get('PROFILE_ENABLED', '0') == '1'
+    PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+    PROFILE_MODE = os.environ.get('PROFILE_MODE', 'cprofile')  # or 'sampling'
+    PROFILE_SAMPLE_INTERVAL = 0.005
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(basedir, 'instance', 'profiles'))
+    PROFILE_MAX_DUMPS = 200
+
+    # Stream index, user_jobs and explore_jobs instead of rendering them in memory
+    STREAM_TEMPLATES = True
+    STREAM_BUFFER_SIZE = 8192
+
+    # Job view counters, flushed in batches
+    COUNTER_FLUSH_THRESHOLD = 100
+    COUNTER_FLUSH_INTERVAL = 10
+    POPULARITY_HALF_LIFE_HOURS = 72
+
+    # In-memory typeahead index over job titles, companies and locations
+    AUTOCOMPLETE_MAX_VALUES = 5000
+    AUTOCOMPLETE_INDEX_TTL = 300
+
+    # Precomputed TF-IDF "similar jobs" on job_detail
+    SIMILAR_JOBS_COUNT = 5
+    SIMILAR_JOBS_INDEX_TTL = 3600
+    # Existing jobs a new posting is offered to, best scores first (runs as a task)
+    SIMILAR_JOBS_FANOUT = 200
+
+    # Password hashing policy (Werkzeug method string, e.g. 'scrypt' or 'pbkdf2:sha256:600000')
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+    PASSWORD_HASH_SALT_LENGTH = 16
+    # Run verification on a bounded thread pool of this size (0 = inline)
+    PASSWORD_VERIFY_WORKERS = int(os.environ.get('PASSWORD_VERIFY_WORKERS', 0))
+    PASSWORD_VERIFY_TIMEOUT = 10
+
+    # Number of reverse proxies in front of the app (1 on Render); their
+    # X-Forwarded-* headers are trusted so the throttle sees client addresses
+    TRUST_PROXY = int(os.environ.get('TRUST_PROXY', '0'))
+
+    # Login throttling (token buckets per IP and per email)
+    LOGIN_THROTTLE_ENABLED = True
+    LOGIN_THROTTLE_DB = os.environ.get('LOGIN_THROTTLE_DB')  # SQLite file shared by workers
+    LOGIN_RATE_IP_BURST = 30
+    LOGIN_RATE_IP_PER_SECOND = 0.5
+    LOGIN_RATE_EMAIL_BURST = 10
+    LOGIN_RATE_EMAIL_PER_SECOND = 1 / 30
+    # Each worker logs its allowed/rejected counts this often (seconds) for monitoring
+    LOGIN_THROTTLE_LOG_INTERVAL = 300
+
+    # Identity cache used by the Flask-Login user loader (TTL 0 disables it)
+    USER_CACHE_TTL = 30
+    USER_CACHE_SIZE = 1024
+
+    # Account deletion: jobs are purged in batches, on a background thread unless disabled
+    ACCOUNT_PURGE_ASYNC = True
+    ACCOUNT_PURGE_BATCH_SIZE = 500
+
+    # Seconds between loads of saved searches added by other workers (new ids only)
+    SAVED_SEARCH_INDEX_TTL = 60
+
+    # Estimated Jaccard similarity above which a posting is flagged as a near-duplicate
+    DUPLICATE_THRESHOLD = 0.8
+
+    # Currency assumed for local salaries that don't name one
+    SALARY_DEFAULT_CURRENCY = 'GEL'
     
     # Adzuna Jobs API - Read from environment variables
     ADZUNA_APP_ID = os.environ.get('ADZUNA_APP_ID')
     ADZUNA_API_KEY = os.environ.get('ADZUNA_API_KEY')
 
+    # Background prefetch of the next Adzuna results page
+    ADZUNA_PREFETCH_ENABLED = True
+    ADZUNA_PREFETCH_WORKERS = 2
+    ADZUNA_PREFETCH_TTL = 120
+    ADZUNA_PREFETCH_CACHE_SIZE = 256
+    ADZUNA_PREFETCH_PER_MINUTE = 30
+
+    # Company, location and category ids interned on job writes (app.lookups)
+    LOOKUP_CACHE_SIZE = 10000
+    LOOKUP_CACHE_TTL = 3600
+
+    # Adzuna call quota shared by all workers through a SQLite file (its directory is
+    # created on first use). The daily budget counts calls per UTC day; background
+    # prefetches stop while less than the reserve fraction of a budget is left
+    ADZUNA_QUOTA_DB = os.environ.get('ADZUNA_QUOTA_DB', os.path.join(basedir, 'instance', 'adzuna_quota.db'))
+    ADZUNA_QUOTA_PER_MINUTE = int(os.environ.get('ADZUNA_QUOTA_PER_MINUTE', '25'))
+    ADZUNA_QUOTA_PER_DAY = int(os.environ.get('ADZUNA_QUOTA_PER_DAY', '250'))
+    ADZUNA_QUOTA_BACKGROUND_RESERVE = 0.25
+
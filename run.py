@@ -1,5 +1,6 @@
 from app import create_app, db
 from app.models import User, Job
+from app.schema import upgrade_schema
 
 app = create_app()
 
@@ -11,6 +12,6 @@ def make_shell_context():
 
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
+        upgrade_schema()
     app.run(debug=True)
 
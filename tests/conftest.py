@@ -1,6 +1,7 @@
 import pytest
 import os
 import tempfile
+from flask.testing import FlaskClient
 from app import create_app, db
 from app.models import User, Job
 from config import Config
@@ -11,6 +12,12 @@ class TestConfig(Config):
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
     SECRET_KEY = 'test-secret-key'
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+    ACCOUNT_PURGE_ASYNC = False
+    JINJA_BYTECODE_CACHE_DIR = None
+    JOB_SWEEP_INTERVAL = 0
+    TASK_EMBEDDED_WORKERS = 0
+    ADZUNA_QUOTA_DB = None
 
 
 @pytest.fixture
@@ -25,10 +32,18 @@ def app():
         db.drop_all()
 
 
+class BufferedClient(FlaskClient):
+    """Reads streamed pages to the end like a server would, which pops their request context."""
+    
+    def open(self, *args, **kwargs):
+        kwargs.setdefault('buffered', True)
+        return super().open(*args, **kwargs)
+
+
 @pytest.fixture
 def client(app):
     """A test client for the app."""
-    return app.test_client()
+    return BufferedClient(app, app.response_class, use_cookies=True)
 
 
 @pytest.fixture
@@ -121,3 +136,16 @@ def test_job(app, test_user):
     # Return a dict with job info
     return {'id': job_id, 'title': 'Test Job'}
 
+
+@pytest.fixture
+def make_job(app, test_user):
+    """Factory committing a job by the test user; keyword arguments override the defaults."""
+    def make(**fields):
+        values = dict(title='Test Job', short_description='Short desc', full_description='Full desc',
+                      company='Company', location='Tbilisi', category='IT', author_id=test_user['id'])
+        values.update(fields)
+        job = Job(**values)
+        db.session.add(job)
+        db.session.commit()
+        return job
+    return make
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+from app import db
+from app.archive import archive_expired_jobs, sweep_jobs
+from app.models import ArchivedJob, Job, JobFingerprint
+
+EXPIRED = datetime.utcnow() - timedelta(days=1)
+
+
+class TestJobExpiry:
+    """Test job expiry and archival."""
+    
+    def test_new_jobs_get_an_expiry(self, client, auth, test_user):
+        """Test that add_job sets expires_at from JOB_LIFETIME_DAYS."""
+        auth.login()
+        client.post('/add-job', data={
+            'title': 'Expiring Job',
+            'short_description': 'Short description',
+            'full_description': 'A full description of the expiring job position',
+            'company': 'Company',
+            'location': 'Tbilisi',
+            'category': 'IT'
+        })
+        job = Job.query.filter_by(title='Expiring Job').first()
+        assert timedelta(days=59) < job.expires_at - datetime.utcnow() <= timedelta(days=60)
+    
+    def test_expired_jobs_leave_listings(self, client, make_job):
+        """Test that expired jobs are not listed even before the sweep."""
+        make_job(title='Live Job')
+        make_job(title='Stale Job', expires_at=EXPIRED)
+        html = client.get('/').get_data(as_text=True)
+        assert 'Live Job' in html and 'Stale Job' not in html
+        assert Job.listed().count() == 1
+        html = client.get('/user/testuser').get_data(as_text=True)
+        assert 'Live Job' in html and 'Stale Job' not in html
+    
+    def test_sweep_moves_expired_jobs(self, app, make_job):
+        """Test that the sweeper archives expired jobs in batches."""
+        live = make_job(title='Live Job').id
+        stale = [make_job(title=f'Stale {i}', expires_at=EXPIRED, views=i).id for i in range(3)]
+        db.session.add(JobFingerprint(job_id=stale[0], signature=b'\x00'))
+        db.session.commit()
+        
+        assert archive_expired_jobs(batch_size=2) == 3
+        assert [job.id for job in Job.query.all()] == [live]
+        archived = {job.id: job for job in ArchivedJob.query.all()}
+        assert sorted(archived) == stale
+        assert archived[stale[2]].views == 2 and archived[stale[2]].title == 'Stale 2'
+        assert JobFingerprint.query.count() == 0
+        assert archive_expired_jobs() == 0
+    
+    def test_ids_are_not_reused(self, app, make_job):
+        """Test that a job posted after the newest one was archived gets a new id."""
+        stale = make_job(title='Stale', expires_at=EXPIRED).id
+        archive_expired_jobs()
+        assert make_job(title='Fresh').id > stale
+    
+    def test_clashing_id_is_not_deleted(self, app, test_user, make_job):
+        """Test that an expired job whose id is already archived stays in place."""
+        stale = make_job(title='Reused Id', expires_at=EXPIRED).id
+        db.session.add(ArchivedJob(id=stale, title='Old', short_description='Old', full_description='Old',
+                                   company='Company', location='Tbilisi', category='IT',
+                                   author_id=test_user['id']))
+        db.session.commit()
+        assert archive_expired_jobs() == 0
+        assert db.session.get(Job, stale) is not None
+        assert db.session.get(ArchivedJob, stale).title == 'Old'
+    
+    def test_archived_job_detail(self, client, auth, test_user, make_job):
+        """Test that job_detail still resolves an archived job, read-only."""
+        job_id = make_job(title='Archived Posting', expires_at=EXPIRED).id
+        archive_expired_jobs()
+        auth.login()
+        response = client.get(f'/job/{job_id}')
+        html = response.get_data(as_text=True)
+        assert response.status_code == 200
+        assert 'Archived Posting' in html and 'დაარქივებულია' in html
+        assert f'/job/{job_id}/edit' not in html
+    
+    def test_command_backfills_expiry(self, app, runner, test_user):
+        """Test that the command dates legacy jobs from date_posted and archives old ones."""
+        old = Job(title='Legacy', short_description='Short desc', full_description='Full desc',
+                  company='Company', location='Tbilisi', category='IT', author_id=test_user['id'],
+                  date_posted=datetime.utcnow() - timedelta(days=90))
+        recent = Job(title='Recent', short_description='Short desc', full_description='Full desc',
+                     company='Company', location='Tbilisi', category='IT', author_id=test_user['id'])
+        db.session.add_all([old, recent])
+        db.session.commit()
+        result = runner.invoke(args=['archive-jobs'])
+        assert '2 jobs given an expiry date, 1 expired jobs archived.' in result.output
+        assert [job.title for job in ArchivedJob.query.all()] == ['Legacy']
+    
+    def test_sweeper_dates_legacy_jobs(self, app, make_job):
+        """Test that the periodic sweep gives upgraded rows an expiry and archives the old ones."""
+        make_job(title='Legacy', date_posted=datetime.utcnow() - timedelta(days=90))
+        recent = make_job(title='Recent')
+        assert sweep_jobs() == (2, 1)
+        assert [job.id for job in Job.listed()] == [recent.id]
+        assert recent.expires_at is not None
@@ -200,3 +200,154 @@ class TestAuthenticationFlow:
         response = client.get('/add-job')
         assert response.status_code == 200
 
+
+
+class TestPasswordPolicy:
+    """Test configurable hashing cost and rehash on login."""
+    
+    def test_configured_method_is_used(self, app):
+        """Test that set_password uses PASSWORD_HASH_METHOD."""
+        with app.app_context():
+            user = User(username='policy', email='policy@example.com')
+            user.set_password('mypassword')
+            assert user.password_hash.startswith('pbkdf2:sha256:1000$')
+    
+    def test_outdated_hash_is_upgraded_on_login(self, client, app):
+        """Test that a hash with old parameters is replaced after a successful login."""
+        from werkzeug.security import generate_password_hash
+        with app.app_context():
+            user = User(username='oldhash', email='old@example.com',
+                        password_hash=generate_password_hash('password123', method='pbkdf2:sha256:500'))
+            db.session.add(user)
+            db.session.commit()
+        
+        response = client.post('/login', data={
+            'email': 'old@example.com',
+            'password': 'password123'
+        }, follow_redirects=True)
+        assert 'წარმატებით შეხვედით' in response.data.decode('utf-8')
+        
+        with app.app_context():
+            user = User.query.filter_by(email='old@example.com').first()
+            assert user.password_hash.startswith('pbkdf2:sha256:1000$')
+            assert user.check_password('password123') is True
+    
+    def test_verification_on_bounded_pool(self, app):
+        """Test that verification works when run on the executor."""
+        from app.passwords import hashing_stats
+        app.config['PASSWORD_VERIFY_WORKERS'] = 1
+        with app.app_context():
+            user = User(username='pooled', email='pooled@example.com')
+            user.set_password('mypassword')
+            before = hashing_stats()['verifications']
+            assert user.check_password('mypassword') is True
+            assert user.check_password('wrong') is False
+            assert hashing_stats()['verifications'] == before + 2
+    
+    def test_slow_verification_is_unavailable(self, client, app, test_user, monkeypatch):
+        """Test that a verification timeout answers the login with 503 instead of an error."""
+        import time
+        from app import passwords
+        
+        def slow_check(pwhash, password):
+            time.sleep(0.3)
+            return True
+        monkeypatch.setattr(passwords, 'check_password_hash', slow_check)
+        app.config.update(PASSWORD_VERIFY_WORKERS=1, PASSWORD_VERIFY_TIMEOUT=0.05)
+        response = client.post('/login', data={'email': 'test@example.com', 'password': 'testpass123'})
+        assert response.status_code == 503
+        assert 'გადატვირთულია' in response.data.decode('utf-8')
+        assert passwords.hashing_stats()['timeouts'] >= 1
+    
+    def test_benchmark_command(self, runner):
+        """Test that the benchmark reports timings for the configured method."""
+        result = runner.invoke(args=['password-benchmark', '--rounds', '2'])
+        assert result.output.startswith('pbkdf2:sha256:1000: hash ')
+
+
+class TestLoginThrottle:
+    """Test per-IP and per-account login throttling."""
+    
+    def test_email_budget_exhausted(self, client, app, test_user):
+        """Test that repeated attempts for one email are rejected with 429."""
+        app.config['LOGIN_RATE_EMAIL_BURST'] = 3
+        app.config['LOGIN_RATE_EMAIL_PER_SECOND'] = 0
+        from app import login_throttle
+        login_throttle.init_app(app)
+        
+        for _ in range(3):
+            response = client.post('/login', data={
+                'email': 'test@example.com', 'password': 'wrongpassword'})
+            assert response.status_code == 302
+        
+        response = client.post('/login', data={
+            'email': 'test@example.com', 'password': 'testpass123'})
+        assert response.status_code == 429
+        assert 'ძალიან ბევრი მცდელობა' in response.data.decode('utf-8')
+        assert login_throttle.stats()['rejected_email'] == 1
+    
+    def test_counts_are_logged(self, client, app, test_user, caplog):
+        """Test that the throttle reports its counters in a periodic log line."""
+        app.config['LOGIN_THROTTLE_LOG_INTERVAL'] = 0
+        from app import login_throttle
+        login_throttle.init_app(app)
+        with caplog.at_level('INFO', logger=app.logger.name):
+            client.post('/login', data={'email': 'test@example.com', 'password': 'wrongpassword'})
+        assert 'Login throttle: 1 allowed, 0 rejected by IP, 0 rejected by email' in caplog.text
+    
+    def test_forwarded_clients_have_own_budget(self):
+        """Test that behind a trusted proxy each forwarded client address is throttled separately."""
+        from app import create_app
+        from tests.conftest import TestConfig
+        
+        class ProxyConfig(TestConfig):
+            TRUST_PROXY = 1
+            LOGIN_RATE_IP_BURST = 2
+            LOGIN_RATE_IP_PER_SECOND = 0
+        app = create_app(ProxyConfig)
+        with app.app_context():
+            db.create_all()
+        client = app.test_client()
+        
+        def attempt(address, email):
+            return client.post('/login', data={'email': email, 'password': 'wrongpassword'},
+                               headers={'X-Forwarded-For': address}).status_code
+        
+        assert [attempt('203.0.113.1', f'user{n}@example.com') for n in range(3)] == [302, 302, 429]
+        assert attempt('203.0.113.2', 'other@example.com') == 302
+    
+    def test_shared_sqlite_buckets(self, tmp_path):
+        """Test that SQLite buckets are shared between limiter instances."""
+        from app.throttle import SQLiteTokenBucket
+        path = str(tmp_path / 'throttle.db')
+        first = SQLiteTokenBucket(path, capacity=2, refill_per_second=0)
+        second = SQLiteTokenBucket(path, capacity=2, refill_per_second=0)
+        assert first.consume('1.2.3.4', now=100.0) is True
+        assert second.consume('1.2.3.4', now=100.0) is True
+        assert first.consume('1.2.3.4', now=100.0) is False
+
+
+class TestUserLoaderCache:
+    """Test the cached Flask-Login user loader."""
+    
+    def test_loader_uses_cache(self, app, test_user):
+        """Test that a second load is served from the identity cache."""
+        from app.models import load_user
+        cache = app.extensions['user_cache']
+        first = load_user(str(test_user['id']))
+        hits = cache.hits
+        second = load_user(str(test_user['id']))
+        assert cache.hits == hits + 1
+        assert second.username == first.username == 'testuser'
+        assert second == User.query.get(test_user['id'])
+    
+    def test_profile_update_invalidates_cache(self, client, auth, app, test_user):
+        """Test that the cached identity is dropped after a profile update."""
+        from app.models import load_user
+        load_user(str(test_user['id']))
+        auth.login()
+        client.post('/profile', data={
+            'username': 'renamed',
+            'email': 'test@example.com'
+        }, follow_redirects=True)
+        assert load_user(str(test_user['id'])).username == 'renamed'
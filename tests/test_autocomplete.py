@@ -0,0 +1,69 @@
+from app.autocomplete import PrefixIndex
+from app.models import Job
+
+
+class TestPrefixIndex:
+    """Test the sorted-array prefix index."""
+    
+    def test_top_k_by_weight(self):
+        """Test that heavier values come first and the limit applies."""
+        index = PrefixIndex()
+        index.add('Python Developer', 5)
+        index.add('Product Manager', 2)
+        index.add('Project Lead', 9)
+        assert index.suggest('p', limit=2) == ['Project Lead', 'Python Developer']
+        assert index.suggest('PYT') == ['Python Developer']
+    
+    def test_matches_later_words(self):
+        """Test that a prefix of a later word also matches."""
+        index = PrefixIndex()
+        index.add('Senior Python Developer')
+        assert index.suggest('dev') == ['Senior Python Developer']
+    
+    def test_remove_and_cap(self):
+        """Test that values disappear at zero weight and the cap is respected."""
+        index = PrefixIndex(max_values=2)
+        index.add('Alpha')
+        index.add('Alpha')
+        index.add('Beta')
+        index.add('Gamma')
+        assert len(index) == 2 and index.suggest('g') == []
+        index.remove('Alpha')
+        assert index.suggest('a') == ['Alpha']
+        index.remove('Alpha')
+        assert index.suggest('a') == []
+
+
+class TestAutocompleteEndpoint:
+    """Test the /autocomplete endpoint."""
+    
+    def test_suggestions_from_jobs(self, client, make_job):
+        """Test that suggestions come from listed jobs."""
+        make_job(title='Backend Engineer', company='Bank of Georgia', location='Batumi')
+        response = client.get('/autocomplete?field=company&q=ban')
+        assert response.status_code == 200
+        assert response.get_json() == {'suggestions': ['Bank of Georgia']}
+        assert 'max-age=60' in response.headers['Cache-Control']
+        assert client.get('/autocomplete?field=location&q=bat').get_json()['suggestions'] == ['Batumi']
+    
+    def test_unknown_field(self, client):
+        """Test that only indexed fields can be queried."""
+        assert client.get('/autocomplete?field=salary&q=1').status_code == 400
+    
+    def test_updates_on_job_writes(self, client, auth, test_user):
+        """Test that new and deleted jobs update the index without a rebuild."""
+        assert client.get('/autocomplete?q=data').get_json()['suggestions'] == []
+        auth.login()
+        client.post('/add-job', data={
+            'title': 'Data Scientist',
+            'short_description': 'Short description',
+            'full_description': 'A full description of the data scientist position',
+            'company': 'Company',
+            'location': 'Tbilisi',
+            'category': 'IT'
+        })
+        assert client.get('/autocomplete?q=data').get_json()['suggestions'] == ['Data Scientist']
+        
+        job = Job.query.filter_by(title='Data Scientist').first()
+        client.post(f'/job/{job.id}/delete')
+        assert client.get('/autocomplete?q=data').get_json()['suggestions'] == []
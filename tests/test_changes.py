@@ -0,0 +1,105 @@
+import threading
+import time
+from app import db
+from app.changes import ChangeNotifier
+from app.models import Job, JobChange
+
+JOB_FORM = {
+    'title': 'Mirrored Job',
+    'short_description': 'Short description',
+    'full_description': 'A full description of the mirrored job position',
+    'company': 'Company',
+    'location': 'Tbilisi',
+    'category': 'IT'
+}
+
+
+class TestChangeLog:
+    """Test the append-only job change log."""
+    
+    def test_insert_update_delete_through_routes(self, client, auth, test_user):
+        """Test that each job mutation appends one change in order."""
+        auth.login()
+        client.post('/add-job', data=JOB_FORM)
+        job = Job.query.filter_by(title='Mirrored Job').first()
+        client.post(f'/job/{job.id}/edit', data=dict(JOB_FORM, title='Edited Job'))
+        client.post(f'/job/{job.id}/delete')
+        
+        changes = client.get('/changes').get_json()['changes']
+        assert [(c['op'], c['job_id']) for c in changes] == \
+            [('insert', job.id), ('update', job.id), ('delete', job.id)]
+        assert changes[1]['data']['title'] == 'Edited Job'
+        assert changes[2]['data'] == {'reason': 'deleted'}
+        assert changes[0]['seq'] < changes[1]['seq'] < changes[2]['seq']
+    
+    def test_private_columns_are_not_logged(self, app, test_user):
+        """Test that edits to non-public columns do not produce changes."""
+        job = Job(author_id=test_user['id'], **JOB_FORM)
+        db.session.add(job)
+        db.session.commit()
+        job.popularity = 5.0
+        db.session.commit()
+        assert [c.op for c in JobChange.query.all()] == ['insert']
+    
+    def test_rolled_back_changes_vanish(self, app, test_user):
+        """Test that change rows share the job's transaction."""
+        db.session.add(Job(author_id=test_user['id'], **JOB_FORM))
+        db.session.flush()
+        db.session.rollback()
+        assert JobChange.query.count() == 0
+    
+    def test_account_purge_logs_deletes(self, app, client, auth, test_user):
+        """Test that jobs removed by an account purge are reported as deletes."""
+        job = Job(author_id=test_user['id'], **JOB_FORM)
+        db.session.add(job)
+        db.session.commit()
+        job_id = job.id
+        auth.login()
+        client.post('/delete-account', data={'password': 'testpass123', 'confirm_delete': 'DELETE'})
+        last = JobChange.query.order_by(JobChange.seq.desc()).first()
+        assert (last.job_id, last.op) == (job_id, 'delete')
+        assert 'account_deleted' in last.data
+
+
+class TestChangesEndpoint:
+    """Test the /changes cursor feed."""
+    
+    def test_cursor_paging(self, client, app, test_user):
+        """Test that `next` resumes after the last change returned."""
+        for n in range(5):
+            db.session.add(Job(author_id=test_user['id'], **dict(JOB_FORM, title=f'Job {n}')))
+        db.session.commit()
+        first = client.get('/changes?limit=3').get_json()
+        second = client.get(f"/changes?since={first['next']}&limit=3").get_json()
+        assert [c['data']['title'] for c in first['changes'] + second['changes']] == \
+            [f'Job {n}' for n in range(5)]
+        third = client.get(f"/changes?since={second['next']}").get_json()
+        assert third == {'changes': [], 'next': second['next']}
+    
+    def test_refused_off_sqlite(self, client, monkeypatch):
+        """Test that the feed is refused where seq values may commit out of order."""
+        monkeypatch.setattr(db.engine.dialect, 'name', 'postgresql')
+        assert client.get('/changes').status_code == 501
+    
+    def test_no_wait_by_default(self, client):
+        """Test that long-polling is off unless CHANGES_MAX_WAIT allows it."""
+        started = time.monotonic()
+        assert client.get('/changes?since=0&wait=5').get_json() == {'changes': [], 'next': 0}
+        assert time.monotonic() - started < 1
+    
+    def test_long_poll_times_out_empty(self, app, client):
+        """Test that an idle long-poll waits and then returns no changes."""
+        app.config['CHANGES_MAX_WAIT'] = 1
+        started = time.monotonic()
+        body = client.get('/changes?since=0&wait=0.3').get_json()
+        assert body == {'changes': [], 'next': 0}
+        assert time.monotonic() - started >= 0.3
+    
+    def test_notifier_wakes_waiters(self):
+        """Test that a commit notification releases a waiting poller early."""
+        notifier = ChangeNotifier()
+        timer = threading.Timer(0.05, notifier.notify)
+        timer.start()
+        started = time.monotonic()
+        notifier.wait(5)
+        assert time.monotonic() - started < 1
@@ -0,0 +1,64 @@
+import gzip
+import pytest
+from flask import Flask, Response, stream_with_context
+from app.compression import CompressionMiddleware, negotiate
+
+
+class TestNegotiation:
+    """Test Accept-Encoding negotiation."""
+    
+    def test_negotiate(self):
+        """Test preference, q-values and missing headers."""
+        assert negotiate('gzip, deflate', brotli_available=False) == 'gzip'
+        assert negotiate('gzip, br', brotli_available=True) == 'br'
+        assert negotiate('br;q=0, gzip;q=0.5', brotli_available=True) == 'gzip'
+        assert negotiate('gzip;q=0', brotli_available=False) is None
+        assert negotiate('', brotli_available=False) is None
+
+
+class TestCompressionMiddleware:
+    """Test the compression middleware on real pages and a streamed response."""
+    
+    def test_html_page_is_gzipped(self, client):
+        """Test that the index page is compressed when the client accepts gzip."""
+        response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert 'ვაკანსიები' in gzip.decompress(response.data).decode('utf-8')
+    
+    def test_uncompressed_without_accept_encoding(self, client):
+        """Test that clients without Accept-Encoding get plain responses."""
+        response = client.get('/')
+        assert 'Content-Encoding' not in response.headers
+    
+    def test_small_and_binary_bodies_are_skipped(self):
+        """Test that tiny bodies and non-text types are not compressed."""
+        app = Flask(__name__)
+        app.add_url_rule('/tiny', 'tiny', lambda: 'ok')
+        app.add_url_rule('/image', 'image', lambda: Response(b'x' * 2000, mimetype='image/png'))
+        app.wsgi_app = CompressionMiddleware(app.wsgi_app, {})
+        client = app.test_client()
+        assert 'Content-Encoding' not in client.get('/tiny', headers={'Accept-Encoding': 'gzip'}).headers
+        assert 'Content-Encoding' not in client.get('/image', headers={'Accept-Encoding': 'gzip'}).headers
+    
+    def test_streamed_response_and_cache(self):
+        """Test chunked compression of a stream and reuse of cached compressed bodies."""
+        app = Flask(__name__)
+        
+        @app.route('/stream')
+        def stream():
+            return Response(stream_with_context(f'<p>row {i}</p>' for i in range(100)),
+                            mimetype='text/html')
+        
+        app.add_url_rule('/page', 'page', lambda: '<p>same page</p>' * 100)
+        middleware = CompressionMiddleware(app.wsgi_app, {})
+        app.wsgi_app = middleware
+        client = app.test_client()
+        
+        response = client.get('/stream', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(response.data).decode().count('<p>row') == 100
+        
+        client.get('/page', headers={'Accept-Encoding': 'gzip'})
+        client.get('/page', headers={'Accept-Encoding': 'gzip'})
+        assert middleware.cache.hits == 1
@@ -0,0 +1,54 @@
+import pytest
+from datetime import datetime, timedelta
+from app import db
+from app.counters import get_view_counter, view_weight
+from app.models import Job
+
+
+class TestViewCounter:
+    """Test batched view counters."""
+    
+    def test_views_are_batched(self, app, client, make_job):
+        """Test that views reach the database only once the threshold is hit."""
+        app.config['COUNTER_FLUSH_THRESHOLD'] = 3
+        job_id = make_job(title='Counted Job').id
+        
+        client.get(f'/job/{job_id}')
+        client.get(f'/job/{job_id}')
+        assert db.session.execute(db.select(Job.views).where(Job.id == job_id)).scalar() == 0
+        assert get_view_counter().pending(job_id) == 2
+        
+        client.get(f'/job/{job_id}')
+        assert db.session.execute(db.select(Job.views).where(Job.id == job_id)).scalar() == 3
+        assert get_view_counter().pending(job_id) == 0
+    
+    def test_flush_writes_all_jobs_at_once(self, app, make_job):
+        """Test that one flush updates every pending job."""
+        first = make_job(title='First').id
+        second = make_job(title='Second').id
+        counter = get_view_counter()
+        for job_id in (first, second, second):
+            counter.record(job_id)
+        
+        assert counter.flush() == 2
+        views = dict(db.session.execute(db.select(Job.id, Job.views)).all())
+        assert views == {first: 1, second: 2}
+        assert counter.flush() == 0
+    
+    def test_popular_sort(self, app, client, make_job):
+        """Test that the popular ordering puts the most viewed job first."""
+        quiet = make_job(title='Quiet Job').id
+        busy = make_job(title='Busy Job').id
+        counter = get_view_counter()
+        counter.record(quiet)
+        for _ in range(5):
+            counter.record(busy)
+        counter.flush()
+        
+        html = client.get('/?sort=popular').get_data(as_text=True)
+        assert html.index('Busy Job') < html.index('Quiet Job')
+    
+    def test_recent_views_outweigh_old_ones(self):
+        """Test that popularity decays with the configured half-life."""
+        now = datetime(2025, 6, 1)
+        assert view_weight(now, 72) == pytest.approx(2 * view_weight(now - timedelta(hours=72), 72))
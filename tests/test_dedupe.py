@@ -0,0 +1,83 @@
+import pytest
+from app.models import Job
+from app.dedupe import minhash, similarity, dedupe_jobs_command
+
+DESCRIPTION = ('We are looking for an experienced backend developer to join our team in Tbilisi. '
+               'You will design REST APIs with Flask, work with PostgreSQL and Redis, write tests '
+               'and review code. Three years of Python experience and good English are required.')
+
+
+class TestMinHash:
+    """Test MinHash signatures."""
+    
+    def test_similar_texts_have_similar_signatures(self):
+        """Test that a small edit keeps the estimated similarity high."""
+        edited = DESCRIPTION.replace('Three years', 'Four years')
+        assert similarity(minhash(DESCRIPTION), minhash(edited)) >= 0.7
+        assert similarity(minhash(DESCRIPTION), minhash('Graphic designer for print media')) < 0.2
+    
+    def test_empty_text(self):
+        """Test that empty text has no signature."""
+        assert minhash('') is None
+
+
+class TestDuplicateDetection:
+    """Test near-duplicate flagging at posting time and in batch."""
+    
+    def test_repost_is_flagged_and_hidden(self, client, auth, app, test_user):
+        """Test that reposting a slightly edited vacancy flags it as a duplicate."""
+        auth.login()
+        data = {'title': 'Backend Developer', 'short_description': 'Short',
+                'full_description': DESCRIPTION, 'company': 'Acme', 'salary': '',
+                'location': 'Tbilisi', 'category': 'IT'}
+        client.post('/add-job', data=data)
+        data['full_description'] = DESCRIPTION + ' Apply now.'
+        response = client.post('/add-job', data=data, follow_redirects=True)
+        assert 'თითქმის იდენტურია' in response.data.decode('utf-8')
+        
+        with app.app_context():
+            first, second = Job.query.order_by(Job.id).all()
+            assert first.duplicate_of_id is None
+            assert second.duplicate_of_id == first.id
+            assert Job.listed().count() == 1
+        # Still reachable directly
+        assert client.get(f'/job/{second.id}').status_code == 200
+    
+    def test_editing_original_keeps_it_canonical(self, client, auth, app, test_user):
+        """Test that editing the original does not flag it as a copy of its own duplicate."""
+        auth.login()
+        data = {'title': 'Backend Developer', 'short_description': 'Short',
+                'full_description': DESCRIPTION, 'company': 'Acme', 'salary': '',
+                'location': 'Tbilisi', 'category': 'IT'}
+        client.post('/add-job', data=data)
+        client.post('/add-job', data=dict(data, full_description=DESCRIPTION + ' Apply now.'))
+        with app.app_context():
+            first_id = Job.query.order_by(Job.id).first().id
+        
+        client.post(f'/job/{first_id}/edit', data=dict(data, full_description=DESCRIPTION + ' Apply today.'))
+        with app.app_context():
+            first, second = Job.query.order_by(Job.id).all()
+            assert first.duplicate_of_id is None
+            assert second.duplicate_of_id == first.id
+            assert Job.listed().count() == 1
+    
+    def test_batch_dedupe(self, app, runner, make_job):
+        """Test that the dedupe command flags later copies in a single pass."""
+        make_job(title='Backend Developer', full_description=DESCRIPTION)
+        make_job(title='Graphic Designer', full_description='Print and web design with Figma and Illustrator.')
+        make_job(title='Backend Developer', full_description=DESCRIPTION + ' Remote possible.')
+        
+        result = runner.invoke(dedupe_jobs_command, ['--batch-size', '2'])
+        assert '1 flagged' in result.output
+        with app.app_context():
+            jobs = Job.query.order_by(Job.id).all()
+            assert [job.duplicate_of_id for job in jobs] == [None, None, jobs[0].id]
+    
+    def test_other_authors_are_not_duplicates(self, app, runner, make_job, test_user2):
+        """Test that another author's posting with the same boilerplate stays listed."""
+        make_job(title='Backend Developer', full_description=DESCRIPTION)
+        make_job(title='Backend Developer', full_description=DESCRIPTION + ' Remote possible.',
+                 author_id=test_user2['id'])
+        result = runner.invoke(dedupe_jobs_command)
+        assert '0 flagged' in result.output
+        assert Job.listed().count() == 2
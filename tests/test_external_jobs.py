@@ -0,0 +1,36 @@
+import pytest
+from app.external_jobs import ExternalJob, pack_results, unpack_results
+
+
+class TestExternalJob:
+    """Test the compact Adzuna result record."""
+    
+    def test_from_adzuna(self):
+        """Test field mapping, defaults and lazy salary formatting."""
+        job = ExternalJob.from_adzuna({
+            'id': '42', 'title': 'Developer', 'company': {'display_name': 'Acme'},
+            'location': {'display_name': 'London'}, 'description': 'Build things',
+            'salary_min': 30000, 'salary_max': 40000
+        }, currency='GBP')
+        assert job.company == 'Acme'
+        assert job.category == 'Other'
+        assert job.latitude == 41.7151
+        assert job.salary == '£30,000 - £40,000'
+        assert not hasattr(job, '__dict__')
+    
+    def test_preview(self):
+        """Test that the preview is cut, stripped of tags and marked as truncated."""
+        job = ExternalJob(id='1', title='T', company='C', location='L',
+                          description='<strong>' + 'a' * 300 + '</strong>')
+        assert job.preview == 'a' * 172 + '...'
+        assert ExternalJob(id='1', title='T', company='C', location='L',
+                           description='Short <b>text</b>').preview == 'Short text'
+    
+    def test_pack_roundtrip(self):
+        """Test that packed results unpack to equal records."""
+        data = {'jobs': [ExternalJob(id='1', title='ტესტი', company='C', location='L',
+                                     description='D', salary_min=1000, salary_currency='USD')],
+                'total': 1, 'page': 1, 'results_per_page': 20}
+        restored = unpack_results(pack_results(data))
+        assert restored == data
+        assert restored['jobs'][0].salary == '$1,000+'
@@ -0,0 +1,140 @@
+import xml.etree.ElementTree as ET
+from app import db
+from app.feeds import get_feed_cache
+
+SITEMAP = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+ATOM = '{http://www.w3.org/2005/Atom}'
+
+
+class TestSitemap:
+    """Test the sharded sitemap."""
+    
+    def test_index_lists_chunks(self, app, client, make_job):
+        """Test that the sitemap index points at one sitemap per id range."""
+        app.config['SITEMAP_CHUNK_SIZE'] = 2
+        jobs = [make_job(title=f'Job {n}') for n in range(3)]
+        root = ET.fromstring(client.get('/sitemap.xml').data)
+        locs = [loc.text for loc in root.iter(f'{SITEMAP}loc')]
+        assert locs == ['http://localhost/sitemap-pages.xml', 'http://localhost/sitemap-0.xml',
+                        'http://localhost/sitemap-1.xml']
+        
+        chunk = ET.fromstring(client.get('/sitemap-0.xml').data)
+        urls = [loc.text for loc in chunk.iter(f'{SITEMAP}loc')]
+        assert urls == [f'http://localhost/job/{job.id}' for job in jobs if job.id < 2]
+    
+    def test_robots_points_at_sitemap(self, client):
+        """Test that robots.txt advertises the sitemap."""
+        assert b'Sitemap: http://localhost/sitemap.xml' in client.get('/robots.txt').data
+
+
+class TestFeeds:
+    """Test RSS and Atom feeds."""
+    
+    def test_rss_and_atom(self, client, make_job):
+        """Test that both formats list the latest jobs with escaped text."""
+        make_job(title='Developer <Senior>', short_description='Short & sweet')
+        rss = ET.fromstring(client.get('/feeds/jobs.rss').data)
+        assert [item.findtext('title') for item in rss.iter('item')] == ['Developer <Senior>']
+        assert rss.find('channel/item/description').text == 'Short & sweet'
+        
+        atom = ET.fromstring(client.get('/feeds/jobs.atom').data)
+        assert [entry.findtext(f'{ATOM}title') for entry in atom.iter(f'{ATOM}entry')] == ['Developer <Senior>']
+    
+    def test_category_feed(self, client, make_job):
+        """Test that a category feed only lists that category."""
+        make_job(title='Designer', category='Design')
+        make_job(title='Engineer', category='IT')
+        rss = ET.fromstring(client.get('/feeds/category/Design.rss').data)
+        assert [item.findtext('title') for item in rss.iter('item')] == ['Designer']
+
+    
+    def test_unknown_feeds_are_not_found(self, app, client, make_job):
+        """Test that unknown categories and sitemap chunks past the last id are 404s."""
+        make_job(title='Only Job')
+        assert client.get('/feeds/category/NoSuchCategory.rss').status_code == 404
+        assert client.get('/sitemap-999.xml').status_code == 404
+        assert len(get_feed_cache()._entries) == 0
+
+
+class TestFeedCaching:
+    """Test ETags and write-driven invalidation."""
+    
+    def test_etag_and_not_modified(self, client, make_job):
+        """Test that a repeated request with the ETag gets a 304."""
+        make_job(title='Cached Job')
+        first = client.get('/feeds/jobs.rss')
+        assert 'Content-Length' not in first.headers
+        etag = first.headers['ETag']
+        first.get_data()
+        
+        second = client.get('/feeds/jobs.rss')
+        assert second.headers['ETag'] == etag and 'Content-Length' in second.headers
+        assert second.data == first.data
+        assert client.get('/feeds/jobs.rss', headers={'If-None-Match': etag}).status_code == 304
+    
+    def test_job_write_invalidates_touched_feeds(self, client, make_job):
+        """Test that a new job refreshes its feeds but leaves other categories cached."""
+        make_job(title='First Job', category='IT')
+        latest = client.get('/feeds/jobs.rss')
+        latest.get_data()
+        design = client.get('/feeds/category/Design.rss')
+        design.get_data()
+        
+        make_job(title='Second Job', category='IT')
+        refreshed = client.get('/feeds/jobs.rss')
+        assert refreshed.headers['ETag'] != latest.headers['ETag']
+        assert b'Second Job' in refreshed.get_data()
+        assert client.get('/feeds/category/Design.rss').headers['ETag'] == design.headers['ETag']
+    
+    def test_category_change_invalidates_both(self, client, make_job):
+        """Test that moving a job between categories refreshes both category feeds."""
+        job = make_job(title='Mover', category='IT')
+        before = client.get('/feeds/category/IT.rss')
+        before.get_data()
+        job.category = 'Design'
+        db.session.commit()
+        after = client.get('/feeds/category/IT.rss')
+        assert after.headers['ETag'] != before.headers['ETag']
+        assert b'Mover' not in after.get_data()
+    
+    def test_cache_is_bounded(self, app, client, make_job):
+        """Test that at most FEED_CACHE_SIZE documents are kept."""
+        app.config['FEED_CACHE_SIZE'] = 2
+        make_job(title='Job')
+        for category in ('IT', 'Design', 'Sales', 'Finance'):
+            client.get(f'/feeds/category/{category}.rss').get_data()
+        assert len(get_feed_cache()._entries) == 2
+    
+    def test_posted_job_patches_cached_documents(self, app, client, auth, make_job):
+        """Test that a job posted through the site is added to cached documents in place."""
+        first = make_job(title='First Job', category='IT')
+        for path in ('/sitemap-0.xml', '/sitemap.xml', '/feeds/jobs.rss', '/feeds/category/IT.atom'):
+            client.get(path)
+        cache = get_feed_cache()
+        etag = cache.lookup('sitemap:0')[0]
+        
+        auth.login()
+        client.post('/add-job', data={
+            'title': 'Second Job', 'short_description': 'Short', 'full_description': 'Full desc',
+            'company': 'Acme', 'salary': '', 'location': 'Tbilisi', 'category': 'IT'})
+        # Patched, not dropped: no request has regenerated them since
+        assert list(cache.lookup('sitemap:0')[1]) == [first.id, first.id + 1]
+        assert cache.lookup('sitemap:0')[0] != etag
+        assert [job.title for job in cache.lookup('latest:rss')[1].values()] == ['First Job', 'Second Job']
+        body = client.get('/feeds/category/IT.atom').get_data(as_text=True)
+        assert body.index('Second Job') < body.index('First Job')
+        
+        client.post(f'/job/{first.id}/delete')
+        assert list(cache.lookup('sitemap:0')[1]) == [first.id + 1]
+        assert 'First Job' not in client.get('/feeds/jobs.rss').get_data(as_text=True)
+    
+    def test_removal_from_full_feed_regenerates(self, app, client, auth, make_job):
+        """Test that taking a job out of a full feed drops it, since the next job is unknown."""
+        app.config['FEED_SIZE'] = 1
+        older = make_job(title='Older Job')
+        newer = make_job(title='Newer Job')
+        client.get('/feeds/jobs.rss')
+        auth.login()
+        client.post(f'/job/{newer.id}/delete')
+        assert get_feed_cache().lookup('latest:rss')[1] is None
+        assert older.title in client.get('/feeds/jobs.rss').get_data(as_text=True)
@@ -0,0 +1,66 @@
+import pytest
+from app.models import Job
+from app.geo import geocode, geohash_encode, haversine_km, jobs_within, search_precision, geocode_jobs_command
+
+
+class TestGeo:
+    """Test geocoding and geohash helpers."""
+    
+    def test_geocode_free_text(self):
+        """Test that names, aliases and comma-separated parts resolve."""
+        assert geocode('Tbilisi') == (41.7151, 44.8271)
+        assert geocode('ბათუმი') == (41.6168, 41.6367)
+        assert geocode('Office in Kutaisi, Georgia') == (42.2679, 42.6946)
+        assert geocode('Remote') is None
+    
+    def test_geohash_known_value(self):
+        """Test geohash encoding against a reference value."""
+        assert geohash_encode(57.64911, 10.40744, 11) == 'u4pruydqqvj'
+    
+    def test_search_precision_shrinks_with_radius(self):
+        """Test that larger radii use shorter prefixes."""
+        assert search_precision(41.7, 1) > search_precision(41.7, 50) > 0
+    
+    def test_haversine(self):
+        """Test distance between Tbilisi and Rustavi (about 25 km)."""
+        assert 20 < haversine_km(41.7151, 44.8271, 41.5495, 44.9932) < 30
+
+
+class TestRadiusSearch:
+    """Test the within-N-km listing filter."""
+    
+    def test_radius_filter(self, client, app, runner, make_job):
+        """Test that only jobs within the radius are listed."""
+        for city in ('Tbilisi', 'Rustavi', 'Batumi'):
+            make_job(title=f'{city} Job', location=city)
+        result = runner.invoke(geocode_jobs_command)
+        assert '3 located' in result.output
+        
+        page = client.get('/?near=Tbilisi&radius=50').data.decode('utf-8')
+        assert 'Tbilisi Job' in page and 'Rustavi Job' in page
+        assert 'Batumi Job' not in page
+        
+        page = client.get('/?near=Tbilisi&radius=5').data.decode('utf-8')
+        assert 'Rustavi Job' not in page
+    
+    def test_large_radius_without_prefix(self, app, runner, make_job):
+        """Test that radii too large for a geohash prefix are still filtered in SQL."""
+        for city in ('Tbilisi', 'Batumi'):
+            make_job(title=f'{city} Job', location=city)
+        with app.app_context():
+            runner.invoke(geocode_jobs_command)
+            assert search_precision(41.7151, 5000) == 0
+            query = jobs_within(Job.query, 41.7151, 44.8271, 5000)
+            assert sorted(job.title for job in query) == ['Batumi Job', 'Tbilisi Job']
+            assert [job.title for job in jobs_within(Job.query, 41.7151, 44.8271, 100)] == ['Tbilisi Job']
+    
+    def test_add_job_is_geocoded(self, client, auth, app, test_user):
+        """Test that new jobs get coordinates and a geohash."""
+        auth.login()
+        client.post('/add-job', data={
+            'title': 'Gori Job', 'short_description': 'Short', 'full_description': 'Full',
+            'company': 'Acme', 'salary': '', 'location': 'Gori', 'category': 'IT'
+        })
+        with app.app_context():
+            job = Job.query.filter_by(title='Gori Job').first()
+            assert job.geohash == geohash_encode(41.9842, 44.1158)
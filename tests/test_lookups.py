@@ -0,0 +1,73 @@
+from app import db
+from app.lookups import get_intern_cache, lookup_id
+from app.models import Category, Company, Job, Location
+
+
+class TestLookupInterning:
+    """Test the company, location and category lookup tables."""
+    
+    def test_values_are_interned_on_insert(self, app, make_job):
+        """Test that jobs sharing a value share one lookup row."""
+        first = make_job(company='Acme')
+        second = make_job(company='Acme', location='Batumi')
+        assert first.company_id == second.company_id
+        assert first.location_id != second.location_id
+        assert db.session.get(Company, first.company_id).name == 'Acme'
+        assert Location.query.count() == 2
+        assert Category.query.count() == 1
+    
+    def test_edit_reinterns_changed_value(self, app, make_job):
+        """Test that changing a string moves the job to the new lookup row."""
+        job = make_job()
+        job.category = 'Design'
+        db.session.commit()
+        assert db.session.get(Category, job.category_id).name == 'Design'
+        assert lookup_id('category', 'Design') == job.category_id
+    
+    def test_committed_ids_are_cached(self, app, make_job):
+        """Test that ids are cached once their transaction commits."""
+        job = make_job(company='Acme')
+        assert get_intern_cache().get(('company', 'Acme')) == job.company_id
+    
+    def test_rollback_does_not_cache(self, app, test_user):
+        """Test that an id from a rolled-back transaction never reaches the cache."""
+        job = Job(title='Developer', short_description='Short', full_description='Full desc',
+                  company='Ghost Ltd', location='Tbilisi', category='IT', author_id=test_user['id'])
+        db.session.add(job)
+        db.session.flush()
+        assert job.company_id is not None
+        db.session.rollback()
+        assert get_intern_cache().get(('company', 'Ghost Ltd')) is None
+        assert lookup_id('company', 'Ghost Ltd') is None
+    
+    def test_unknown_value_has_no_id(self, app):
+        """Test that filtering on an unused value finds no id without creating one."""
+        assert lookup_id('location', 'Nowhere') is None
+        assert Location.query.count() == 0
+
+
+class TestNormalizeLookups:
+    """Test the batched migration of existing jobs."""
+    
+    def test_command_fills_missing_ids(self, app, runner, make_job):
+        """Test that jobs stored before interning get their lookup ids."""
+        for company in ('Acme', 'Globex', 'Acme'):
+            make_job(company=company)
+        db.session.execute(db.update(Job).values(company_id=None, location_id=None, category_id=None))
+        db.session.commit()
+        
+        result = runner.invoke(args=['normalize-lookups', '--batch-size', '2'])
+        assert '3 jobs processed' in result.output
+        db.session.expire_all()
+        jobs = Job.query.order_by(Job.id).all()
+        assert all(job.location_id and job.category_id for job in jobs)
+        assert jobs[0].company_id == jobs[2].company_id != jobs[1].company_id
+        assert Company.query.count() == 2
+    
+    def test_category_feed_filters_on_id(self, app, client, make_job):
+        """Test that the category feed still selects jobs by category."""
+        make_job(category='IT')
+        make_job(category='Design')
+        body = client.get('/feeds/category/Design.rss').data.decode('utf-8')
+        assert body.count('<item>') == 1
+        assert client.get('/feeds/category/Marketing.rss').data.decode('utf-8').count('<item>') == 0
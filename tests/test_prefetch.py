@@ -0,0 +1,74 @@
+import threading
+import pytest
+from app import api_integration
+from app.prefetch import get_prefetcher
+from app.external_jobs import ExternalJob
+
+
+@pytest.fixture
+def fake_adzuna(monkeypatch):
+    """Replace the Adzuna client with a counter returning 3 pages of results."""
+    calls = []
+    
+    def search(query='', location='', results_per_page=20, page=1, country='gb', priority='interactive'):
+        calls.append(page)
+        return {'jobs': [ExternalJob(id=f'{page}-1', title=f'Remote Job page {page}', company='Acme',
+                                     location='London', description='Description', salary_min=1000,
+                                     salary_currency='GBP', redirect_url='https://example.com')],
+                'total': 60, 'page': page, 'results_per_page': 20}
+    
+    monkeypatch.setattr(api_integration, 'search_adzuna_jobs', search)
+    return calls
+
+
+class TestAdzunaPrefetch:
+    """Test background prefetching of the next explore-jobs page."""
+    
+    def test_next_page_is_prefetched(self, client, app, fake_adzuna):
+        """Test that page 2 is served from the prefetch store."""
+        response = client.get('/explore-jobs?q=python&page=1')
+        assert 'Remote Job page 1' in response.data.decode('utf-8')
+        prefetcher = get_prefetcher()
+        prefetcher.wait()
+        assert fake_adzuna == [1, 2]
+        
+        response = client.get('/explore-jobs?q=python&page=2')
+        assert 'Remote Job page 2' in response.data.decode('utf-8')
+        assert prefetcher.stats['hits'] == 1
+        prefetcher.wait()
+        # Page 3 is the last one, nothing after it
+        client.get('/explore-jobs?q=python&page=3')
+        prefetcher.wait()
+        assert fake_adzuna == [1, 2, 3]
+    
+    def test_budget_limits_prefetches(self, client, app, fake_adzuna):
+        """Test that prefetches stop once the per-minute budget is spent."""
+        app.config['ADZUNA_PREFETCH_PER_MINUTE'] = 1
+        client.get('/explore-jobs?q=a')
+        get_prefetcher().wait()
+        client.get('/explore-jobs?q=b')
+        get_prefetcher().wait()
+        assert get_prefetcher().stats['skipped_budget'] == 1
+        assert fake_adzuna == [1, 2, 1]
+    
+    def test_in_flight_prefetch_is_awaited(self, client, app, fake_adzuna, monkeypatch):
+        """Test that asking for a page while it is being prefetched does not fetch it twice."""
+        search = api_integration.search_adzuna_jobs
+        started, release = threading.Event(), threading.Event()
+        
+        def slow_search(page=1, **kwargs):
+            if page == 2:
+                started.set()
+                release.wait(5)
+            return search(page=page, **kwargs)
+        
+        monkeypatch.setattr(api_integration, 'search_adzuna_jobs', slow_search)
+        client.get('/explore-jobs?q=python&page=1')
+        assert started.wait(5)
+        threading.Timer(0.1, release.set).start()
+        response = client.get('/explore-jobs?q=python&page=2')
+        assert 'Remote Job page 2' in response.data.decode('utf-8')
+        prefetcher = get_prefetcher()
+        prefetcher.wait()
+        assert fake_adzuna.count(2) == 1
+        assert prefetcher.stats['waited'] == 1 and prefetcher.stats['hits'] == 1
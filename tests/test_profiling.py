@@ -0,0 +1,66 @@
+import json
+import pstats
+import pytest
+from app import create_app, db
+from tests.conftest import TestConfig
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Application factory with profiling on and dumps written to tmp_path."""
+    def factory(**settings):
+        class ProfileConfig(TestConfig):
+            PROFILE_ENABLED = True
+            PROFILE_TOKEN = 'let-me-profile'
+            PROFILE_DIR = str(tmp_path)
+        for key, value in settings.items():
+            setattr(ProfileConfig, key, value)
+        app = create_app(ProfileConfig)
+        with app.app_context():
+            db.create_all()
+        return app
+    
+    return factory
+
+
+class TestProfilerMiddleware:
+    """Test on-demand request profiling."""
+    
+    def test_unprofiled_request_writes_nothing(self, make_app, tmp_path):
+        """Test that requests without the header are not profiled."""
+        response = make_app().test_client().get('/')
+        assert response.status_code == 200
+        assert 'X-Profile-Id' not in response.headers
+        assert list(tmp_path.iterdir()) == []
+    
+    def test_wrong_token_is_ignored(self, make_app, tmp_path):
+        """Test that only the configured token enables profiling."""
+        make_app().test_client().get('/', headers={'X-Profile': 'guess'})
+        assert list(tmp_path.iterdir()) == []
+    
+    def test_profile_dump_is_tagged(self, make_app, tmp_path):
+        """Test that a profiled request leaves a .prof dump and its tags."""
+        response = make_app().test_client().get('/', headers={'X-Profile': 'let-me-profile'})
+        name = response.headers['X-Profile-Id']
+        tags = json.loads((tmp_path / f'{name}.json').read_text())
+        assert tags['endpoint'] == 'main.index'
+        assert tags['status'] == 200
+        assert tags['sql_queries'] >= 1
+        assert tags['duration_ms'] > 0
+        assert pstats.Stats(str(tmp_path / f'{name}.prof')).total_calls > 0
+    
+    def test_sampling_mode_writes_collapsed_stacks(self, make_app, tmp_path):
+        """Test that the sampling profiler writes collapsed stacks."""
+        app = make_app(PROFILE_MODE='sampling', PROFILE_SAMPLE_INTERVAL=0.0001)
+        response = app.test_client().get('/', headers={'X-Profile': 'let-me-profile'})
+        name = response.headers['X-Profile-Id']
+        collapsed = (tmp_path / f'{name}.collapsed').read_text()
+        assert all(line.rsplit(' ', 1)[1].isdigit() for line in collapsed.splitlines())
+    
+    def test_sample_rate_and_rotation(self, make_app, tmp_path):
+        """Test that sampled requests are profiled and old dumps are rotated out."""
+        client = make_app(PROFILE_SAMPLE_RATE=1.0, PROFILE_MAX_DUMPS=2).test_client()
+        for _ in range(4):
+            client.get('/about')
+        assert len(list(tmp_path.glob('*.prof'))) == 2
+        assert len(list(tmp_path.glob('*.json'))) == 2
@@ -0,0 +1,146 @@
+import pytest
+import requests
+from app import api_integration
+from app.prefetch import get_prefetcher
+from app.quota import MemoryQuotaStore, QuotaGovernor, QuotaUnavailable, SQLiteQuotaStore, get_quota
+
+
+def make_governor(store=None, minute=10, day=20, reserve=0.25):
+    return QuotaGovernor(store or MemoryQuotaStore(), minute, day, reserve=reserve)
+
+
+class TestQuotaGovernor:
+    """Test the Adzuna quota governor."""
+    
+    def test_every_budget_is_charged(self):
+        """Test that a call takes one token from each budget."""
+        quota = make_governor()
+        assert quota.acquire(now=0)
+        assert quota.remaining(now=0) == {'minute': 9, 'day': 19}
+    
+    def test_minute_budget_refills(self):
+        """Test that the minute budget refills while the daily one is still spent."""
+        quota = make_governor(minute=2, day=20)
+        assert quota.acquire(now=0) and quota.acquire(now=0)
+        assert not quota.acquire(now=0)
+        assert quota.acquire(now=30)
+        assert quota.remaining(now=30)['day'] == 17
+    
+    def test_daily_budget_is_exhausted(self):
+        """Test that the daily budget stops calls even with minute tokens left."""
+        quota = make_governor(minute=10, day=3)
+        for second in range(3):
+            assert quota.acquire(now=second * 60)
+        assert not quota.acquire(now=600)
+        assert quota.remaining(now=600)['minute'] == 10
+    
+    def test_daily_budget_resets_at_utc_midnight(self):
+        """Test that the daily count does not refill during the day, only at midnight UTC."""
+        quota = make_governor(minute=100, day=2)
+        assert quota.acquire(now=3600) and quota.acquire(now=3600)
+        assert not quota.acquire(now=86399)
+        assert quota.remaining(now=86399)['day'] == 0
+        assert quota.acquire(now=86400)
+        assert quota.remaining(now=86400)['day'] == 1
+    
+    def test_background_leaves_reserve(self):
+        """Test that background calls stop at the reserve, interactive ones do not."""
+        quota = make_governor(minute=100, day=8, reserve=0.25)
+        granted = 0
+        while quota.acquire('background', now=0):
+            granted += 1
+        assert granted == 6
+        assert not quota.available('background', now=0)
+        assert quota.available('interactive', now=0)
+        assert quota.acquire('interactive', now=0) and quota.acquire('interactive', now=0)
+        assert not quota.acquire('interactive', now=0)
+        assert quota.stats['background'] == 6
+        assert quota.stats['denied_interactive'] == 1
+    
+    def test_denied_call_is_not_charged(self):
+        """Test that a refused call leaves the other budgets untouched."""
+        quota = make_governor(minute=1, day=20)
+        quota.acquire(now=0)
+        quota.acquire(now=0)
+        assert quota.remaining(now=0)['day'] == 19
+    
+    def test_sqlite_store_is_shared(self, tmp_path):
+        """Test that two governors on the same file share one quota, as workers would."""
+        path = str(tmp_path / 'quota.db')
+        first = make_governor(SQLiteQuotaStore(path), minute=3, day=20)
+        second = make_governor(SQLiteQuotaStore(path), minute=3, day=20)
+        assert first.acquire(now=0)
+        assert second.acquire(now=0)
+        assert first.acquire(now=0)
+        assert not second.acquire(now=0)
+        assert second.remaining(now=0) == {'minute': 0, 'day': 17}
+    
+    def test_sqlite_store_creates_directory(self, tmp_path):
+        """Test that the quota file can live in a directory that does not exist yet."""
+        quota = make_governor(SQLiteQuotaStore(str(tmp_path / 'instance' / 'quota.db')))
+        assert quota.acquire(now=0)
+        assert (tmp_path / 'instance' / 'quota.db').exists()
+    
+    def test_store_error_is_quota_unavailable(self, tmp_path):
+        """Test that an unusable quota file raises QuotaUnavailable."""
+        (tmp_path / 'file').write_text('')
+        quota = make_governor(SQLiteQuotaStore(str(tmp_path / 'file' / 'quota.db')))
+        with pytest.raises(QuotaUnavailable):
+            quota.acquire()
+    
+    def test_get_quota_uses_config(self, app):
+        """Test that the app's governor is built from the configured budgets."""
+        with app.app_context():
+            quota = get_quota()
+            assert quota is get_quota()
+            assert quota.remaining() == {'minute': app.config['ADZUNA_QUOTA_PER_MINUTE'],
+                                         'day': app.config['ADZUNA_QUOTA_PER_DAY']}
+
+
+class TestQuotaPrefetch:
+    """Test that prefetching respects the shared quota."""
+    
+    def test_prefetch_skipped_at_reserve(self, client, app, monkeypatch):
+        """Test that no prefetch is scheduled once the quota is down to its reserve."""
+        calls = []
+        
+        def search(query='', location='', results_per_page=20, page=1, country='gb', priority='interactive'):
+            calls.append((page, priority))
+            return {'jobs': [], 'total': 60, 'page': page, 'results_per_page': 20}
+        
+        from app import api_integration
+        monkeypatch.setattr(api_integration, 'search_adzuna_jobs', search)
+        with app.app_context():
+            quota = get_quota()
+            while quota.acquire('background'):
+                pass
+        client.get('/explore-jobs?q=python&page=1')
+        with app.app_context():
+            prefetcher = get_prefetcher()
+            prefetcher.wait()
+            assert prefetcher.stats['skipped_quota'] == 1
+        assert calls == [(1, 'interactive')]
+    
+    def test_unavailable_store_lets_searches_through(self, app, tmp_path, monkeypatch):
+        """Test that an unusable quota store does not break interactive searches."""
+        (tmp_path / 'file').write_text('')
+        app.config.update(ADZUNA_QUOTA_DB=str(tmp_path / 'file' / 'quota.db'),
+                          ADZUNA_APP_ID='id', ADZUNA_API_KEY='key')
+        
+        class FakeResponse:
+            def raise_for_status(self):
+                pass
+            
+            def json(self):
+                return {'results': [], 'count': 0}
+        
+        monkeypatch.setattr(requests, 'get', lambda *args, **kwargs: FakeResponse())
+        with app.app_context():
+            assert api_integration.search_adzuna_jobs('python')['total'] == 0
+            assert api_integration.search_adzuna_jobs('python', priority='background') is None
+    
+    def test_cli_reports_remaining(self, app):
+        """Test the adzuna-quota command."""
+        result = app.test_cli_runner().invoke(args=['adzuna-quota'])
+        assert 'minute: ' in result.output
+        assert 'day: ' in result.output
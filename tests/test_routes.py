@@ -224,3 +224,102 @@ class TestAccountDeletion:
             job = Job.query.get(test_job['id'])
             assert job is None
 
+
+
+class TestAccountPurge:
+    """Test batched account deletion."""
+    
+    def test_purge_deletes_jobs_in_batches(self, app, test_user):
+        """Test that a purge removes all jobs and the user and tracks progress."""
+        from app.models import User, AccountPurge
+        from app.purge import start_account_purge
+        app.config['ACCOUNT_PURGE_BATCH_SIZE'] = 4
+        with app.app_context():
+            for i in range(10):
+                db.session.add(Job(title=f'Job {i}', short_description='Short',
+                                   full_description='Full', company='Company',
+                                   location='Tbilisi', category='IT',
+                                   author_id=test_user['id']))
+            db.session.commit()
+            
+            purge = start_account_purge(User.query.get(test_user['id']))
+            purge = AccountPurge.query.get(purge.id)
+            assert purge.total_jobs == 10
+            assert purge.deleted_jobs == 10
+            assert purge.progress == 1.0
+            assert Job.query.count() == 0
+            assert User.query.get(test_user['id']) is None
+    
+    def test_pending_purge_hides_jobs(self, client, app, test_user, test_job):
+        """Test that jobs of an account being purged are hidden from listings."""
+        from app.models import AccountPurge
+        with app.app_context():
+            db.session.add(AccountPurge(user_id=test_user['id'], username='testuser', total_jobs=1))
+            db.session.commit()
+        
+        assert test_job['title'] not in client.get('/').data.decode('utf-8')
+        assert client.get(f'/job/{test_job["id"]}').status_code == 404
+
+
+class TestStartup:
+    """Test fast-startup options of the application factory."""
+    
+    def test_startup_timings_recorded(self, app):
+        """Test that every startup phase is timed."""
+        phases = [phase for phase, _ in app.extensions['startup_timings']]
+        assert phases == ['config', 'extensions', 'blueprints', 'logging']
+    
+    def test_warmup_and_bytecode_cache(self, tmp_path):
+        """Test that warm-up compiles all templates into the on-disk cache."""
+        from app import create_app
+        from tests.conftest import TestConfig
+        
+        class WarmConfig(TestConfig):
+            STARTUP_WARMUP = True
+            JINJA_BYTECODE_CACHE_DIR = str(tmp_path)
+        
+        app = create_app(WarmConfig)
+        assert 'warmup' in dict(app.extensions['startup_timings'])
+        assert len(list(tmp_path.iterdir())) >= 10
+
+
+class TestStreaming:
+    """Test streamed rendering of the listing pages."""
+    
+    @pytest.fixture
+    def streaming_app(self, app):
+        app.config['STREAM_TEMPLATES'] = True
+        return app
+    
+    def test_head_is_flushed_before_listing(self, streaming_app, make_job):
+        """Test that the navigation arrives in its own chunk ahead of the jobs."""
+        make_job(title='Streamed Developer')
+        response = streaming_app.test_client().get('/')
+        assert response.is_streamed
+        chunks = list(response.response)
+        response.close()
+        assert 'navbar' in chunks[0].decode() and 'Streamed Developer' not in chunks[0].decode()
+        body = b''.join(chunks).decode()
+        assert 'Streamed Developer' in body
+        assert '<!--stream-flush-->' not in body
+    
+    def test_error_mid_stream(self, streaming_app, monkeypatch):
+        """Test that a failing query ends the page with an error message."""
+        from flask_sqlalchemy.query import Query
+        
+        def broken_paginate(self, **kwargs):
+            raise RuntimeError('database went away')
+        
+        monkeypatch.setattr(Query, 'paginate', broken_paginate)
+        response = streaming_app.test_client().get('/')
+        body = response.get_data(as_text=True)
+        assert response.status_code == 200
+        assert 'navbar' in body
+        assert 'გვერდის ჩატვირთვისას მოხდა შეცდომა' in body
+    
+    def test_user_jobs_streamed(self, streaming_app, make_job):
+        """Test that a user's job list streams as well."""
+        make_job(title='Profile Listing')
+        response = streaming_app.test_client().get('/user/testuser')
+        assert response.is_streamed
+        assert 'Profile Listing' in response.get_data(as_text=True)
@@ -0,0 +1,69 @@
+import pytest
+from app import db
+from app.models import Job
+from app.salary import parse_salary, format_salary, backfill_salaries_command
+
+
+class TestSalaryParsing:
+    """Test free-text salary normalization."""
+    
+    @pytest.mark.parametrize('text, expected', [
+        ('1000-2000', (1000, 2000, 'GEL')),
+        ('1 500 - 2 500 ₾', (1500, 2500, 'GEL')),
+        ('$1,500+', (1500, None, 'USD')),
+        ('up to 3000 EUR', (None, 3000, 'EUR')),
+        ('3000 ლარამდე', (None, 3000, 'GEL')),
+        ('2k-3k £', (2000, 3000, 'GBP')),
+        ('1200', (1200, 1200, 'GEL')),
+        ('from 1000 to 2000 USD', (1000, 2000, 'USD')),
+        ('1000-დან 2000-მდე', (1000, 2000, 'GEL')),
+        ('1500 – 2500 ₾', (1500, 2500, 'GEL')),
+        ('Salary for administrator 2000', (2000, 2000, 'GEL')),
+        ('2000 GEL per month, 5 days', (2000, 2000, 'GEL')),
+        ('1500 (minimum experience 2 years)', (1500, 1500, 'GEL')),
+        ('min 1500', (1500, None, 'GEL')),
+        ('შეთანხმებით', (None, None, None)),
+        ('', (None, None, None)),
+    ])
+    def test_parse_salary(self, text, expected):
+        """Test ranges, open ranges, currencies and unparseable text."""
+        assert parse_salary(text, default_currency='GEL') == expected
+    
+    def test_format_salary(self):
+        """Test display strings built from numbers."""
+        assert format_salary(1000, 2000, 'USD') == '$1,000 - $2,000'
+        assert format_salary(None, 3000, 'GBP') == 'Up to £3,000'
+        assert format_salary(None, None, None) == 'არ არის მითითებული'
+
+
+class TestSalaryFiltering:
+    """Test salary columns on write, backfill and listing filters."""
+    
+    def test_add_job_fills_salary_columns(self, client, auth, app, test_user):
+        """Test that posting a job parses its salary."""
+        auth.login()
+        client.post('/add-job', data={
+            'title': 'Accountant', 'short_description': 'Short', 'full_description': 'Full',
+            'company': 'Acme', 'salary': '2000-3000 ლარი', 'location': 'Tbilisi', 'category': 'Finance'
+        })
+        with app.app_context():
+            job = Job.query.filter_by(title='Accountant').first()
+            assert (job.salary_min, job.salary_max, job.salary_currency) == (2000, 3000, 'GEL')
+    
+    def test_backfill_and_filter(self, client, app, runner, test_user, test_job):
+        """Test that backfilled salaries can be filtered and sorted."""
+        with app.app_context():
+            db.session.add(Job(title='Well Paid Job', short_description='Short', full_description='Full',
+                               company='Acme', salary='5000+', location='Tbilisi', category='IT',
+                               author_id=test_user['id']))
+            db.session.commit()
+        
+        result = runner.invoke(backfill_salaries_command)
+        assert '2 salaries parsed' in result.output
+        
+        page = client.get('/?min_salary=3000').data.decode('utf-8')
+        assert 'Well Paid Job' in page
+        assert test_job['title'] not in page
+        
+        page = client.get('/?sort=salary').data.decode('utf-8')
+        assert page.index('Well Paid Job') < page.index(test_job['title'])
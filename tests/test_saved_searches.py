@@ -0,0 +1,109 @@
+import pytest
+from app import db
+from app.models import Job, SavedSearch, SearchMatch
+from app.matching import SavedSearchIndex, deliver_matches
+
+
+def post_job(client, **overrides):
+    data = {
+        'title': 'Senior Python Developer',
+        'short_description': 'Backend role',
+        'full_description': 'Flask and SQLAlchemy experience required',
+        'company': 'Acme',
+        'salary': '',
+        'location': 'Tbilisi, Georgia',
+        'category': 'IT'
+    }
+    data.update(overrides)
+    return client.post('/add-job', data=data, follow_redirects=True)
+
+
+class TestSavedSearches:
+    """Test saved searches and incremental matching of new jobs."""
+    
+    def test_saved_searches_requires_login(self, client):
+        """Test that saved searches page requires login."""
+        response = client.get('/saved-searches')
+        assert response.status_code == 302
+    
+    def test_create_saved_search(self, client, auth, app, test_user):
+        """Test that a logged in user can save a search."""
+        auth.login()
+        response = client.post('/saved-searches', data={
+            'keywords': 'python', 'category': 'IT', 'location': 'Tbilisi'
+        }, follow_redirects=True)
+        assert response.status_code == 200
+        assert 'ძიება შენახულია' in response.data.decode('utf-8')
+        with app.app_context():
+            assert SavedSearch.query.filter_by(user_id=test_user['id']).count() == 1
+    
+    def test_new_job_matches_other_users_search(self, client, auth, app, test_user, test_user2):
+        """Test that posting a job writes outbox rows only for matching searches."""
+        with app.app_context():
+            db.session.add_all([
+                SavedSearch(user_id=test_user2['id'], keywords='python developer', location='tbilisi'),
+                SavedSearch(user_id=test_user2['id'], keywords='', category='IT'),
+                SavedSearch(user_id=test_user2['id'], keywords='java'),
+                SavedSearch(user_id=test_user2['id'], keywords='python', category='Design'),
+                SavedSearch(user_id=test_user['id'], keywords='python'),
+            ])
+            db.session.commit()
+        
+        auth.login()
+        post_job(client)
+        
+        with app.app_context():
+            matches = SearchMatch.query.all()
+            keywords = sorted(m.saved_search.keywords for m in matches)
+            assert keywords == ['', 'python developer']
+    
+    def test_edit_does_not_duplicate_matches(self, client, auth, app, test_user, test_user2):
+        """Test that re-matching an edited job does not queue the same match twice."""
+        with app.app_context():
+            db.session.add(SavedSearch(user_id=test_user2['id'], keywords='python'))
+            db.session.commit()
+        
+        auth.login()
+        post_job(client)
+        with app.app_context():
+            job = Job.query.first()
+            job_id = job.id
+        client.post(f'/job/{job_id}/edit', data={
+            'title': 'Python Developer', 'short_description': 'Backend role',
+            'full_description': 'Updated', 'company': 'Acme', 'salary': '',
+            'location': 'Tbilisi', 'category': 'IT'
+        }, follow_redirects=True)
+        
+        with app.app_context():
+            assert SearchMatch.query.count() == 1
+    
+    def test_delivery_drains_outbox(self, client, auth, app, test_user, test_user2):
+        """Test that the delivery loop marks matches delivered."""
+        with app.app_context():
+            db.session.add(SavedSearch(user_id=test_user2['id'], keywords='python'))
+            db.session.commit()
+        auth.login()
+        post_job(client)
+        
+        with app.app_context():
+            delivered = []
+            assert deliver_matches(deliver=delivered.append) == 1
+            assert len(delivered) == 1
+            assert deliver_matches(deliver=delivered.append) == 0
+    
+    def test_other_workers_searches_are_applied_by_id(self, app, test_user2, make_job, monkeypatch):
+        """Test that a refresh loads only new searches and drops deleted ones without a rebuild."""
+        job = make_job(title='Python Developer')
+        index = SavedSearchIndex(ttl=0)
+        assert index.match(job) == []
+        monkeypatch.setattr(index, '_build', lambda: pytest.fail('full rebuild'))
+        
+        search = SavedSearch(user_id=test_user2['id'], keywords='python')
+        db.session.add(search)
+        db.session.commit()
+        assert index.match(job) == [search.id]
+        
+        db.session.delete(search)
+        db.session.commit()
+        assert index.match(job) == []
+        assert search.id not in index._searches
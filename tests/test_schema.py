@@ -0,0 +1,55 @@
+from app import db
+from app.models import Job, User
+from app.schema import UPGRADES, upgrade_schema
+
+# The user and job tables as the first release created them
+BASELINE_DDL = [
+    'CREATE TABLE user (id INTEGER PRIMARY KEY, username VARCHAR(64) NOT NULL UNIQUE, '
+    'email VARCHAR(120) NOT NULL UNIQUE, password_hash VARCHAR(256) NOT NULL, '
+    'profile_image VARCHAR(200), date_created DATETIME)',
+    'CREATE TABLE job (id INTEGER PRIMARY KEY, title VARCHAR(200) NOT NULL, '
+    'short_description VARCHAR(300) NOT NULL, full_description TEXT NOT NULL, '
+    'company VARCHAR(100) NOT NULL, salary VARCHAR(100), location VARCHAR(100) NOT NULL, '
+    'category VARCHAR(50) NOT NULL, date_posted DATETIME, '
+    'author_id INTEGER NOT NULL REFERENCES user (id))',
+    "INSERT INTO user (id, username, email, password_hash) VALUES (1, 'old', 'old@example.com', 'x')",
+    "INSERT INTO job (id, title, short_description, full_description, company, location, category, author_id) "
+    "VALUES (1, 'Old Job', 'Short', 'Full', 'Acme', 'Tbilisi', 'IT', 1)",
+]
+
+
+class TestUpgradeSchema:
+    """Test upgrading a database created by an earlier release."""
+    
+    def _create_baseline(self):
+        db.drop_all()
+        with db.engine.begin() as connection:
+            for statement in BASELINE_DDL:
+                connection.execute(db.text(statement))
+    
+    def test_adds_missing_columns(self, app):
+        """Test that every column added since the first release is created."""
+        self._create_baseline()
+        added = upgrade_schema()
+        assert len(added) == sum(len(columns) for _, _, columns in UPGRADES)
+        
+        job = db.session.get(Job, 1)
+        assert job.title == 'Old Job' and job.views == 0 and job.category_id is None
+        assert db.session.get(User, 1).deleted_at is None
+        indexes = {index['name'] for index in db.inspect(db.engine).get_indexes('job')}
+        assert {'ix_job_geohash', 'ix_job_popularity', 'ix_job_salary_currency_min',
+                'ix_job_category_id'} <= indexes
+    
+    def test_lookup_backfill_after_upgrade(self, app, runner):
+        """Test that build.sh's backfill fills the lookup ids of jobs from before the upgrade."""
+        self._create_baseline()
+        upgrade_schema()
+        assert '1 jobs processed' in runner.invoke(args=['normalize-lookups']).output
+        assert db.session.get(Job, 1).category_id is not None
+        assert '0 jobs processed' in runner.invoke(args=['normalize-lookups']).output
+    
+    def test_is_idempotent(self, app, runner):
+        """Test that running the upgrade on a current schema changes nothing."""
+        assert upgrade_schema() == []
+        result = runner.invoke(args=['upgrade-db'])
+        assert '0 columns added' in result.output
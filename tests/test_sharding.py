@@ -0,0 +1,176 @@
+from collections import Counter
+from datetime import datetime, timedelta
+import pytest
+from app import db
+from app.models import Job
+from app.sharding import JobShards, get_shards, job_table, shard_for
+
+
+def job_values(author_id, title, minutes_ago):
+    return {'title': title, 'short_description': 'Short desc', 'full_description': 'Full desc',
+            'company': 'Company', 'location': 'Tbilisi', 'category': 'IT', 'author_id': author_id,
+            'date_posted': datetime(2025, 1, 1) - timedelta(minutes=minutes_ago),
+            'views': 0, 'popularity': 0.0}
+
+
+@pytest.fixture
+def shard_urls(tmp_path):
+    return [f'sqlite:///{tmp_path}/shard{i}.db' for i in range(3)]
+
+
+class TestShardRouting:
+    """Test placement of authors on shards."""
+    
+    def test_rendezvous_hashing_moves_few_authors(self):
+        """Test that adding a fourth shard only moves authors onto the new shard."""
+        before = {author: shard_for(author, 3) for author in range(1, 2001)}
+        after = {author: shard_for(author, 4) for author in range(1, 2001)}
+        moved = [author for author in before if before[author] != after[author]]
+        assert all(after[author] == 3 for author in moved)
+        assert 300 < len(moved) < 700
+        assert min(Counter(before.values()).values()) > 550
+
+
+class TestJobShards:
+    """Test the sharded job store on local SQLite files."""
+    
+    def test_writes_go_to_author_shard_with_global_ids(self, app, shard_urls):
+        """Test routing of inserts and uniqueness of ids across shards."""
+        shards = JobShards(shard_urls, db.engine, block_size=4)
+        ids = [shards.insert(job_values(author, f'Job {author}', author)) for author in range(1, 31)]
+        assert len(set(ids)) == 30
+        for author in (1, 2, 3):
+            with shards.engine_for(author).connect() as connection:
+                authors = connection.execute(db.select(job_table.c.author_id)).scalars().all()
+            assert author in authors
+        assert shards.count() == 30
+        assert shards.get(ids[4]).title == 'Job 5'
+    
+    def test_ids_continue_after_primary_jobs(self, app, shard_urls, test_user):
+        """Test that global ids start after the jobs already in the primary database."""
+        job = Job(title='Old', short_description='s', full_description='f', company='c',
+                  location='l', category='IT', author_id=test_user['id'])
+        db.session.add(job)
+        db.session.commit()
+        shards = JobShards(shard_urls, db.engine)
+        assert shards.insert(job_values(1, 'New', 0)) == job.id + 1
+    
+    def test_merged_listing_is_globally_ordered(self, app, shard_urls):
+        """Test the k-way merge of per-shard pages on date_posted."""
+        shards = JobShards(shard_urls, db.engine)
+        for n in range(25):
+            shards.insert(job_values(n % 7 + 1, f'Job {n}', minutes_ago=n))
+        first = shards.recent(page=1, per_page=10)
+        third = shards.recent(page=3, per_page=10)
+        assert [row.title for row in first] == [f'Job {n}' for n in range(10)]
+        assert [row.title for row in third] == [f'Job {n}' for n in range(20, 25)]
+        assert [row.title for row in shards.recent(1, 3, [job_table.c.author_id == 2])] == \
+            ['Job 1', 'Job 8', 'Job 15']
+    
+    def test_update_and_delete(self, app, shard_urls):
+        """Test that updates and deletes reach the author's shard."""
+        shards = JobShards(shard_urls, db.engine)
+        job_id = shards.insert(job_values(5, 'Draft', 0))
+        assert shards.update(job_id, 5, {'title': 'Final'}) == 1
+        assert shards.get(job_id).title == 'Final'
+        assert shards.delete(job_id, 5) == 1
+        assert shards.get(job_id) is None
+    
+    def test_rebalance_after_adding_a_shard(self, app, shard_urls, tmp_path):
+        """Test that rebalancing puts every job on its author's shard without losses."""
+        shards = JobShards(shard_urls[:2], db.engine)
+        for author in range(1, 41):
+            shards.insert(job_values(author, f'Job {author}', author))
+        grown = JobShards(shard_urls, db.engine)
+        moved = grown.rebalance(batch_size=7)
+        assert moved > 0
+        assert grown.count() == 40
+        for index, engine in enumerate(grown.engines):
+            with engine.connect() as connection:
+                authors = connection.execute(db.select(job_table.c.author_id)).scalars().all()
+            assert all(shard_for(author, 3) == index for author in authors)
+        assert grown.rebalance() == 0
+
+
+def form_data(title, salary='1000 GEL'):
+    return {'title': title, 'short_description': 'Short description', 'full_description': 'Full description',
+            'company': 'Company', 'salary': salary, 'location': 'Tbilisi', 'category': 'IT'}
+
+
+class TestShardedRoutes:
+    """Test the job pages with JOB_SHARDS configured."""
+    
+    @pytest.fixture
+    def shards(self, app, shard_urls):
+        app.config['JOB_SHARDS'] = shard_urls
+        return get_shards()
+    
+    def test_add_job_goes_to_author_shard(self, client, auth, shards, test_user, test_user2):
+        """Test that a posted job is stored on its author's shard only."""
+        auth.login()
+        response = client.post('/add-job', data=form_data('Sharded Job'), follow_redirects=True)
+        assert 'Sharded Job' in response.data.decode('utf-8')
+        assert Job.query.count() == 0
+        for index, engine in enumerate(shards.engines):
+            with engine.connect() as connection:
+                titles = connection.execute(db.select(job_table.c.title)).scalars().all()
+            assert titles == (['Sharded Job'] if index == shard_for(test_user['id'], 3) else [])
+    
+    def test_index_merges_shards_by_date(self, client, auth, shards, test_user, test_user2):
+        """Test that the index lists jobs from every shard, newest first, with filters."""
+        assert shard_for(test_user['id'], 3) != shard_for(test_user2['id'], 3)
+        for n in range(12):
+            author = test_user if n % 2 else test_user2
+            values = job_values(author['id'], f'Job {n:02d}', minutes_ago=n)
+            values['salary_currency'], values['salary_min'] = 'GEL', 100 * n
+            shards.insert(values)
+        first = client.get('/').data.decode('utf-8')
+        assert '12 ვაკანსია' in first
+        assert first.index('Job 00') < first.index('Job 01') < first.index('Job 08')
+        assert 'Job 09' not in first
+        second = client.get('/?page=2').data.decode('utf-8')
+        assert 'Job 09' in second and 'Job 11' in second and 'Job 08' not in second
+        filtered = client.get('/?currency=GEL&min_salary=1000').data.decode('utf-8')
+        assert 'Job 10' in filtered and 'Job 09' not in filtered
+        mine = client.get('/user/testuser').data.decode('utf-8')
+        assert 'Job 01' in mine and 'Job 00' not in mine
+    
+    def test_edit_and_delete(self, client, auth, shards, test_user, test_user2):
+        """Test that edits and deletes reach the shard and only the author may make them."""
+        job_id = shards.insert(job_values(test_user['id'], 'Draft', 0))
+        auth.login(email=test_user2['email'])
+        client.post(f'/job/{job_id}/edit', data=form_data('Hijacked'))
+        client.post(f'/job/{job_id}/delete')
+        assert shards.get(job_id).title == 'Draft'
+        auth.logout()
+        auth.login()
+        client.post(f'/job/{job_id}/edit', data=form_data('Final', salary='2000-3000 GEL'))
+        row = shards.get(job_id)
+        assert (row.title, row.salary_min, row.salary_max) == ('Final', 2000, 3000)
+        assert 'Final' in client.get(f'/job/{job_id}').data.decode('utf-8')
+        client.post(f'/job/{job_id}/delete')
+        assert shards.get(job_id) is None
+        assert client.get(f'/job/{job_id}').status_code == 404
+
+
+class TestShardCommands:
+    """Test the `flask shards` commands."""
+    
+    def test_import_and_stats(self, app, runner, shard_urls, test_user):
+        """Test copying primary jobs to shards."""
+        app.config['JOB_SHARDS'] = shard_urls
+        for n in range(3):
+            db.session.add(Job(title=f'Job {n}', short_description='s', full_description='f',
+                               company='c', location='l', category='IT', author_id=test_user['id']))
+        db.session.commit()
+        result = runner.invoke(args=['shards', 'import'])
+        assert '3 jobs copied to 3 shards.' in result.output
+        assert '0 jobs copied' in runner.invoke(args=['shards', 'import']).output
+        stats = runner.invoke(args=['shards', 'stats']).output
+        assert stats.count('shard ') == 3 and ': 3 jobs' in stats
+    
+    def test_commands_need_configuration(self, runner):
+        """Test that the commands refuse to run without JOB_SHARDS."""
+        result = runner.invoke(args=['shards', 'rebalance'])
+        assert result.exit_code != 0
+        assert 'JOB_SHARDS is not configured' in result.output
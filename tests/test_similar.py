@@ -0,0 +1,101 @@
+from app import db
+from app.models import Job, SimilarJob
+from app.similar import SimilarityIndex, get_similarity_index, index_similar_job, similar_jobs
+from app.tasks import run_pending
+
+
+class TestSimilarityIndex:
+    """Test TF-IDF vectors and neighbour search."""
+    
+    def test_vectors_are_normalised(self, app, make_job):
+        """Test that vectors have unit length."""
+        make_job(title='Python Developer', full_description='Django and Flask backend work')
+        index = SimilarityIndex()
+        index.build()
+        vector = next(iter(index._vectors.values()))
+        assert abs(sum(w * w for w in vector.values()) - 1) < 1e-9
+    
+    def test_neighbours_rank_by_similarity(self, app, make_job):
+        """Test that the closest job comes first."""
+        python = make_job(title='Python Developer', short_description='Python backend',
+                          full_description='Python backend services with Flask')
+        django = make_job(title='Django Developer', short_description='Python web',
+                          full_description='Python web services with Django')
+        make_job(title='Accountant', short_description='Bookkeeping',
+                 full_description='Bookkeeping, invoices and tax reports')
+        index = SimilarityIndex(k=2)
+        index.build()
+        neighbours = index.neighbors(python.id)
+        assert neighbours[0][0] == django.id
+        assert len(neighbours) == 1
+    
+    def test_reindexing_keeps_document_frequencies(self, app, make_job):
+        """Test that updating an indexed job replaces its terms instead of counting it again."""
+        job = make_job(title='Python Developer', full_description='Python backend services')
+        make_job(title='Accountant', full_description='Bookkeeping and tax reports')
+        index = SimilarityIndex()
+        index.build()
+        for _ in range(3):
+            index.update(job)
+        assert index._docs == 2 and index._df['python'] == 1
+        
+        job.title, job.full_description = 'Go Developer', 'Go backend services'
+        index.update(job)
+        assert index._docs == 2 and 'python' not in index._df and index._df['go'] == 1
+        index.remove(job.id)
+        assert index._docs == 1 and 'go' not in index._df
+
+
+class TestSimilarJobs:
+    """Test precomputed similar jobs."""
+    
+    def test_command_precomputes_neighbours(self, app, runner, make_job):
+        """Test that the rebuild command stores neighbour lists."""
+        first = make_job(title='Data Analyst', full_description='SQL reporting and dashboards')
+        second = make_job(title='BI Analyst', full_description='SQL dashboards and reporting tools')
+        result = runner.invoke(args=['similar-jobs'])
+        assert '2 jobs indexed, 2 similar-job links stored.' in result.output
+        assert [job.id for job in similar_jobs(first.id)] == [second.id]
+    
+    def test_new_job_updates_incrementally(self, app, make_job):
+        """Test that a new job gets neighbours and joins the lists of similar jobs."""
+        first = make_job(title='Frontend Developer', full_description='React and TypeScript interfaces')
+        get_similarity_index().ensure_fresh()
+        second = make_job(title='React Developer', full_description='React interfaces in TypeScript')
+        index_similar_job(second)
+        db.session.commit()
+        assert [job.id for job in similar_jobs(second.id)] == [first.id]
+        # Offering the new job to the older one's list is done by the task queue
+        assert similar_jobs(first.id) == []
+        assert run_pending() == 1
+        assert [job.id for job in similar_jobs(first.id)] == [second.id]
+    
+    def test_fanout_is_capped(self, app, make_job):
+        """Test that a new job is offered only to the best-scoring existing jobs."""
+        app.config['SIMILAR_JOBS_FANOUT'] = 2
+        for n in range(4):
+            make_job(title=f'Go Developer {n}', full_description='Go microservices and gRPC')
+        get_similarity_index().ensure_fresh()
+        job = make_job(title='Go Engineer', full_description='Go microservices and gRPC')
+        index_similar_job(job)
+        db.session.commit()
+        run_pending()
+        assert SimilarJob.query.filter_by(similar_id=job.id).count() == 2
+    
+    def test_shown_on_job_detail(self, client, app, auth, test_user):
+        """Test that job_detail lists similar jobs added through the site."""
+        auth.login()
+        for title in ('Mobile Developer', 'Mobile Engineer'):
+            client.post('/add-job', data={
+                'title': title,
+                'short_description': 'Building mobile apps',
+                'full_description': f'{title} building iOS and Android applications',
+                'company': 'Company',
+                'location': 'Tbilisi',
+                'category': 'IT'
+            })
+        run_pending()
+        job = Job.query.filter_by(title='Mobile Developer').first()
+        html = client.get(f'/job/{job.id}').get_data(as_text=True)
+        assert 'მსგავსი ვაკანსიები' in html and 'Mobile Engineer' in html
+        assert SimilarJob.query.count() == 2
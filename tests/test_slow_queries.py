@@ -0,0 +1,71 @@
+import pytest
+from app import create_app, db
+from app.models import Job, User
+from app.slow_queries import is_full_scan
+from tests.conftest import TestConfig
+
+
+class SlowConfig(TestConfig):
+    SLOW_QUERY_THRESHOLD_MS = 0
+
+
+@pytest.fixture
+def slow_app():
+    app = create_app(SlowConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+class TestSlowQueryLog:
+    """Test slow-query logging with query plans."""
+    
+    def test_records_route_and_plan(self, slow_app):
+        """Test that statements from a request carry the route and a plan."""
+        log = slow_app.extensions['slow_queries']
+        log.records.clear()
+        slow_app.test_client().get('/user/nobody')
+        record = next(r for r in log.records if 'FROM user' in r['statement'])
+        assert record['route'] == 'main.user_jobs GET /user/nobody'
+        assert "'nobody'" in record['parameters']
+        assert record['plan']
+    
+    def test_full_scan_is_flagged(self, slow_app, caplog):
+        """Test that an unindexed filter is reported as a full scan."""
+        log = slow_app.extensions['slow_queries']
+        Job.query.filter(Job.company == 'Acme').all()
+        assert log.records[-1]['full_scan'] is True
+        assert '[FULL SCAN]' in caplog.text
+        
+        User.query.filter_by(username='someone').first()
+        assert log.records[-1]['full_scan'] is False
+    
+    def test_plan_captured_once_per_statement(self, slow_app):
+        """Test that EXPLAIN runs once for repeated statements."""
+        log = slow_app.extensions['slow_queries']
+        for _ in range(3):
+            db.session.get(User, 1)
+            db.session.expire_all()
+        assert len(log.plans) == 1
+    
+    def test_fast_queries_are_not_logged(self, app):
+        """Test that queries under the default threshold are ignored."""
+        User.query.all()
+        assert len(app.extensions['slow_queries'].records) == 0
+
+
+class TestFullScanDetection:
+    """Test query plan classification."""
+    
+    def test_sqlite_plans(self):
+        """Test SQLite plan lines."""
+        assert is_full_scan('sqlite', ['SCAN job'])
+        assert not is_full_scan('sqlite', ['SEARCH job USING INDEX ix_job_author_id (author_id=?)'])
+        assert not is_full_scan('sqlite', ['SCAN job USING INDEX ix_job_date_posted'])
+    
+    def test_postgres_plans(self):
+        """Test Postgres plan lines."""
+        assert is_full_scan('postgresql', ['Seq Scan on job  (cost=0.00..1.05 rows=5 width=4)'])
+        assert not is_full_scan('postgresql', ['Index Scan using job_pkey on job'])
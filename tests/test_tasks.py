@@ -0,0 +1,148 @@
+from datetime import datetime, timedelta
+from app import db
+from app.models import Task, User, AccountPurge
+from app.tasks import TASKS, enqueue, run_next, run_pending, task
+
+calls = []
+
+
+@task('test_record')
+def record_call(value):
+    calls.append(value)
+
+
+@task('test_flaky')
+def flaky(fail_times):
+    calls.append('attempt')
+    if len(calls) <= fail_times:
+        raise RuntimeError('temporary failure')
+
+
+class TestTaskQueue:
+    """Test the durable task queue."""
+    
+    def setup_method(self):
+        calls.clear()
+    
+    def test_enqueue_and_run(self, app):
+        """Test that a committed task is run once and marked done."""
+        enqueue('test_record', {'value': 42})
+        db.session.commit()
+        assert run_pending() == 1
+        assert calls == [42]
+        assert Task.query.one().status == 'done'
+        assert run_next() is None
+    
+    def test_uncommitted_task_is_not_visible(self, app):
+        """Test that a rolled back enqueue leaves nothing behind."""
+        enqueue('test_record', {'value': 1})
+        db.session.rollback()
+        assert run_pending() == 0
+    
+    def test_idempotency_key(self, app):
+        """Test that the same key yields the same task."""
+        first = enqueue('test_record', {'value': 1}, key='once')
+        db.session.commit()
+        second = enqueue('test_record', {'value': 2}, key='once')
+        assert first.id == second.id
+        assert Task.query.count() == 1
+    
+    def test_idempotency_key_in_concurrent_transactions(self, app):
+        """Test that a key already committed by another worker yields its task."""
+        other = db.session.session_factory()
+        other.add(Task(name='test_record', payload='{}', idempotency_key='race'))
+        other.commit()
+        other.close()
+        task = enqueue('test_record', {'value': 2}, key='race')
+        db.session.commit()
+        assert Task.query.count() == 1
+        assert task.payload == '{}'
+    
+    def test_retry_with_backoff(self, app):
+        """Test that a failing task is rescheduled with growing delays."""
+        app.config['TASK_RETRY_BASE'] = 10
+        enqueue('test_flaky', {'fail_times': 1})
+        db.session.commit()
+        failed = run_next()
+        assert failed.status == 'queued' and failed.attempts == 1
+        assert 'temporary failure' in failed.last_error
+        assert failed.run_at > datetime.utcnow() + timedelta(seconds=9)
+        assert run_next() is None
+        
+        failed.run_at = datetime.utcnow()
+        db.session.commit()
+        assert run_next().status == 'done'
+    
+    def test_gives_up_after_max_attempts(self, app):
+        """Test that a task fails permanently after max_attempts."""
+        enqueue('test_flaky', {'fail_times': 5}, max_attempts=1)
+        db.session.commit()
+        assert run_next().status == 'failed'
+        assert run_pending() == 0
+    
+    def test_visibility_timeout(self, app):
+        """Test that a task leased by a crashed worker is picked up again."""
+        enqueue('test_record', {'value': 7})
+        db.session.commit()
+        leased = Task.query.one()
+        leased.status, leased.attempts = 'running', 1
+        leased.locked_until = datetime.utcnow() + timedelta(minutes=5)
+        db.session.commit()
+        assert run_next() is None
+        
+        leased.locked_until = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+        assert run_next().attempts == 2
+        assert calls == [7]
+    
+    def test_expired_lease_on_last_attempt_fails(self, app):
+        """Test that a lease expiring after the final attempt does not run the task again."""
+        enqueue('test_record', {'value': 7}, max_attempts=1)
+        db.session.commit()
+        leased = Task.query.one()
+        leased.status, leased.attempts = 'running', 1
+        leased.locked_until = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+        assert run_next() is None
+        db.session.refresh(leased)
+        assert leased.status == 'failed' and leased.attempts == 1
+        assert leased.last_error == 'Visibility timeout expired'
+        assert calls == []
+    
+    def test_worker_command_burst(self, app, runner):
+        """Test that `flask worker --burst` drains the queue."""
+        for value in range(3):
+            enqueue('test_record', {'value': value})
+        db.session.commit()
+        result = runner.invoke(args=['worker', '--burst'])
+        assert '3 tasks processed.' in result.output
+        assert sorted(calls) == [0, 1, 2]
+
+
+class TestDeferredWork:
+    """Test request handlers that hand work to the queue."""
+    
+    def test_delete_account_defers_purge_and_image(self, app, client, auth, test_user, tmp_path):
+        """Test that account deletion returns after enqueueing the purge and image removal."""
+        app.config['ACCOUNT_PURGE_ASYNC'] = True
+        app.config['UPLOAD_FOLDER'] = str(tmp_path)
+        (tmp_path / 'avatar.png').write_bytes(b'png')
+        user = db.session.get(User, test_user['id'])
+        user.profile_image = 'avatar.png'
+        db.session.commit()
+        
+        auth.login()
+        client.post('/delete-account', data={'password': 'testpass123', 'confirm_delete': 'DELETE'})
+        names = sorted(t.name for t in Task.query.all())
+        assert names == ['delete_upload', 'purge_account']
+        assert (tmp_path / 'avatar.png').exists()
+        assert AccountPurge.query.one().finished_at is None
+        
+        assert run_pending() == 2
+        assert not (tmp_path / 'avatar.png').exists()
+        assert AccountPurge.query.one().finished_at is not None
+        assert db.session.get(User, test_user['id']) is None
+    
+    def test_upload_tasks_registered(self):
+        """Test that the upload handlers are registered."""
+        assert {'delete_upload', 'process_profile_image', 'purge_account'} <= set(TASKS)